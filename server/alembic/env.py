@@ -1,5 +1,4 @@
 from logging.config import fileConfig
-import os
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
@@ -17,6 +16,7 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
+from app.db import DB_URL
 from app.models import Base  # Import your models here
 
 target_metadata = Base.metadata
@@ -28,7 +28,8 @@ target_metadata = Base.metadata
 
 
 def get_url():
-    return os.getenv("DB_URL")
+    # The app's setting, default included, so both see the same database.
+    return DB_URL
 
 
 # Set the sqlalchemy.url to the database URL
@@ -0,0 +1,115 @@
+"""Catalog search_text columns and trigram indexes
+
+Revision ID: 3f1c9d2e7a41
+Revises: a9b6d6132bc1
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9d2e7a41'
+down_revision: Union[str, None] = 'a9b6d6132bc1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = {
+    'hotels': ('name', 'location'),
+    'activities': ('location',),
+    'sights': ('name', 'location'),
+}
+
+BATCH_SIZE = 5000
+
+# Frozen copy of app.trip.search.normalize and its ALIASES as of this
+# revision, so later changes to the app cannot change what this migration
+# writes.
+ALIASES = {
+    'cochin': 'kochi',
+    'trichur': 'thrissur',
+    'trivandrum': 'thiruvananthapuram',
+    'calicut': 'kozhikode',
+    'alleppey': 'alappuzha',
+    'quilon': 'kollam',
+    'cannanore': 'kannur',
+    'palghat': 'palakkad',
+    'bombay': 'mumbai',
+    'madras': 'chennai',
+    'calcutta': 'kolkata',
+    'bangalore': 'bengaluru',
+    'mysore': 'mysuru',
+    'pondicherry': 'puducherry',
+    'benares': 'varanasi',
+    'banaras': 'varanasi',
+    'gurgaon': 'gurugram',
+    'baroda': 'vadodara',
+    'simla': 'shimla',
+    'allahabad': 'prayagraj',
+}
+
+_word_re = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(ALIASES.get(w, w) for w in _word_re.findall(text))
+
+
+def _backfill(table_name: str, fields) -> None:
+    bind = op.get_bind()
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.String),
+        sa.column('search_text', sa.String),
+        *(sa.column(field, sa.String) for field in fields),
+    )
+    select = sa.select(table.c.id, *(table.c[field] for field in fields))
+    update = (
+        table.update()
+        .where(table.c.id == sa.bindparam('_id'))
+        .values(search_text=sa.bindparam('_search_text'))
+    )
+    batch = []
+    for row in bind.execute(select).fetchall():
+        text = ' '.join(value for value in row[1:] if value)
+        batch.append({'_id': row[0], '_search_text': normalize(text)})
+        if len(batch) >= BATCH_SIZE:
+            bind.execute(update, batch)
+            batch = []
+    if batch:
+        bind.execute(update, batch)
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+    if is_postgres:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for table_name, fields in SEARCH_COLUMNS.items():
+        op.add_column(table_name, sa.Column('search_text', sa.String(), nullable=True))
+        _backfill(table_name, fields)
+        if is_postgres:
+            op.create_index(
+                f'ix_{table_name}_search_text_trgm',
+                table_name,
+                ['search_text'],
+                postgresql_using='gin',
+                postgresql_ops={'search_text': 'gin_trgm_ops'},
+            )
+
+
+def downgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+    for table_name in SEARCH_COLUMNS:
+        if is_postgres:
+            op.drop_index(f'ix_{table_name}_search_text_trgm', table_name=table_name)
+        op.drop_column(table_name, 'search_text')
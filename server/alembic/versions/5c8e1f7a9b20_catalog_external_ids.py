@@ -0,0 +1,34 @@
+"""Catalog external_id natural keys
+
+Revision ID: 5c8e1f7a9b20
+Revises: 7b2e04c5d8f3
+Create Date: 2026-10-18 11:26:05.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e1f7a9b20'
+down_revision: Union[str, None] = '7b2e04c5d8f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('hotels', 'activities', 'sights')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('external_id', sa.String(), nullable=True))
+        op.create_index(
+            op.f(f'ix_{table}_external_id'), table, ['external_id'], unique=True
+        )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(op.f(f'ix_{table}_external_id'), table_name=table)
+        op.drop_column(table, 'external_id')
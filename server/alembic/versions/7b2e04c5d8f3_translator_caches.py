@@ -0,0 +1,42 @@
+"""Transcript and translation caches
+
+Revision ID: 7b2e04c5d8f3
+Revises: 3f1c9d2e7a41
+Create Date: 2026-10-18 10:03:47.551920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e04c5d8f3'
+down_revision: Union[str, None] = '3f1c9d2e7a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'transcript_cache',
+        sa.Column('audio_sha256', sa.String(), nullable=False),
+        sa.Column('text', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('audio_sha256'),
+    )
+    op.create_table(
+        'translation_cache',
+        sa.Column('text_sha256', sa.String(), nullable=False),
+        sa.Column('target_language', sa.String(), nullable=False),
+        sa.Column('translated_text', sa.String(), nullable=True),
+        sa.Column('detected_source_language', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('text_sha256', 'target_language'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('translation_cache')
+    op.drop_table('transcript_cache')
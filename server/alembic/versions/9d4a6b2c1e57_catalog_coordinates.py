@@ -0,0 +1,36 @@
+"""Coordinates and geohash index for catalog rows and places
+
+Revision ID: 9d4a6b2c1e57
+Revises: 5c8e1f7a9b20
+Create Date: 2026-10-18 12:40:19.874502
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6b2c1e57'
+down_revision: Union[str, None] = '5c8e1f7a9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('hotels', 'activities', 'sights', 'places')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('latitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('longitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('geohash', sa.String(), nullable=True))
+        op.create_index(op.f(f'ix_{table}_geohash'), table, ['geohash'], unique=False)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(op.f(f'ix_{table}_geohash'), table_name=table)
+        op.drop_column(table, 'geohash')
+        op.drop_column(table, 'longitude')
+        op.drop_column(table, 'latitude')
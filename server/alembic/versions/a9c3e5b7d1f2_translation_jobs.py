@@ -0,0 +1,51 @@
+"""Translation job queue
+
+Revision ID: a9c3e5b7d1f2
+Revises: f6b1d3e8a2c4
+Create Date: 2026-10-18 18:12:44.305127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c3e5b7d1f2'
+down_revision: Union[str, None] = 'f6b1d3e8a2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'translation_jobs',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('status', sa.Enum('queued', 'running', 'done', 'failed', name='translation_job_statuses'), nullable=False),
+        sa.Column('target_language', sa.String(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=True),
+        sa.Column('audio_sha256', sa.String(length=64), nullable=False),
+        sa.Column('audio_size', sa.Integer(), nullable=True),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('original_text', sa.String(), nullable=True),
+        sa.Column('translation', sa.String(), nullable=True),
+        sa.Column('source_language', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_translation_jobs_user_id'), 'translation_jobs', ['user_id'], unique=False)
+    op.create_index('ix_translation_jobs_status_run_after', 'translation_jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_translation_jobs_status_run_after', table_name='translation_jobs')
+    op.drop_index(op.f('ix_translation_jobs_user_id'), table_name='translation_jobs')
+    op.drop_table('translation_jobs')
+    sa.Enum(name='translation_job_statuses').drop(op.get_bind(), checkfirst=True)
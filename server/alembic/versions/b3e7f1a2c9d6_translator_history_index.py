@@ -0,0 +1,31 @@
+"""Index translation history by user and recency
+
+Revision ID: b3e7f1a2c9d6
+Revises: 9d4a6b2c1e57
+Create Date: 2026-10-18 13:52:44.106381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e7f1a2c9d6'
+down_revision: Union[str, None] = '9d4a6b2c1e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_translators_user_id_created_at',
+        'translators',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_translators_user_id_created_at', table_name='translators')
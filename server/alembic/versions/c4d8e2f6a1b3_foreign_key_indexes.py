@@ -0,0 +1,60 @@
+"""Index foreign keys and drop redundant primary key indexes
+
+Revision ID: c4d8e2f6a1b3
+Revises: b3e7f1a2c9d6
+Create Date: 2026-10-18 14:31:08.662915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2f6a1b3'
+down_revision: Union[str, None] = 'b3e7f1a2c9d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose id column carried an extra index next to its primary key.
+PRIMARY_KEY_INDEXES = (
+    'users',
+    'translators',
+    'activities',
+    'hotels',
+    'sights',
+    'trips',
+    'places',
+    'itineraries',
+    'wallets',
+    'itinerary_items',
+    'itinerary_item_links',
+)
+
+# translators.user_id is covered by ix_translators_user_id_created_at.
+FOREIGN_KEYS = (
+    ('trips', 'user_id'),
+    ('places', 'trip_id'),
+    ('itineraries', 'trip_id'),
+    ('wallets', 'user_id'),
+    ('itinerary_items', 'itinerary_id'),
+    ('itinerary_item_links', 'itinerary_item_id'),
+    ('itinerary_item_links', 'activity_id'),
+    ('itinerary_item_links', 'sight_id'),
+    ('itinerary_item_links', 'hotel_id'),
+)
+
+
+def upgrade() -> None:
+    for table in PRIMARY_KEY_INDEXES:
+        op.drop_index(op.f(f'ix_{table}_id'), table_name=table, if_exists=True)
+    for table, column in FOREIGN_KEYS:
+        op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False)
+
+
+def downgrade() -> None:
+    for table, column in FOREIGN_KEYS:
+        op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table)
+    for table in PRIMARY_KEY_INDEXES:
+        op.create_index(op.f(f'ix_{table}_id'), table, ['id'], unique=False)
@@ -0,0 +1,92 @@
+"""Store primary and foreign keys as native UUIDs
+
+Revision ID: e2a7c5f9b4d8
+Revises: c4d8e2f6a1b3
+Create Date: 2026-10-18 16:12:40.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c5f9b4d8'
+down_revision: Union[str, None] = 'c4d8e2f6a1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# PostgreSQL only, and enforced by _require_postgresql(): the column types
+# change in place, which SQLite cannot do short of rebuilding every table.
+# Local SQLite databases get their schema from DB_CREATE_ALL instead, which
+# also rewrites their existing keys (app.db.convert_sqlite_uuid_keys). Every
+# existing id must already be UUID text (application ids and Supabase user
+# ids are); the cast fails on anything else. Each table is rewritten under
+# an exclusive lock, so run this in a maintenance window.
+TABLES = (
+    'users',
+    'translators',
+    'activities',
+    'hotels',
+    'sights',
+    'trips',
+    'places',
+    'itineraries',
+    'wallets',
+    'itinerary_items',
+    'itinerary_item_links',
+)
+
+FOREIGN_KEYS = (
+    ('translators', 'user_id', 'users'),
+    ('trips', 'user_id', 'users'),
+    ('places', 'trip_id', 'trips'),
+    ('itineraries', 'trip_id', 'trips'),
+    ('wallets', 'user_id', 'users'),
+    ('itinerary_items', 'itinerary_id', 'itineraries'),
+    ('itinerary_item_links', 'itinerary_item_id', 'itinerary_items'),
+    ('itinerary_item_links', 'activity_id', 'activities'),
+    ('itinerary_item_links', 'sight_id', 'sights'),
+    ('itinerary_item_links', 'hotel_id', 'hotels'),
+)
+
+
+def _require_postgresql() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect != 'postgresql':
+        raise RuntimeError(
+            f'Revision {revision} only runs on PostgreSQL, not {dialect}. '
+            'For a local SQLite database, start the app with DB_CREATE_ALL=true '
+            'instead of running migrations.'
+        )
+
+
+def _convert(from_type, to_type, cast) -> None:
+    _require_postgresql()
+    # Keys and the columns referencing them must change together, so the
+    # constraints are dropped first and put back once both sides match.
+    for table, column, _ in FOREIGN_KEYS:
+        op.drop_constraint(f'{table}_{column}_fkey', table, type_='foreignkey')
+    for table in TABLES:
+        op.alter_column(
+            table, 'id', existing_type=from_type, type_=to_type,
+            postgresql_using=f'id::{cast}',
+        )
+    for table, column, _ in FOREIGN_KEYS:
+        op.alter_column(
+            table, column, existing_type=from_type, type_=to_type,
+            postgresql_using=f'{column}::{cast}',
+        )
+    for table, column, referred in FOREIGN_KEYS:
+        op.create_foreign_key(
+            f'{table}_{column}_fkey', table, referred, [column], ['id']
+        )
+
+
+def upgrade() -> None:
+    _convert(sa.VARCHAR(), sa.Uuid(), 'uuid')
+
+
+def downgrade() -> None:
+    _convert(sa.Uuid(), sa.VARCHAR(), 'text')
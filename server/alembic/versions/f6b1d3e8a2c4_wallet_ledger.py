@@ -0,0 +1,79 @@
+"""Wallet ledger with integer minor-unit balances
+
+Revision ID: f6b1d3e8a2c4
+Revises: e2a7c5f9b4d8
+Create Date: 2026-10-18 16:58:21.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import uuid7
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b1d3e8a2c4'
+down_revision: Union[str, None] = 'e2a7c5f9b4d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    # Float rupees become integer paise.
+    op.alter_column(
+        'wallets', 'balance', existing_type=sa.Float(), type_=sa.BigInteger(),
+        nullable=False, postgresql_using='round(coalesce(balance, 0) * 100)::bigint',
+    )
+    op.add_column('wallets', sa.Column('currency', sa.String(length=3), server_default='INR', nullable=False))
+    op.add_column('wallets', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('wallets', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.create_table(
+        'wallet_entries',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('wallet_id', sa.Uuid(), nullable=False),
+        sa.Column('amount', sa.BigInteger(), nullable=False),
+        sa.Column('balance_after', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.Enum('opening', 'top_up', 'spend', 'transfer', name='wallet_entry_kinds'), nullable=False),
+        sa.Column('transfer_id', sa.Uuid(), nullable=True),
+        sa.Column('reference', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['wallet_id'], ['wallets.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_wallet_entries_wallet_id_id', 'wallet_entries', ['wallet_id', 'id'], unique=False)
+    # Existing balances open the ledger, so balances equal entry totals.
+    # Entries are paged by id, so opening entries get UUIDv7 ids minted now:
+    # they sort before every entry written after the migration.
+    bind = op.get_bind()
+    insert = sa.text(
+        "INSERT INTO wallet_entries (id, wallet_id, amount, balance_after, kind, created_at) "
+        "VALUES (:id, :wallet_id, :amount, :amount, 'opening', now())"
+    ).bindparams(sa.bindparam('id', type_=sa.Uuid()), sa.bindparam('wallet_id', type_=sa.Uuid()))
+    # Streamed from a server-side cursor, one batch in memory at a time.
+    wallets = bind.execute(
+        sa.text("SELECT id, balance FROM wallets WHERE balance <> 0 ORDER BY id")
+        .columns(id=sa.Uuid(), balance=sa.BigInteger()),
+        execution_options={'stream_results': True},
+    )
+    for batch in wallets.partitions(BACKFILL_BATCH_SIZE):
+        bind.execute(
+            insert,
+            [{'id': uuid7(), 'wallet_id': wallet_id, 'amount': balance} for wallet_id, balance in batch],
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wallet_entries_wallet_id_id', table_name='wallet_entries')
+    op.drop_table('wallet_entries')
+    sa.Enum(name='wallet_entry_kinds').drop(op.get_bind(), checkfirst=True)
+    op.drop_column('wallets', 'created_at')
+    op.drop_column('wallets', 'version')
+    op.drop_column('wallets', 'currency')
+    op.alter_column(
+        'wallets', 'balance', existing_type=sa.BigInteger(), type_=sa.Float(),
+        nullable=True, postgresql_using='balance / 100.0',
+    )
@@ -1,13 +1,102 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app import models
-from app.db import engine
+from app.db import DB_URL, async_engine, convert_sqlite_uuid_keys, replicas
 from app.auth.auth import auth_router
 from app.dashboard.dashboard import dashboard_router
-from app.translator.translator import translator_router
+from app.metrics import MetricsMiddleware
+from app.ops.ops import metrics_router, ops_router
+from app.translator.translator import job_workers, translator_router
+from app.translator.upload import (
+    UploadSizeLimitMiddleware,
+    MAX_AUDIO_BYTES,
+    FORM_OVERHEAD_BYTES,
+)
 from app.trip.trip import trip_router
+from app.wallet.wallet import wallet_router
+from app.upstream import clients
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+
+# Startup never touches the database or upstream services unless asked to.
+# DB_CREATE_ALL creates missing tables and, on SQLite, converts keys left in
+# the old dashed text form (local development only; deployed schemas come
+# from ``alembic upgrade head``). STARTUP_WARM_CLIENTS builds
+# the configured upstream clients in parallel instead of on first use.
+DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "false").lower() in ("1", "true", "yes")
+STARTUP_WARM_CLIENTS = os.getenv("STARTUP_WARM_CLIENTS", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def _warm_clients(report: dict):
+    names = [name for name, ready in clients.configured().items() if ready]
+    results = await asyncio.gather(
+        *(asyncio.to_thread(getattr, clients, name) for name in names),
+        return_exceptions=True,
+    )
+    report["clients_warmed"] = {
+        name: "ok" if not isinstance(result, Exception) else f"failed: {result}"
+        for name, result in zip(names, results)
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    report = {
+        "import_s": round(_import_ready - _import_started, 3),
+        "database": async_engine.url.get_backend_name(),
+        "db_url_set": bool(os.getenv("DB_URL")),
+        "clients_configured": clients.configured(),
+        "steps_s": {},
+    }
+
+    async def step(name, fn):
+        step_started = time.perf_counter()
+        await fn
+        report["steps_s"][name] = round(time.perf_counter() - step_started, 3)
+
+    if DB_CREATE_ALL:
+        async with async_engine.begin() as connection:
+            create_all = connection.run_sync(models.Base.metadata.create_all)
+            await step("create_all", create_all)
+            converted = await connection.run_sync(
+                convert_sqlite_uuid_keys, models.Base.metadata
+            )
+            if converted:
+                report["uuid_keys_converted"] = converted
+    if STARTUP_WARM_CLIENTS:
+        await step("warm_clients", _warm_clients(report))
+    monitor = None
+    if replicas.replicas:
+        monitor = asyncio.create_task(replicas.monitor())
+    job_workers.start()
+    report["job_workers"] = job_workers.concurrency
+    report["lifespan_s"] = round(time.perf_counter() - started, 3)
+    app.state.startup = report
+    logger.info("Startup: %s", report)
+    if not report["db_url_set"]:
+        logger.warning("DB_URL is not set; using %s", DB_URL)
+    configured = report["clients_configured"]
+    missing = [name for name, ready in configured.items() if not ready]
+    if missing:
+        logger.warning("Not configured, calls will fail: %s", ", ".join(missing))
+    yield
+    if monitor is not None:
+        monitor.cancel()
+    await job_workers.stop()
+    await clients.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 origins = [
     "http://localhost.tiangolo.com",
     "https://localhost.tiangolo.com",
@@ -24,8 +113,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-models.Base.metadata.create_all(bind=engine)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path_prefix="/translator",
+    max_bytes=MAX_AUDIO_BYTES + FORM_OVERHEAD_BYTES,
+)
+# Outermost, so request timings include every other middleware.
+app.add_middleware(MetricsMiddleware)
 app.include_router(auth_router, prefix="/auth")
 app.include_router(dashboard_router, prefix="/dashboard")
 app.include_router(translator_router, prefix="/translator")
 app.include_router(trip_router, prefix="/trip")
+app.include_router(wallet_router, prefix="/wallet")
+app.include_router(ops_router, prefix="/ops")
+app.include_router(metrics_router)
+
+_import_ready = time.perf_counter()
@@ -2,18 +2,25 @@ from fastapi import APIRouter, status, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from app import models
 from app.schemas import UserOut, UserAuth, TokenSchema
-from app.db import get_db
-from sqlalchemy.orm import Session
-from .supabase_auth import supabase
+from app.db import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.upstream import (
+    clients,
+    supabase,
+    UpstreamError,
+    UpstreamTimeout,
+    UpstreamUnavailable,
+)
 
 auth_router = APIRouter()
 
 
 @auth_router.post("/signup", summary="Create new user", response_model=UserOut)
-async def create_user(data: UserAuth, db: Session = Depends(get_db)):
+async def create_user(data: UserAuth, db: AsyncSession = Depends(get_async_db)):
 
     try:
-        response = supabase.auth.sign_up(
+        response = await supabase.call_sync(
+            clients.supabase.auth.sign_up,
             {
                 "email": data.email,
                 "password": data.password,
@@ -22,20 +29,26 @@ async def create_user(data: UserAuth, db: Session = Depends(get_db)):
                         "first_name": data.username,
                     },
                 },
-            }
+            },
         )
         # print(response.User)
         new_user = models.User(
             email=response.user.email,
             username=data.username,
-            location=response.user.location,
+            location=data.location,
             id=response.user.id,
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
         return response.user
 
+    except (UpstreamUnavailable, UpstreamTimeout):
+        raise
+    except UpstreamError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e.error),
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -48,20 +61,26 @@ async def create_user(data: UserAuth, db: Session = Depends(get_db)):
     summary="Create access and refresh tokens for user",
     response_model=TokenSchema,
 )
-async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
-):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     try:
-        data = supabase.auth.sign_in_with_password(
+        data = await supabase.call_sync(
+            clients.supabase.auth.sign_in_with_password,
             {
                 "email": form_data.username,
                 "password": form_data.password,
-            }
+            },
         )
         return {
             "access_token": data.session.access_token,
             "refresh_token": data.session.refresh_token,
         }
+    except (UpstreamUnavailable, UpstreamTimeout):
+        raise
+    except UpstreamError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Incorrect email or password. Please try again! {e.error}",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1,38 +1,59 @@
-from fastapi import Request, HTTPException
+import os
+import time
+import uuid
+
+from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from .auth_handler import decode_jwt
-
-
-class JWTBearer(HTTPBearer):
-    def __init__(self, auto_error: bool = True):
-        super(JWTBearer, self).__init__(auto_error=auto_error)
-
-    async def __call__(self, request: Request):
-        credentials: HTTPAuthorizationCredentials = await super(
-            JWTBearer, self
-        ).__call__(request)
-        if credentials:
-            if not credentials.scheme == "Bearer":
-                raise HTTPException(
-                    status_code=403, detail="Invalid authentication scheme."
-                )
-            if not self.verify_jwt(credentials.credentials):
-                raise HTTPException(
-                    status_code=403, detail="Invalid token or expired token."
-                )
-            return credentials.credentials
-        else:
-            raise HTTPException(status_code=403, detail="Invalid authorization code.")
-
-    def verify_jwt(self, jwtoken: str) -> bool:
-        isTokenValid: bool = False
-
-        try:
-            payload = decode_jwt(jwtoken)
-        except:
-            payload = None
-        if payload:
-            isTokenValid = True
-
-        return isTokenValid
+from app.cache import LRUCache
+from app.db import AsyncSessionLocal
+from app.models import User
+from .auth_handler import decode_jwt, token_expiry, token_subject
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10_000))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+
+# Verified token -> detached User, bounded by entry count. Entries never
+# outlive the token's own expiry.
+principals = LRUCache(
+    PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL, weigh=lambda key, value: 1
+)
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+) -> User:
+    """Verify the bearer token once and resolve it to its ``User`` row."""
+    if not credentials:
+        raise HTTPException(status_code=403, detail="Invalid authorization code.")
+    if not credentials.scheme == "Bearer":
+        raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
+    return await user_for_token(credentials.credentials)
+
+
+async def user_for_token(token: str) -> User:
+    """Resolve a bearer token to its ``User``; raises 403 when it cannot."""
+    user = principals.get(token)
+    if user is not None:
+        return user
+
+    payload = decode_jwt(token)
+    if not payload:
+        raise HTTPException(status_code=403, detail="Invalid token or expired token.")
+
+    try:
+        user_id = str(uuid.UUID(token_subject(payload)))
+    except (AttributeError, TypeError, ValueError):
+        raise HTTPException(status_code=403, detail="Unknown or inactive user.")
+
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+    if user is None or user.is_active is False:
+        raise HTTPException(status_code=403, detail="Unknown or inactive user.")
+
+    remaining = token_expiry(payload) - time.time()
+    principals.set(token, user, ttl=min(PRINCIPAL_CACHE_TTL, remaining))
+    return user
@@ -7,6 +7,10 @@ import os
 
 JWT_SECRET = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM_KEY")
+# Supabase issues access tokens for signed-in users to this audience. Tokens
+# signed with the same secret for anything else (e.g. the anon and
+# service_role API keys) must not authenticate a user.
+JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "authenticated")
 
 
 def token_response(token: str):
@@ -14,15 +18,29 @@ def token_response(token: str):
 
 
 def sign_jwt(user_id: str) -> Dict[str, str]:
-    payload = {"user_id": user_id, "expires": time.time() + 600}
+    payload = {"user_id": user_id, "aud": JWT_AUDIENCE, "expires": time.time() + 600}
     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
     return token_response(token)
 
 
+def token_expiry(payload: dict) -> float:
+    # Our own tokens carry "expires"; Supabase access tokens carry "exp".
+    return payload.get("expires") or payload["exp"]
+
+
+def token_subject(payload: dict) -> str:
+    return payload.get("user_id") or payload["sub"]
+
+
 def decode_jwt(token: str) -> dict:
     try:
-        decoded_token = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return decoded_token if decoded_token["expires"] >= time.time() else None
+        decoded_token = jwt.decode(
+            token,
+            JWT_SECRET,
+            algorithms=[JWT_ALGORITHM],
+            audience=JWT_AUDIENCE,
+        )
+        return decoded_token if token_expiry(decoded_token) >= time.time() else None
     except:
         return {}
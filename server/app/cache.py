@@ -0,0 +1,300 @@
+"""In-process response caches with an optional shared backend.
+
+``ResponseCache`` keeps pre-serialized ``bytes`` values in a memory bounded
+LRU with a per-entry TTL. When ``CACHE_BACKEND_URL`` is set, local misses
+fall through to a shared backend (Redis, or ``memory://`` as a local
+stand-in) so workers can reuse each other's results. ``SingleFlight``
+coalesces concurrent identical upstream calls.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_BACKEND_URL = os.getenv("CACHE_BACKEND_URL")
+
+# Every ResponseCache registers itself here so its stats can be reported.
+caches = {}
+
+
+def _weigh_bytes(key, value) -> int:
+    return len(key) + len(value)
+
+
+class LRUCache:
+    """Byte-bounded LRU of ``bytes`` values with a TTL per entry.
+
+    Pass ``weigh`` to bound by something other than bytes, e.g.
+    ``lambda key, value: 1`` for a plain entry count.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, weigh=_weigh_bytes):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.weigh = weigh
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        size = self.weigh(key, value)
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (expires, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if self._pop(key):
+                self.invalidations += 1
+
+    def invalidate(self, predicate) -> int:
+        """Drop every entry whose key satisfies ``predicate``."""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self._pop(key)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._size -= self.weigh(key, entry[1])
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class InMemoryBackend:
+    """Process-local stand-in for a shared backend such as Redis."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[0] and entry[0] < time.monotonic()):
+                return None
+            return entry[1]
+
+    async def set(self, key: str, value, ttl: float = None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._data.get(key, (None, 0))[1]) + 1
+            self._data[key] = (None, value)
+            return value
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND_URL points at Redis but the redis package is "
+                "not installed."
+            ) from e
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str):
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value, ttl: float = None):
+        await self._redis.set(key, value, ex=int(ttl) if ttl else None)
+
+    async def incr(self, key: str) -> int:
+        return await self._redis.incr(key)
+
+
+def backend_from_url(url: str):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported CACHE_BACKEND_URL: {url}")
+
+
+_shared_backend = None
+
+
+def shared_backend():
+    global _shared_backend
+    if _shared_backend is None:
+        _shared_backend = backend_from_url(CACHE_BACKEND_URL)
+    return _shared_backend
+
+
+class ResponseCache:
+    """Local LRU in front of an optional shared backend.
+
+    Invalidation drops matching local entries right away and bumps a
+    generation counter that is part of every shared key, so other workers
+    stop reading the stale shared copies; their own local copies age out
+    within ``ttl``.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl: float, backend=None):
+        self.name = name
+        self.local = LRUCache(max_bytes, ttl)
+        self.backend = backend
+        self.shared_hits = 0
+        self.shared_errors = 0
+        # Bumped on every invalidation; a fill started before an
+        # invalidation is dropped instead of caching stale data.
+        self.epoch = 0
+        self._bump_generation = False
+        caches[name] = self
+
+    async def _shared_key(self, key: str) -> str:
+        generation_key = f"{self.name}:generation"
+        if self._bump_generation:
+            self._bump_generation = False
+            generation = await self.backend.incr(generation_key)
+        else:
+            generation = int(await self.backend.get(generation_key) or 0)
+        return f"{self.name}:{generation}:{key}"
+
+    async def publish_invalidations(self):
+        """Bump the shared generation now if an invalidation is pending,
+        rather than on the next access; for short-lived processes."""
+        if self.backend is None or not self._bump_generation:
+            return
+        try:
+            await self._shared_key("")
+        except Exception:
+            self.shared_errors += 1
+
+    async def get(self, key: str):
+        value = self.local.get(key)
+        if value is not None or self.backend is None:
+            return value
+        try:
+            value = await self.backend.get(await self._shared_key(key))
+        except Exception:
+            self.shared_errors += 1
+            return None
+        if value is not None:
+            self.shared_hits += 1
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes, epoch: int = None):
+        if epoch is not None and epoch != self.epoch:
+            return
+        self.local.set(key, value)
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(await self._shared_key(key), value, self.local.ttl)
+        except Exception:
+            self.shared_errors += 1
+
+    def invalidate(self, predicate) -> int:
+        self.epoch += 1
+        self._bump_generation = self.backend is not None
+        return self.local.invalidate(predicate)
+
+    def clear(self):
+        self.epoch += 1
+        self._bump_generation = self.backend is not None
+        self.local.clear()
+
+    def stats(self) -> dict:
+        stats = self.local.stats()
+        stats["ttl"] = self.local.ttl
+        if self.backend is not None:
+            stats["backend"] = type(self.backend).__name__
+            stats["shared_hits"] = self.shared_hits
+            stats["shared_errors"] = self.shared_errors
+        return stats
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller giving up does not cancel the shared call.
+        return await asyncio.shield(task)
+
+    def pending(self, key):
+        """The in-flight call for ``key``, if there is one."""
+        return self._calls.get(key)
+
+    def _done(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
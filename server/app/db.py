@@ -1,17 +1,443 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Uuid, create_engine, event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    async_sessionmaker,
+)
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
+import math
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from app import metrics
+from app.cache import shared_backend
+
 load_dotenv()
 
-DB_URL = os.getenv("DB_URL")
+# The schema is managed by Alembic (``alembic upgrade head``). Without a
+# DB_URL the app still boots, against a local SQLite file.
+DB_URL = os.getenv("DB_URL") or "sqlite:///./app.db"
+
+# Async drivers for the backends we run on; override with ASYNC_DB_URL.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Applied to every pooled engine. Each worker holds up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections per engine (sync and async).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+# Comma-separated read replica URLs. Reads routed to replicas fall back to
+# the primary for DB_REPLICA_LAG_WINDOW seconds after the same user writes;
+# with CACHE_BACKEND_URL set, that holds across workers too.
+DB_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()
+]
+DB_REPLICA_LAG_WINDOW = float(os.getenv("DB_REPLICA_LAG_WINDOW", 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 10))
+DB_REPLICA_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_CHECK_TIMEOUT", 2))
+
+
+def async_url(url: str) -> str:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+ASYNC_DB_URL = os.getenv("ASYNC_DB_URL") or async_url(DB_URL)
+
+
+class PoolStats:
+    """Connection pool counters for one engine, fed by pool events."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checked_out = 0
+        self.idle = 0
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._waits = deque(maxlen=2048)
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._waits.append(seconds)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "checked_out": self.checked_out,
+            "idle": self.idle,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "wait_avg": self.wait_total / self.waits if self.waits else None,
+            "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else None,
+            "wait_max": self.wait_max,
+        }
+
+
+# Engine name -> PoolStats, reported at /ops/db.
+pool_stats = {}
+
+metrics.Gauge(
+    "db_pool_connections",
+    "Pooled connections per engine.",
+    ("pool", "state"),
+    collect=lambda: {
+        (name, state): getattr(stats, state)
+        for name, stats in pool_stats.items()
+        for state in ("checked_out", "idle")
+    },
+)
+
+
+class _TimedPoolMixin:
+    """Records how long each checkout waited for a free connection.
+
+    Stats are looked up by the pool's logging name, which survives
+    ``recreate()`` after a dispose.
+    """
+
+    def _do_get(self):
+        stats = pool_stats.get(self._orig_logging_name)
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if stats is not None:
+                stats.timeouts += 1
+            raise
+        finally:
+            if stats is not None:
+                stats.record_wait(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
 
-engine = create_engine(DB_URL)
+
+def _pool_options(url: str, poolclass) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # SQLite picks its own pool type (NullPool/SingletonThreadPool); sizing
+    # only applies to real servers.
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def instrument(engine, name: str) -> PoolStats:
+    stats = pool_stats[name] = PoolStats(name)
+
+    @event.listens_for(engine.pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+        stats.idle += 1
+
+    @event.listens_for(engine.pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+        stats.checked_out += 1
+        stats.idle -= 1
+
+    @event.listens_for(engine.pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.checked_out -= 1
+        stats.idle += 1
+
+    @event.listens_for(engine.pool, "close")
+    def on_close(dbapi_connection, connection_record):
+        stats.idle -= 1
+
+    @event.listens_for(engine.pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        if context.is_disconnect or context.connection is None:
+            stats.errors += 1
+
+    return stats
+
+
+def build_engine(url: str, name: str):
+    engine = create_engine(
+        url, pool_logging_name=name, **_pool_options(url, TimedQueuePool)
+    )
+    instrument(engine, name)
+    return engine
+
+
+def build_async_engine(url: str, name: str):
+    engine = create_async_engine(
+        url, pool_logging_name=name, **_pool_options(url, TimedAsyncQueuePool)
+    )
+    instrument(engine.sync_engine, name)
+    return engine
+
+
+engine = build_engine(DB_URL, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = build_async_engine(ASYNC_DB_URL, "primary_async")
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+class Replica:
+    def __init__(self, url: str, name: str):
+        self.name = name
+        self.engine = build_engine(url, name)
+        self.async_engine = build_async_engine(async_url(url), f"{name}_async")
+        self.healthy = True
+        self.picks = 0
+        self.failures = 0
+        for bound in (self.engine, self.async_engine.sync_engine):
+            event.listen(bound, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect or context.connection is None:
+            self.failures += 1
+            self.healthy = False
+
+    async def check(self):
+        try:
+            async with self.async_engine.connect() as connection:
+                await asyncio.wait_for(
+                    connection.execute(text("SELECT 1")), DB_REPLICA_CHECK_TIMEOUT
+                )
+        except Exception:
+            self.failures += 1
+            self.healthy = False
+        else:
+            self.healthy = True
+
+    def stats(self) -> dict:
+        return {"healthy": self.healthy, "picks": self.picks, "failures": self.failures}
+
+
+class ReplicaSet:
+    """Round-robin over healthy read replicas.
+
+    Replicas are marked down on connection errors and re-checked by
+    ``monitor()``, which the app runs for its lifetime.
+    """
+
+    def __init__(self, urls):
+        self.replicas = [Replica(url, f"replica{i}") for i, url in enumerate(urls)]
+        self._next = itertools.count()
+
+    def pick(self):
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next) % len(self.replicas)]
+            if replica.healthy:
+                replica.picks += 1
+                return replica
+        return None
+
+    async def monitor(self, interval: float = None):
+        interval = interval or DB_REPLICA_CHECK_INTERVAL
+        while True:
+            await asyncio.gather(*(replica.check() for replica in self.replicas))
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {replica.name: replica.stats() for replica in self.replicas}
+
+
+replicas = ReplicaSet(DB_REPLICA_URLS)
+
+# user key -> time of that user's last write in this process. Writes are
+# also recorded in the shared cache backend, when there is one, so a read
+# that lands on another worker still goes to the primary.
+_recent_writes = {}
+write_marker_errors = 0
+
+
+def _write_marker_key(key: str) -> str:
+    return f"db:wrote:{key}"
+
+
+async def mark_write(key: str):
+    """Send ``key``'s reads to the primary until replicas have caught up."""
+    global write_marker_errors
+    _recent_writes[key] = time.monotonic()
+    if len(_recent_writes) > 100_000:
+        cutoff = time.monotonic() - DB_REPLICA_LAG_WINDOW
+        for stale in [k for k, t in _recent_writes.items() if t < cutoff]:
+            _recent_writes.pop(stale, None)
+    backend = shared_backend()
+    if backend is None:
+        return
+    ttl = max(1, math.ceil(DB_REPLICA_LAG_WINDOW))
+    try:
+        await backend.set(_write_marker_key(key), time.time(), ttl)
+    except Exception:
+        write_marker_errors += 1
+
+
+async def recently_wrote(key: str) -> bool:
+    global write_marker_errors
+    wrote_at = _recent_writes.get(key)
+    if wrote_at is not None and time.monotonic() - wrote_at < DB_REPLICA_LAG_WINDOW:
+        return True
+    backend = shared_backend()
+    if backend is None:
+        return False
+    try:
+        wrote_at = await backend.get(_write_marker_key(key))
+    except Exception:
+        # Cannot tell; the primary is always consistent.
+        write_marker_errors += 1
+        return True
+    if wrote_at is None:
+        return False
+    return time.time() - float(wrote_at) < DB_REPLICA_LAG_WINDOW
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica when opened read-only.
+
+    Each session sticks to the replica it picked first. Flushes, and every
+    statement after the session has written, go to the primary.
+    """
+
+    use_async_engines = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("read_only") and not self._flushing:
+            replica = self.info.get("replica")
+            if replica is None and "replica" not in self.info:
+                replica = self.info["replica"] = replicas.pick()
+            if replica is not None and replica.healthy:
+                if self.use_async_engines:
+                    return replica.async_engine.sync_engine
+                return replica.engine
+        if self.use_async_engines:
+            return async_engine.sync_engine
+        return engine
+
+
+class AsyncRoutingSession(RoutingSession):
+    use_async_engines = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context):
+    session.info["read_only"] = False
+
+
+def queue_after_commit(session: Session, apply, item):
+    """Queue ``item`` for ``apply(items)``, called once ``session`` commits.
+
+    For state kept outside the database (in-process indexes, caches) that
+    mapper events would otherwise update at flush time, before the
+    transaction is known to commit. Items are dropped if it rolls back or the
+    session is closed without committing.
+    """
+    session.info.setdefault("after_commit", {}).setdefault(apply, []).append(item)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    for apply, items in session.info.pop("after_commit", {}).items():
+        apply(items)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_after_commit(session, transaction):
+    # Fires after after_commit, so anything left was rolled back or abandoned.
+    if transaction.parent is None:
+        session.info.pop("after_commit", None)
+
+
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    info={"read_only": True},
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    sync_session_class=AsyncRoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    info={"read_only": True},
+)
+
+
+@asynccontextmanager
+async def read_session(sticky_key: str = None):
+    """Async session for reads; primary if ``sticky_key`` just wrote."""
+    if sticky_key is not None and await recently_wrote(sticky_key):
+        session = AsyncSessionLocal()
+    else:
+        session = AsyncReadSessionLocal()
+    async with session:
+        yield session
+
+
+def convert_sqlite_uuid_keys(connection, metadata) -> int:
+    """Rewrite UUID text from older SQLite databases in the stored form.
+
+    ``Uuid`` columns hold 32 hex digits on SQLite, but databases created
+    before the keys became ``Uuid`` hold the 36 character dashed form, which
+    no longer matches on lookup. Rows already converted are left alone, so
+    this is safe to run on every start. Returns the number of values changed.
+    """
+    if connection.dialect.name != "sqlite":
+        return 0
+    changed = 0
+    for table in metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, Uuid):
+                continue
+            name = column.name
+            result = connection.execute(
+                text(
+                    f"UPDATE {table.name} SET {name} = lower(replace({name}, '-', '')) "
+                    f"WHERE {name} LIKE '%-%'"
+                )
+            )
+            changed += result.rowcount
+    return changed
+
 
 def get_db():
     db = SessionLocal()
@@ -19,3 +445,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,304 @@
+"""Request, SQL and upstream instrumentation, exported for Prometheus.
+
+``MetricsMiddleware`` times every request against its route template and
+counts requests in flight. While a request runs, SQLAlchemy cursor events
+and ``Upstream`` calls add their time to it through a context variable, so
+each request knows how many queries it ran and how long it waited on
+Whisper, Google Translate or Supabase. ``render()`` produces the Prometheus
+text format served at ``/metrics``.
+
+METRICS_TIMING_HEADERS adds a ``Server-Timing`` header with that breakdown
+to every response. Requests slower than METRICS_SLOW_REQUEST_MS are logged
+with it (0 turns this off).
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+
+load_dotenv()
+
+METRICS_TIMING_HEADERS = os.getenv("METRICS_TIMING_HEADERS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+METRICS_SLOW_REQUEST_MS = float(os.getenv("METRICS_SLOW_REQUEST_MS", 1000))
+
+# Seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+logger = logging.getLogger("uvicorn.error")
+
+# Every metric registers itself here, in the order it is rendered.
+registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # Called at render time for values owned elsewhere; returns
+        # {label values: value}.
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _samples(self):
+        values = self.collect() if self.collect is not None else self._values
+        for labels, value in list(values.items()):
+            yield "", dict(zip(self.labels, labels)), value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self._samples():
+            pairs = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            series = f"{self.name}{suffix}{{{pairs}}}" if pairs else self.name + suffix
+            lines.append(f"{series} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum.
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def _samples(self):
+        with self._lock:
+            values = [(labels, list(counts), total)
+                      for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            labels = dict(zip(self.labels, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _number(float(bound))}, cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template.",
+    ("method", "route", "status"),
+)
+http_in_flight = Gauge(
+    "http_requests_in_flight", "Requests being handled.", ("method", "route")
+)
+http_db_queries = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+http_db_seconds = Counter(
+    "http_request_db_seconds_total",
+    "Time requests spent in SQL statements.",
+    ("method", "route"),
+)
+http_upstream_seconds = Counter(
+    "http_request_upstream_seconds_total",
+    "Time requests spent in upstream calls.",
+    ("method", "route", "upstream"),
+)
+db_query_seconds = Histogram(
+    "db_query_duration_seconds", "SQL statement latency.", ("statement",)
+)
+upstream_call_seconds = Histogram(
+    "upstream_call_duration_seconds",
+    "Upstream call latency per attempt.",
+    ("upstream", "outcome"),
+)
+
+
+@dataclass
+class RequestTimings:
+    """Where one request's time went, filled in while it runs."""
+
+    started: float = field(default_factory=time.perf_counter)
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    # upstream name -> (calls, seconds)
+    upstreams: dict = field(default_factory=dict)
+
+    def server_timing(self) -> str:
+        parts = [f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}"]
+        if self.db_queries:
+            parts.append(
+                f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"'
+            )
+        for name, (calls, seconds) in self.upstreams.items():
+            parts.append(f'{name};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        return ", ".join(parts)
+
+    def describe(self) -> str:
+        parts = [f"db {self.db_queries} queries {self.db_seconds * 1000:.0f} ms"]
+        for name, (calls, seconds) in self.upstreams.items():
+            parts.append(f"{name} {calls} calls {seconds * 1000:.0f} ms")
+        return ", ".join(parts)
+
+
+_current = ContextVar("request_timings", default=None)
+
+
+def current_timings():
+    """Timings of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+def observe_upstream(name: str, seconds: float, error: Exception = None):
+    upstream_call_seconds.observe(seconds, name, "error" if error else "ok")
+    timings = _current.get()
+    if timings is not None:
+        calls, total = timings.upstreams.get(name, (0, 0.0))
+        timings.upstreams[name] = (calls + 1, total + seconds)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    keyword = statement.lstrip()[:6].upper()
+    db_query_seconds.observe(elapsed, keyword if keyword in STATEMENTS else "OTHER")
+    timings = _current.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_seconds += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_failed_statement(context):
+    if context.connection is not None:
+        started = context.connection.info.get("metrics_started")
+        if started:
+            started.pop()
+
+
+def _route_template(scope) -> str:
+    """The path template the request will be routed to, e.g. ``/trip/{trip_id}``."""
+    partial = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    # Unmatched paths share one label so scans cannot blow up cardinality.
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = _route_template(scope)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status_code = 500
+        streaming = False
+
+        async def timed_send(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                # Event streams stay open by design; they are never "slow".
+                streaming = headers.get("content-type", "").startswith(
+                    "text/event-stream"
+                )
+                if METRICS_TIMING_HEADERS:
+                    headers.append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        http_in_flight.inc(method, route)
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            elapsed = time.perf_counter() - timings.started
+            _current.reset(token)
+            http_in_flight.dec(method, route)
+            http_request_seconds.observe(elapsed, method, route, status_code)
+            http_db_queries.observe(timings.db_queries, method, route)
+            http_db_seconds.inc(method, route, amount=timings.db_seconds)
+            for name, (_, seconds) in timings.upstreams.items():
+                http_upstream_seconds.inc(method, route, name, amount=seconds)
+            slow = METRICS_SLOW_REQUEST_MS and elapsed * 1000 >= METRICS_SLOW_REQUEST_MS
+            if slow and not streaming:
+                logger.warning(
+                    "Slow request: %s %s -> %s in %.0f ms (%s)",
+                    method,
+                    scope["path"],
+                    status_code,
+                    elapsed * 1000,
+                    timings.describe(),
+                )
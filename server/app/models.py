@@ -1,5 +1,6 @@
 import datetime
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     String,
@@ -8,7 +9,9 @@ from sqlalchemy import (
     DateTime,
     Float,
     Enum,
+    Index,
     JSON,
+    Uuid,
 )
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -18,7 +21,7 @@ from app.utils import generate_uuid
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     username = Column(String, nullable=True)
     email = Column(String, unique=True, index=True)
     is_active = Column(Boolean, default=True)
@@ -33,21 +36,91 @@ class User(Base):
 class Translator(Base):
     __tablename__ = "translators"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     original_text = Column(String)
     translation = Column(String)
     target_language = Column(String)
     created_at = Column(DateTime, default=datetime.datetime.now)
-    user_id = Column(String, ForeignKey("users.id"))
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"))
+
+    # History pages are range scans of this index.
+    __table_args__ = (
+        Index(
+            "ix_translators_user_id_created_at",
+            user_id,
+            created_at.desc(),
+            id.desc(),
+        ),
+    )
 
     # Relationships
     user = relationship("User", back_populates="translations")
 
 
+class TranscriptCache(Base):
+    __tablename__ = "transcript_cache"
+
+    audio_sha256 = Column(String, primary_key=True)
+    text = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+
+class TranslationCache(Base):
+    __tablename__ = "translation_cache"
+
+    # SHA-256 of the normalized source text.
+    text_sha256 = Column(String, primary_key=True)
+    target_language = Column(String, primary_key=True)
+    translated_text = Column(String)
+    detected_source_language = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+
+class TranslationJob(Base):
+    """Audio queued for transcription and translation; see translator/jobs.py."""
+
+    __tablename__ = "translation_jobs"
+
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
+    user_id = Column(
+        Uuid(as_uuid=False), ForeignKey("users.id"), nullable=False, index=True
+    )
+    status = Column(
+        Enum(
+            "queued",
+            "running",
+            "done",
+            "failed",
+            name="translation_job_statuses",
+        ),
+        nullable=False,
+        default="queued",
+    )
+    target_language = Column(String, nullable=False)
+    filename = Column(String)
+    audio_sha256 = Column(String(64), nullable=False)
+    audio_size = Column(Integer)
+    # Incremented on every claim; also fences out a worker whose lease ran out.
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False, default=datetime.datetime.now)
+    locked_until = Column(DateTime)
+    error = Column(String)
+    original_text = Column(String)
+    translation = Column(String)
+    source_language = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    finished_at = Column(DateTime)
+
+    # Workers look for due queued jobs and expired running ones.
+    __table_args__ = (
+        Index("ix_translation_jobs_status_run_after", status, run_after),
+    )
+
+
 class Activity(Base):
     __tablename__ = "activities"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     time = Column(String)
     description = Column(String)
     price = Column(Float)
@@ -64,12 +137,18 @@ class Activity(Base):
             name="activity_categories",
         )
     )
+    search_text = Column(String)
+    # "<source>:<id>" of the row in the dump it was ingested from.
+    external_id = Column(String, unique=True, index=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
 
 
 class Hotel(Base):
     __tablename__ = "hotels"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     name = Column(String)
     rating = Column(Float)
     location = Column(String)
@@ -77,29 +156,41 @@ class Hotel(Base):
     amenities = Column(JSON)
     image = Column(String)
     booking_url = Column(String)
+    search_text = Column(String)
+    # "<source>:<id>" of the row in the dump it was ingested from.
+    external_id = Column(String, unique=True, index=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
 
 
 class Sight(Base):
     __tablename__ = "sights"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     name = Column(String)
     location = Column(String)
     description = Column(String)
     image = Column(String)
+    search_text = Column(String)
+    # "<source>:<id>" of the row in the dump it was ingested from.
+    external_id = Column(String, unique=True, index=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
 
 
 class Trip(Base):
     __tablename__ = "trips"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     title = Column(String)
     description = Column(String)
     destination = Column(String)
     start_date = Column(DateTime)
     end_date = Column(DateTime)
     travelers = Column(Integer)
-    user_id = Column(String, ForeignKey("users.id"))
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), index=True)
 
     # Relationships
     user = relationship("User", back_populates="trips")
@@ -110,12 +201,15 @@ class Trip(Base):
 class Place(Base):
     __tablename__ = "places"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     name = Column(String)
     location = Column(String)
     description = Column(String)
     image = Column(String)
-    trip_id = Column(String, ForeignKey("trips.id"))
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
+    trip_id = Column(Uuid(as_uuid=False), ForeignKey("trips.id"), index=True)
 
     # Relationships
     trip = relationship("Trip", back_populates="places")
@@ -124,8 +218,8 @@ class Place(Base):
 class Itinerary(Base):
     __tablename__ = "itineraries"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
-    trip_id = Column(String, ForeignKey("trips.id"))
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
+    trip_id = Column(Uuid(as_uuid=False), ForeignKey("trips.id"), index=True)
 
     # Relationships
     trip = relationship("Trip", back_populates="itinerary")
@@ -135,18 +229,56 @@ class Itinerary(Base):
 class Wallet(Base):
     __tablename__ = "wallets"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
-    balance = Column(Float, default=0.0)
-    user_id = Column(String, ForeignKey("users.id"))
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
+    # Running balance in minor units (paise for INR): the sum of the
+    # wallet's entries, maintained by app.wallet.ledger.
+    balance = Column(BigInteger, nullable=False, default=0)
+    currency = Column(String(3), nullable=False, default="INR")
+    # Bumped on every balance change; writers check it before committing.
+    version = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    user_id = Column(Uuid(as_uuid=False), ForeignKey("users.id"), index=True)
 
     # Relationships
     user = relationship("User", back_populates="wallets")
+    entries = relationship("WalletEntry", back_populates="wallet")
+
+
+class WalletEntry(Base):
+    """Append-only ledger line; never updated or deleted."""
+
+    __tablename__ = "wallet_entries"
+
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
+    wallet_id = Column(Uuid(as_uuid=False), ForeignKey("wallets.id"), nullable=False)
+    # Signed, in the wallet's minor units.
+    amount = Column(BigInteger, nullable=False)
+    balance_after = Column(BigInteger, nullable=False)
+    kind = Column(
+        Enum(
+            "opening",
+            "top_up",
+            "spend",
+            "transfer",
+            name="wallet_entry_kinds",
+        ),
+        nullable=False,
+    )
+    # Shared by both legs of a transfer.
+    transfer_id = Column(Uuid(as_uuid=False), nullable=True)
+    reference = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+    # Ids are time-ordered, so this index serves statements newest first.
+    __table_args__ = (Index("ix_wallet_entries_wallet_id_id", wallet_id, id),)
+
+    wallet = relationship("Wallet", back_populates="entries")
 
 
 class ItineraryItem(Base):
     __tablename__ = "itinerary_items"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
     name = Column(String)
     description = Column(String)
     img = Column(String)
@@ -160,7 +292,7 @@ class ItineraryItem(Base):
             name="itenary_categories",
         ),
     )
-    itinerary_id = Column(String, ForeignKey("itineraries.id"))
+    itinerary_id = Column(Uuid(as_uuid=False), ForeignKey("itineraries.id"), index=True)
 
     # Relationships
     itinerary = relationship("Itinerary", back_populates="items")
@@ -170,11 +302,19 @@ class ItineraryItem(Base):
 class ItineraryItemLink(Base):
     __tablename__ = "itinerary_item_links"
 
-    id = Column(String, primary_key=True, default=generate_uuid, index=True)
-    itinerary_item_id = Column(String, ForeignKey("itinerary_items.id"))
-    activity_id = Column(String, ForeignKey("activities.id"), nullable=True)
-    sight_id = Column(String, ForeignKey("sights.id"), nullable=True)
-    hotel_id = Column(String, ForeignKey("hotels.id"), nullable=True)
+    id = Column(Uuid(as_uuid=False), primary_key=True, default=generate_uuid)
+    itinerary_item_id = Column(
+        Uuid(as_uuid=False), ForeignKey("itinerary_items.id"), index=True
+    )
+    activity_id = Column(
+        Uuid(as_uuid=False), ForeignKey("activities.id"), nullable=True, index=True
+    )
+    sight_id = Column(
+        Uuid(as_uuid=False), ForeignKey("sights.id"), nullable=True, index=True
+    )
+    hotel_id = Column(
+        Uuid(as_uuid=False), ForeignKey("hotels.id"), nullable=True, index=True
+    )
 
     # Relationships
     itinerary_item = relationship("ItineraryItem", back_populates="links")
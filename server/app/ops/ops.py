@@ -0,0 +1,103 @@
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth.auth_bearer import bearer_scheme, principals
+from app.cache import caches
+from app import db, metrics
+from app.translator import stream, upload
+from app.translator.translator import job_workers
+from app.upstream import upstreams
+from app.wallet.ledger import ledger
+
+OPS_TOKEN = os.getenv("OPS_TOKEN")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1"}
+
+
+async def require_ops_access(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    """Keep operational endpoints away from API users.
+
+    With OPS_TOKEN set it must be sent as the bearer token. Without it, only
+    direct connections from this host are allowed, not ones relayed by a proxy.
+    """
+    if OPS_TOKEN:
+        if credentials and secrets.compare_digest(
+            credentials.credentials.encode(), OPS_TOKEN.encode()
+        ):
+            return
+    elif (
+        request.client
+        and request.client.host in LOOPBACK_HOSTS
+        and "x-forwarded-for" not in request.headers
+    ):
+        return
+    raise HTTPException(status_code=403, detail="Not allowed.")
+
+
+ops_router = APIRouter(dependencies=[Depends(require_ops_access)])
+# Served at the root, where Prometheus scrapes by default.
+metrics_router = APIRouter(dependencies=[Depends(require_ops_access)])
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@ops_router.get("/cache", summary="Response cache statistics")
+async def cache_stats():
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    stats["principals"] = principals.stats()
+    return stats
+
+
+@ops_router.get("/uploads", summary="Audio upload statistics")
+async def upload_stats():
+    return {**upload.stats, "max_bytes": upload.MAX_AUDIO_BYTES}
+
+
+@ops_router.get("/upstreams", summary="Outbound call statistics per upstream")
+async def upstream_stats():
+    return {name: upstream.stats() for name, upstream in upstreams.items()}
+
+
+@ops_router.get("/db", summary="Database connection pool statistics")
+async def db_stats():
+    return {
+        "config": {
+            "pool_size": db.DB_POOL_SIZE,
+            "max_overflow": db.DB_MAX_OVERFLOW,
+            "pool_timeout": db.DB_POOL_TIMEOUT,
+            "pool_recycle": db.DB_POOL_RECYCLE,
+            "pool_pre_ping": db.DB_POOL_PRE_PING,
+        },
+        "pools": {name: stats.stats() for name, stats in db.pool_stats.items()},
+        "replicas": db.replicas.stats(),
+        "write_marker_errors": db.write_marker_errors,
+    }
+
+
+@ops_router.get("/stream", summary="Live translation stream statistics")
+async def stream_stats():
+    return {**stream.stats, "max_connections": stream.STREAM_MAX_CONNECTIONS}
+
+
+@ops_router.get("/jobs", summary="Translation job worker statistics")
+async def job_stats():
+    return job_workers.stats()
+
+
+@ops_router.get("/wallet", summary="Ledger batching statistics")
+async def wallet_stats():
+    return ledger.stats()
+
+
+@ops_router.get("/startup", summary="Import and lifespan timings of this worker")
+async def startup_stats(request: Request):
+    return getattr(request.app.state, "startup", None)
@@ -1,4 +1,8 @@
-from pydantic import BaseModel, EmailStr
+import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, EmailStr, Field
 
 
 class UserAuth(BaseModel):
@@ -16,3 +20,164 @@ class UserOut(BaseModel):
 class TokenSchema(BaseModel):
     access_token: str
     refresh_token: str
+
+
+class BatchTranslationIn(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=1000)
+    target_languages: List[str] = Field(..., min_length=1, max_length=20)
+
+
+class TranslatedText(BaseModel):
+    translated_text: str
+    detected_source_language: Optional[str] = None
+
+
+class BatchTranslationResult(BaseModel):
+    text: str
+    translations: Dict[str, TranslatedText]
+
+
+class BatchTranslationOut(BaseModel):
+    results: List[BatchTranslationResult]
+
+
+# Catalog rows. Every field is optional because clients can ask for a
+# sparse fieldset.
+class HotelOut(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    rating: Optional[float] = None
+    location: Optional[str] = None
+    description: Optional[str] = None
+    amenities: Optional[Any] = None
+    image: Optional[str] = None
+    booking_url: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class ActivityOut(BaseModel):
+    id: Optional[str] = None
+    time: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    location: Optional[str] = None
+    image: Optional[str] = None
+    booking_url: Optional[str] = None
+    duration: Optional[str] = None
+    category: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class SightOut(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    location: Optional[str] = None
+    description: Optional[str] = None
+    image: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+class TripData(BaseModel):
+    hotels: List[HotelOut]
+    activities: List[ActivityOut]
+    attractions: List[SightOut]
+    start_date: str
+    end_date: str
+    travelers: int
+    destination: str
+
+
+class TripOut(BaseModel):
+    data: TripData
+
+
+class NearbyHotel(HotelOut):
+    distance_m: float
+
+
+class NearbyActivity(ActivityOut):
+    distance_m: float
+
+
+class NearbySight(SightOut):
+    distance_m: float
+
+
+class NearbyOut(BaseModel):
+    hotels: Optional[List[NearbyHotel]] = None
+    activities: Optional[List[NearbyActivity]] = None
+    attractions: Optional[List[NearbySight]] = None
+
+
+class TranslationOut(BaseModel):
+    id: str
+    original_text: Optional[str] = None
+    translation: Optional[str] = None
+    target_language: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    user_id: Optional[str] = None
+
+
+class HistoryPage(BaseModel):
+    items: List[TranslationOut]
+    next_cursor: Optional[str] = None
+
+
+class TranslationJobOut(BaseModel):
+    id: str
+    # queued, running, done or failed
+    status: str
+    target_language: str
+    attempts: int
+    error: Optional[str] = None
+    original_text: Optional[str] = None
+    translation: Optional[str] = None
+    source_language: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+
+class PlanIn(BaseModel):
+    day_minutes: int = Field(8 * 60, ge=60, le=16 * 60)
+    budget: Optional[float] = Field(None, ge=0)
+
+
+class WalletIn(BaseModel):
+    currency: str = Field("INR", pattern="^[A-Z]{3}$")
+
+
+class WalletOut(BaseModel):
+    id: str
+    currency: str
+    # Minor units (paise for INR).
+    balance: int
+    created_at: Optional[datetime.datetime] = None
+
+
+class AmountIn(BaseModel):
+    # Minor units; at most 10^12 per posting.
+    amount: int = Field(..., gt=0, le=10**12)
+    reference: Optional[str] = Field(None, max_length=200)
+
+
+class TransferIn(AmountIn):
+    to_wallet_id: UUID
+
+
+class EntryOut(BaseModel):
+    id: str
+    wallet_id: str
+    amount: int
+    balance_after: int
+    kind: str
+    transfer_id: Optional[str] = None
+    reference: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+
+
+class EntryPage(BaseModel):
+    items: List[EntryOut]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,166 @@
+"""Content-addressed caches for transcriptions and translations.
+
+Transcripts are keyed on the SHA-256 of the uploaded audio and translations
+on the SHA-256 of the normalized text plus the target language. Both are
+persisted in the database, and concurrent misses for the same key share a
+single upstream call.
+
+Lookups and stores each use their own short session. None is open while
+the upstream call is awaited, so a slow Whisper or Translate round trip
+never pins a pooled connection (or, on SQLite, a read lock).
+"""
+
+import asyncio
+import hashlib
+import re
+import unicodedata
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.cache import SingleFlight
+from app.db import AsyncSessionLocal
+from app.models import TranscriptCache, TranslationCache
+
+transcripts = SingleFlight()
+translations = SingleFlight()
+
+_space_re = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _space_re.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+async def _store(row):
+    async with AsyncSessionLocal() as db:
+        db.add(row)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another worker stored the same key first.
+            await db.rollback()
+
+
+async def _store_many(rows: list):
+    async with AsyncSessionLocal() as db:
+        db.add_all(rows)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Some keys were stored concurrently; fall back to one row at a time.
+            await db.rollback()
+            for row in rows:
+                await db.merge(row)
+            await db.commit()
+
+
+async def cached_transcription(audio_sha256: str, transcribe) -> str:
+    """Transcript for the audio with this digest, calling ``transcribe`` on a miss."""
+
+    async def load():
+        async with AsyncSessionLocal() as db:
+            row = await db.get(TranscriptCache, audio_sha256)
+        if row is not None:
+            return row.text
+        text = await transcribe()
+        await _store(TranscriptCache(audio_sha256=audio_sha256, text=text))
+        return text
+
+    return await transcripts.do(audio_sha256, load)
+
+
+async def cached_translation(text: str, target_language: str, translate) -> dict:
+    """Translation of ``text``, calling ``translate(text)`` on a miss.
+
+    ``translate`` returns the same dict shape as ``translate_text``.
+    """
+    key = (text_sha256(text), target_language)
+
+    async def load():
+        async with AsyncSessionLocal() as db:
+            row = await db.get(TranslationCache, key)
+        if row is not None:
+            return {
+                "input_text": text,
+                "translated_text": row.translated_text,
+                "detected_source_language": row.detected_source_language,
+            }
+        result = await translate(text)
+        await _store(
+            TranslationCache(
+                text_sha256=key[0],
+                target_language=target_language,
+                translated_text=result["translated_text"],
+                detected_source_language=result["detected_source_language"],
+            )
+        )
+        return result
+
+    return await translations.do(key, load)
+
+
+async def cached_translations(texts: list, target_language: str, translate_many) -> list:
+    """Translations for many texts into one language, in input order.
+
+    Cached texts are served from one lookup query; the rest are deduplicated
+    and passed to ``translate_many(texts)``, which returns a list of dicts in
+    ``translate_text`` shape. Texts already being translated by another
+    request are awaited rather than sent again.
+    """
+    keys = [text_sha256(text) for text in texts]
+    found = {}
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(
+            select(TranslationCache).where(
+                TranslationCache.target_language == target_language,
+                TranslationCache.text_sha256.in_(set(keys)),
+            )
+        )
+        for row in rows:
+            found[row.text_sha256] = {
+                "translated_text": row.translated_text,
+                "detected_source_language": row.detected_source_language,
+            }
+
+    in_flight = {}
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key in found or key in missing or key in in_flight:
+            continue
+        task = translations.pending((key, target_language))
+        if task is not None:
+            in_flight[key] = task
+        else:
+            missing[key] = text
+
+    if missing:
+        results = await translate_many(list(missing.values()))
+        for key, result in zip(missing, results):
+            found[key] = result
+        await _store_many(
+            [
+                TranslationCache(
+                    text_sha256=key,
+                    target_language=target_language,
+                    translated_text=found[key]["translated_text"],
+                    detected_source_language=found[key]["detected_source_language"],
+                )
+                for key in missing
+            ]
+        )
+    for key, task in in_flight.items():
+        found[key] = await asyncio.shield(task)
+
+    return [
+        {
+            "input_text": text,
+            "translated_text": found[key]["translated_text"],
+            "detected_source_language": found[key]["detected_source_language"],
+        }
+        for key, text in zip(keys, texts)
+    ]
@@ -0,0 +1,92 @@
+"""Keyset pagination over a user's translation history.
+
+Pages are ordered newest first on ``(created_at, id)``. Each page continues
+from an opaque cursor holding the last row's key, so every page is a range
+scan of the ``(user_id, created_at DESC, id DESC)`` index, however deep it
+is. Rows without a ``created_at`` come after all dated ones, newest id
+first, and are read with a second range scan of the same index.
+"""
+
+import base64
+import binascii
+import datetime
+import uuid
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Translator
+from app.schemas import TranslationOut
+
+MAX_PAGE_SIZE = 100
+
+# Columns selected for history responses.
+HISTORY_COLUMNS = [getattr(Translator, field) for field in TranslationOut.model_fields]
+
+
+def encode_cursor(row: dict) -> str:
+    created_at = row["created_at"] and row["created_at"].isoformat()
+    key = orjson.dumps([created_at, row["id"]])
+    return base64.urlsafe_b64encode(key).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """``(created_at, id)`` of a cursor; ``created_at`` is None for undated rows."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = orjson.loads(raw)
+        if created_at is not None:
+            created_at = datetime.datetime.fromisoformat(created_at)
+        return created_at, str(uuid.UUID(row_id))
+    except (AttributeError, binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+async def history_page(
+    db: AsyncSession,
+    user_id: str,
+    limit: int,
+    cursor: str = None,
+    target_language: str = None,
+    since: datetime.datetime = None,
+    until: datetime.datetime = None,
+) -> tuple:
+    """Up to ``limit`` translations, newest first, and the next page's cursor."""
+    query = select(*HISTORY_COLUMNS).where(Translator.user_id == user_id)
+    if target_language:
+        query = query.where(Translator.target_language == target_language)
+    created_at, row_id = decode_cursor(cursor) if cursor else (None, None)
+
+    rows = []
+    if cursor is None or created_at is not None:
+        dated = query.where(Translator.created_at.isnot(None))
+        if since:
+            dated = dated.where(Translator.created_at >= since)
+        if until:
+            dated = dated.where(Translator.created_at < until)
+        if cursor:
+            key = tuple_(Translator.created_at, Translator.id)
+            # Bound with the columns' own types so the id compares as a UUID.
+            after = tuple_(created_at, row_id, types=[col.type for col in key.clauses])
+            dated = dated.where(key < after)
+        result = await db.execute(
+            dated.order_by(Translator.created_at.desc(), Translator.id.desc()).limit(
+                limit + 1
+            )
+        )
+        rows = [dict(row) for row in result.mappings()]
+
+    # A time range can only match dated rows.
+    if len(rows) <= limit and not (since or until):
+        undated = query.where(Translator.created_at.is_(None))
+        if row_id is not None and created_at is None:
+            undated = undated.where(Translator.id < row_id)
+        result = await db.execute(
+            undated.order_by(Translator.id.desc()).limit(limit + 1 - len(rows))
+        )
+        rows += [dict(row) for row in result.mappings()]
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
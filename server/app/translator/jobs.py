@@ -0,0 +1,465 @@
+"""Background transcription and translation jobs.
+
+``POST /translator/jobs`` copies the upload to JOB_AUDIO_DIR, records a
+``TranslationJob`` and answers right away. ``JobWorkers`` runs up to
+JOB_WORKERS jobs at a time in each app process. Failures caused by an
+upstream (a 5xx from ``Upstream``) are retried with exponential backoff
+and full jitter, up to JOB_MAX_ATTEMPTS claims in all.
+
+The job rows are the source of truth. A worker claims a job by flipping it
+from queued to running under a lease of JOB_LEASE seconds. That makes it
+safe for any number of processes to share the table. If a worker dies,
+its job is queued again once the lease runs out. Each claim increments
+``attempts``, and results are only written by the claim that still holds
+it.
+
+The queue backend only decides which job ids a worker looks at next:
+
+- ``SQLJobQueue`` (the default, ``JOB_QUEUE_URL=sql://``) polls the table
+  every JOB_POLL_INTERVAL seconds. It wakes early when this process
+  enqueues.
+- ``InMemoryJobQueue`` (``memory://``) hands ids to workers over an asyncio
+  queue, without polling. Use it for a single process.
+
+Every process that runs workers must see the same JOB_AUDIO_DIR.
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import random
+import shutil
+import tempfile
+from collections import defaultdict, deque
+
+import orjson
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.db import AsyncSessionLocal, mark_write
+from app.models import TranslationJob, Translator
+from app.schemas import TranslationJobOut
+from app.translator.upload import CHUNK_SIZE, AudioUpload
+from app.utils import generate_uuid
+
+load_dotenv()
+
+JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL") or "sql://"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", 2))
+# Longer than one attempt can take: Whisper's timeout times its retries.
+JOB_LEASE = float(os.getenv("JOB_LEASE", 300))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+JOB_AUDIO_DIR = os.getenv("JOB_AUDIO_DIR") or os.path.join(
+    tempfile.gettempdir(), "translation-jobs"
+)
+
+FINISHED = {"done", "failed"}
+JOB_FIELDS = list(TranslationJobOut.model_fields)
+
+# Pause after an unexpected error in a worker loop, e.g. the database is down.
+ERROR_BACKOFF = 5
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def serialize_job(job: TranslationJob) -> dict:
+    return {field: getattr(job, field) for field in JOB_FIELDS}
+
+
+def audio_path(job_id: str) -> str:
+    return os.path.join(JOB_AUDIO_DIR, job_id)
+
+
+def _copy_audio(source, path: str):
+    os.makedirs(JOB_AUDIO_DIR, exist_ok=True)
+    source.seek(0)
+    partial = f"{path}.part"
+    with open(partial, "wb") as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+    os.replace(partial, path)
+
+
+def _remove_audio(job_id: str):
+    try:
+        os.remove(audio_path(job_id))
+    except FileNotFoundError:
+        pass
+
+
+class JobEvents:
+    """Wakes event streams in this process when one of their jobs changes."""
+
+    def __init__(self):
+        self._waiters = defaultdict(set)
+
+    def notify(self, job_id: str):
+        for waiter in self._waiters.get(job_id, ()):
+            waiter.set()
+
+    async def wait(self, job_id: str, timeout: float):
+        """Return on the next change to ``job_id``, or after ``timeout``."""
+        waiter = asyncio.Event()
+        self._waiters[job_id].add(waiter)
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters[job_id].discard(waiter)
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+
+
+events = JobEvents()
+
+
+class SQLJobQueue:
+    def __init__(self, poll_interval: float = JOB_POLL_INTERVAL, batch: int = None):
+        self.poll_interval = poll_interval
+        self.batch = max(1, batch or JOB_WORKERS)
+        self.polls = 0
+        self._ready = deque()
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    async def put(self, job_id: str, delay: float = 0):
+        # The row itself is the queue entry; run_after covers any delay.
+        if not delay:
+            self._wake.set()
+
+    async def _due(self) -> list:
+        self.polls += 1
+        async with AsyncSessionLocal() as db:
+            result = await db.scalars(
+                select(TranslationJob.id)
+                .where(
+                    TranslationJob.status == "queued",
+                    TranslationJob.run_after <= datetime.datetime.now(),
+                )
+                .order_by(TranslationJob.run_after)
+                .limit(self.batch)
+            )
+            return list(result)
+
+    async def get(self) -> str:
+        # One worker polls at a time; the rest take from what it found.
+        async with self._lock:
+            while not self._ready:
+                self._wake.clear()
+                self._ready.extend(await self._due())
+                if self._ready:
+                    break
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            return self._ready.popleft()
+
+
+class InMemoryJobQueue:
+    def __init__(self):
+        self._queue = asyncio.Queue()
+
+    async def put(self, job_id: str, delay: float = 0):
+        if delay:
+            asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job_id)
+        else:
+            self._queue.put_nowait(job_id)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+
+def queue_from_url(url: str):
+    if url.startswith("sql://"):
+        return SQLJobQueue()
+    if url.startswith("memory://"):
+        return InMemoryJobQueue()
+    raise ValueError(f"Unsupported JOB_QUEUE_URL: {url}")
+
+
+job_queue = queue_from_url(JOB_QUEUE_URL)
+
+
+async def submit(db, user_id: str, audio: AudioUpload, target_language: str):
+    """Store ``audio`` and queue a job for it."""
+    job = TranslationJob(
+        id=generate_uuid(),
+        user_id=user_id,
+        status="queued",
+        target_language=target_language,
+        filename=audio.filename,
+        audio_sha256=audio.sha256,
+        audio_size=audio.size,
+        attempts=0,
+    )
+    path = audio_path(job.id)
+    await asyncio.to_thread(_copy_audio, audio.file, path)
+    db.add(job)
+    try:
+        await db.commit()
+    except Exception:
+        _remove_audio(job.id)
+        raise
+    await job_queue.put(job.id)
+    return job
+
+
+async def job_stream(job_id: str, heartbeat: float = 15):
+    """Server-sent events for one job: its state on every change, then close.
+
+    Changes made in this process are pushed at once; changes made by other
+    processes are picked up by polling every JOB_POLL_INTERVAL seconds.
+    """
+    last = None
+    idle = 0.0
+    while True:
+        async with AsyncSessionLocal() as db:
+            job = await db.get(TranslationJob, job_id)
+        if job is None:
+            return
+        state = orjson.dumps(serialize_job(job))
+        if state != last:
+            last, idle = state, 0.0
+            yield b"event: " + job.status.encode() + b"\ndata: " + state + b"\n\n"
+            if job.status in FINISHED:
+                return
+        elif idle >= heartbeat:
+            # Keeps proxies from closing a quiet stream.
+            idle = 0.0
+            yield b": keep-alive\n\n"
+        await events.wait(job_id, JOB_POLL_INTERVAL)
+        idle += JOB_POLL_INTERVAL
+
+
+class JobWorkers:
+    """A fixed pool of tasks that claim and run jobs from ``queue``.
+
+    ``handler(job)`` does the work and returns the result fields
+    (``original_text``, ``translation``, ``source_language``).
+    """
+
+    def __init__(self, handler, queue=None, concurrency: int = JOB_WORKERS):
+        self.handler = handler
+        self.queue = queue or job_queue
+        self.concurrency = concurrency
+        self.running = 0
+        self.claimed = 0
+        self.missed = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.requeued = 0
+        self._tasks = []
+        # Ids being claimed here; a queue can hand out an id again before
+        # its claim commits.
+        self._claiming = set()
+
+    def start(self):
+        """Start the workers; nothing touches the database until they run."""
+        if self._tasks or not self.concurrency:
+            return
+        self._tasks = [
+            asyncio.create_task(self._work()) for _ in range(self.concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            try:
+                job_id = await self.queue.get()
+                await self.run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Translation job worker error")
+                await asyncio.sleep(ERROR_BACKOFF)
+
+    async def _sweep(self):
+        """Queue jobs left behind by stopped workers, now and every lease/4."""
+        first = True
+        while True:
+            try:
+                await self.requeue_expired(include_queued=first)
+                first = False
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Translation job sweep failed")
+            await asyncio.sleep(JOB_LEASE / 4)
+
+    async def requeue_expired(self, include_queued: bool = False) -> int:
+        now = datetime.datetime.now()
+        async with AsyncSessionLocal() as db:
+            expired = list(
+                await db.scalars(
+                    select(TranslationJob.id).where(
+                        TranslationJob.status == "running",
+                        TranslationJob.locked_until < now,
+                    )
+                )
+            )
+            if expired:
+                await db.execute(
+                    update(TranslationJob)
+                    .where(
+                        TranslationJob.id.in_(expired),
+                        TranslationJob.status == "running",
+                        TranslationJob.locked_until < now,
+                    )
+                    .values(status="queued", locked_until=None, run_after=now)
+                )
+                await db.commit()
+            # After a restart, jobs queued in memory by the old process are
+            # only known to the table.
+            queued = []
+            if include_queued:
+                queued = list(
+                    await db.scalars(
+                        select(TranslationJob.id).where(
+                            TranslationJob.status == "queued"
+                        )
+                    )
+                )
+        self.requeued += len(expired)
+        for job_id in dict.fromkeys(expired + queued):
+            await self.queue.put(job_id)
+        return len(expired)
+
+    async def _claim(self, job_id: str):
+        now = datetime.datetime.now()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(TranslationJob)
+                .where(TranslationJob.id == job_id, TranslationJob.status == "queued")
+                .values(
+                    status="running",
+                    attempts=TranslationJob.attempts + 1,
+                    locked_until=now + datetime.timedelta(seconds=JOB_LEASE),
+                )
+            )
+            await db.commit()
+            if result.rowcount != 1:
+                return None
+            return await db.get(TranslationJob, job_id)
+
+    def _held(self, job: TranslationJob):
+        """Filter matching only while ``job``'s claim is still the current one."""
+        return (
+            TranslationJob.id == job.id,
+            TranslationJob.status == "running",
+            TranslationJob.attempts == job.attempts,
+        )
+
+    async def run(self, job_id: str):
+        if job_id in self._claiming:
+            self.missed += 1
+            return
+        self._claiming.add(job_id)
+        try:
+            job = await self._claim(job_id)
+        finally:
+            self._claiming.discard(job_id)
+        if job is None:
+            # Claimed by another worker, or no longer queued.
+            self.missed += 1
+            return
+        self.claimed += 1
+        self.running += 1
+        try:
+            result = await self.handler(job)
+        except Exception as e:
+            await self._fail(job, e)
+        else:
+            await self._finish(job, result)
+        finally:
+            self.running -= 1
+            events.notify(job.id)
+
+    async def _finish(self, job: TranslationJob, result: dict):
+        async with AsyncSessionLocal() as db:
+            updated = await db.execute(
+                update(TranslationJob)
+                .where(*self._held(job))
+                .values(
+                    status="done",
+                    error=None,
+                    locked_until=None,
+                    finished_at=datetime.datetime.now(),
+                    original_text=result["original_text"],
+                    translation=result["translation"],
+                    source_language=result["source_language"],
+                )
+            )
+            if updated.rowcount != 1:
+                # The lease ran out and another claim owns the job now.
+                await db.rollback()
+                return
+            db.add(
+                Translator(
+                    original_text=result["original_text"],
+                    translation=result["translation"],
+                    target_language=job.target_language,
+                    user_id=job.user_id,
+                )
+            )
+            await db.commit()
+        await mark_write(job.user_id)
+        self.succeeded += 1
+        _remove_audio(job.id)
+
+    async def _fail(self, job: TranslationJob, error: Exception):
+        if isinstance(error, HTTPException):
+            detail, transient = str(error.detail), error.status_code >= 500
+        else:
+            logger.exception("Translation job %s failed", job.id, exc_info=error)
+            detail, transient = f"{type(error).__name__}: {error}", True
+        retry = transient and job.attempts < JOB_MAX_ATTEMPTS
+        now = datetime.datetime.now()
+        if retry:
+            delay = random.uniform(0, JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1))
+            values = {
+                "status": "queued",
+                "run_after": now + datetime.timedelta(seconds=delay),
+            }
+        else:
+            values = {"status": "failed", "finished_at": now}
+        async with AsyncSessionLocal() as db:
+            updated = await db.execute(
+                update(TranslationJob)
+                .where(*self._held(job))
+                .values(error=detail, locked_until=None, **values)
+            )
+            await db.commit()
+        if updated.rowcount != 1:
+            return
+        if retry:
+            self.retried += 1
+            await self.queue.put(job.id, delay)
+        else:
+            self.failed += 1
+            _remove_audio(job.id)
+
+    def stats(self) -> dict:
+        return {
+            "queue": type(self.queue).__name__,
+            "workers": self.concurrency,
+            "running": self.running,
+            "claimed": self.claimed,
+            "missed": self.missed,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "polls": getattr(self.queue, "polls", None),
+        }
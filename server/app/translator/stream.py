@@ -0,0 +1,374 @@
+"""Live transcription and translation over a WebSocket.
+
+The client sends 16-bit little-endian mono PCM as binary frames while the
+user speaks. ``Segmenter`` cuts the stream into utterances at pauses of
+STREAM_SILENCE_MS, or every STREAM_MAX_SEGMENT_SECONDS at the latest. Each
+utterance is wrapped as a WAV file and transcribed, and the transcript is
+translated. The client is sent JSON messages:
+
+- ``{"type": "ready", ...}`` once the stream is accepted;
+- ``{"type": "partial", "segment": n, "text": ...}``: the utterance still
+  being spoken, re-transcribed every STREAM_PARTIAL_SECONDS of new audio.
+  Partials are best effort; they are skipped while the transcription
+  backend is saturated;
+- ``{"type": "final", "segment": n, "text", "translation",
+  "source_language"}``, once per utterance, in order;
+- ``{"type": "error", "segment": n, "detail": ...}`` when an utterance
+  could not be processed; the stream carries on;
+- ``{"type": "end"}`` after the client sent ``{"type": "end"}`` and every
+  utterance was answered.
+
+Memory per connection is bounded. Frames over STREAM_MAX_FRAME_BYTES close
+the stream, and one utterance never exceeds STREAM_MAX_SEGMENT_SECONDS.
+At most STREAM_MAX_PENDING_SEGMENTS finished utterances wait for
+transcription. Beyond that, the server stops reading and TCP pushes back
+on the client.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import time
+import wave
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+import orjson
+from dotenv import load_dotenv
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from starlette import status
+
+from app.db import AsyncSessionLocal, mark_write
+from app.models import Translator
+from app.upstream import clients, whisper
+
+load_dotenv()
+
+STREAM_MAX_CONNECTIONS = int(os.getenv("STREAM_MAX_CONNECTIONS", 100))
+STREAM_MAX_FRAME_BYTES = int(os.getenv("STREAM_MAX_FRAME_BYTES", 64 * 1024))
+STREAM_MAX_SEGMENT_SECONDS = float(os.getenv("STREAM_MAX_SEGMENT_SECONDS", 15))
+STREAM_MAX_PENDING_SEGMENTS = int(os.getenv("STREAM_MAX_PENDING_SEGMENTS", 2))
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", 900))
+STREAM_SILENCE_MS = float(os.getenv("STREAM_SILENCE_MS", 600))
+# RMS of 16-bit samples above which a 20 ms window counts as speech.
+STREAM_SILENCE_THRESHOLD = float(os.getenv("STREAM_SILENCE_THRESHOLD", 500))
+STREAM_PARTIAL_SECONDS = float(os.getenv("STREAM_PARTIAL_SECONDS", 1.5))
+
+WINDOW_MS = 20
+# Silence kept in front of an utterance so its first syllable is not clipped.
+PREROLL_MS = 200
+# Characters of the previous utterance given to Whisper as context.
+PROMPT_CHARS = 200
+
+logger = logging.getLogger("uvicorn.error")
+
+stats = {
+    "connections": 0,
+    "active": 0,
+    "rejected": 0,
+    "audio_seconds": 0.0,
+    "segments": 0,
+    "partials": 0,
+    "partials_skipped": 0,
+    "errors": 0,
+}
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class Segmenter:
+    """Cuts 16-bit mono PCM into utterances at pauses.
+
+    ``feed`` returns the utterances it completed. The one in progress is
+    ``current`` (empty until speech starts) and ``flush`` ends it early.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        silence_ms: float = STREAM_SILENCE_MS,
+        max_seconds: float = STREAM_MAX_SEGMENT_SECONDS,
+        threshold: float = STREAM_SILENCE_THRESHOLD,
+    ):
+        self.window = sample_rate * WINDOW_MS // 1000 * 2
+        self.silence_windows = max(1, int(silence_ms // WINDOW_MS))
+        self.max_bytes = int(max_seconds * sample_rate) * 2
+        self.threshold = threshold
+        self.current = bytearray()
+        self._preroll = deque(maxlen=PREROLL_MS // WINDOW_MS)
+        self._silent = 0
+        self._pending = b""
+
+    def feed(self, pcm: bytes) -> list:
+        data = self._pending + pcm
+        whole = len(data) - len(data) % self.window
+        self._pending = data[whole:]
+        if not whole:
+            return []
+        samples = np.frombuffer(data[:whole], dtype="<i2").astype(np.float32)
+        rms = np.sqrt(np.mean(samples.reshape(-1, self.window // 2) ** 2, axis=1))
+
+        segments = []
+        for i, loud in enumerate(rms >= self.threshold):
+            chunk = data[i * self.window : (i + 1) * self.window]
+            if not self.current:
+                if not loud:
+                    self._preroll.append(chunk)
+                    continue
+                self.current.extend(b"".join(self._preroll))
+                self._preroll.clear()
+            self.current.extend(chunk)
+            self._silent = 0 if loud else self._silent + 1
+            paused = self._silent >= self.silence_windows
+            if paused or len(self.current) >= self.max_bytes:
+                segments.append(self.flush())
+        return segments
+
+    def flush(self) -> bytes:
+        segment = bytes(self.current)
+        self.current.clear()
+        self._silent = 0
+        return segment
+
+
+class TranscriptionBackend(ABC):
+    """Turns one WAV utterance into text.
+
+    The app uses ``backend`` below. Replace it to run the stream against a
+    local fake.
+    """
+
+    def busy(self) -> bool:
+        """True when a best-effort call (a partial) should be skipped."""
+        return False
+
+    @abstractmethod
+    async def transcribe(
+        self, wav: bytes, language: str = None, prompt: str = None
+    ) -> str:
+        """Text spoken in ``wav``; ``prompt`` is context from earlier speech."""
+
+
+class WhisperBackend(TranscriptionBackend):
+    def busy(self) -> bool:
+        return whisper.waiting > 0 or whisper.in_flight >= whisper.concurrency
+
+    async def transcribe(
+        self, wav: bytes, language: str = None, prompt: str = None
+    ) -> str:
+        options = {"language": language, "prompt": prompt}
+        options = {key: value for key, value in options.items() if value}
+        transcription = await whisper.call(
+            lambda: clients.openai.audio.transcriptions.create(
+                model="whisper-1", file=("segment.wav", wav), **options
+            )
+        )
+        return transcription.text
+
+
+backend = WhisperBackend()
+
+
+class StreamSession:
+    """One client's stream.
+
+    ``translate(text)`` returns a dict in ``translate_text`` shape.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        target_language: str,
+        translate,
+        sample_rate: int = 16000,
+        language: str = None,
+        transcriber: TranscriptionBackend = None,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.target_language = target_language
+        self.translate = translate
+        self.sample_rate = sample_rate
+        self.language = language
+        self.transcriber = transcriber or backend
+        self.segmenter = Segmenter(sample_rate)
+        self.partial_bytes = int(STREAM_PARTIAL_SECONDS * sample_rate) * 2
+        self.received = 0
+        # Index of the utterance in progress, and of the next one to be
+        # answered with a final.
+        self.segment = 0
+        self.finalized = 0
+        self.context = None
+        self._partial = None
+        self._partial_mark = 0
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, message: dict):
+        async with self._send_lock:
+            await self.websocket.send_text(orjson.dumps(message).decode())
+
+    async def run(self):
+        if stats["active"] >= STREAM_MAX_CONNECTIONS:
+            stats["rejected"] += 1
+            # Accepted first so the client sees the close code.
+            await self.websocket.accept()
+            await self.websocket.close(status.WS_1013_TRY_AGAIN_LATER)
+            return
+        stats["connections"] += 1
+        stats["active"] += 1
+        pending = asyncio.Queue(maxsize=STREAM_MAX_PENDING_SEGMENTS)
+        finals = receiving = None
+        try:
+            await self.websocket.accept()
+            await self.send({"type": "ready", "sample_rate": self.sample_rate})
+            finals = asyncio.create_task(self._finals(pending))
+            receiving = asyncio.create_task(self._receive(pending))
+            done, _ = await asyncio.wait(
+                {finals, receiving}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if finals in done:
+                # Finals only end after the end marker, so this is a failure;
+                # _receive may be blocked on the queue nobody drains any more.
+                receiving.cancel()
+                finals.result()
+            code = receiving.result()
+            if code is not None:
+                await self.websocket.close(code)
+                return
+            await finals
+            await self.send({"type": "end"})
+            await self.websocket.close()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            stats["active"] -= 1
+            for task in (finals, receiving, self._partial):
+                if task is not None:
+                    task.cancel()
+
+    async def _cut(self, pending: asyncio.Queue, pcm: bytes):
+        self._partial_mark = 0
+        index, self.segment = self.segment, self.segment + 1
+        # Blocks while transcription is behind: backpressure on the client.
+        await pending.put((index, pcm))
+
+    async def _receive(self, pending: asyncio.Queue):
+        """Read frames until the client ends the stream, then queue the end
+        marker; returns a close code if the stream has to be cut off instead."""
+        max_bytes = int(STREAM_MAX_SECONDS * self.sample_rate) * 2
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            pcm = message.get("bytes")
+            if pcm is None:
+                try:
+                    control = orjson.loads(message.get("text") or "{}")
+                except orjson.JSONDecodeError:
+                    control = {}
+                if control.get("type") == "end":
+                    if self.segmenter.current:
+                        await self._cut(pending, self.segmenter.flush())
+                    await pending.put(None)
+                    return None
+                continue
+            if len(pcm) > STREAM_MAX_FRAME_BYTES:
+                return status.WS_1009_MESSAGE_TOO_BIG
+            self.received += len(pcm)
+            stats["audio_seconds"] += len(pcm) / 2 / self.sample_rate
+            if self.received > max_bytes:
+                await self.send({"type": "error", "detail": "Stream too long."})
+                return status.WS_1008_POLICY_VIOLATION
+            for segment in self.segmenter.feed(pcm):
+                await self._cut(pending, segment)
+            self._maybe_partial()
+
+    def _maybe_partial(self):
+        if not self.partial_bytes:
+            return
+        current = self.segmenter.current
+        if len(current) - self._partial_mark < self.partial_bytes:
+            return
+        if (self._partial is not None and not self._partial.done()) or (
+            self.transcriber.busy()
+        ):
+            stats["partials_skipped"] += 1
+            return
+        self._partial_mark = len(current)
+        self._partial = asyncio.create_task(
+            self._send_partial(self.segment, bytes(current))
+        )
+
+    async def _send_partial(self, index: int, pcm: bytes):
+        try:
+            text = await self.transcriber.transcribe(
+                pcm_to_wav(pcm, self.sample_rate), self.language, self.context
+            )
+        except Exception:
+            stats["partials_skipped"] += 1
+            return
+        # A final for this utterance supersedes its partials.
+        if index >= self.finalized:
+            stats["partials"] += 1
+            await self.send({"type": "partial", "segment": index, "text": text})
+
+    async def _finals(self, pending: asyncio.Queue):
+        while (item := await pending.get()) is not None:
+            index, pcm = item
+            started = time.perf_counter()
+            try:
+                text = await self.transcriber.transcribe(
+                    pcm_to_wav(pcm, self.sample_rate), self.language, self.context
+                )
+                result = {"translated_text": "", "detected_source_language": None}
+                if text.strip():
+                    result = await self.translate(text)
+                    self.context = text[-PROMPT_CHARS:]
+                    await self._save(text, result["translated_text"])
+            except Exception as e:
+                stats["errors"] += 1
+                if isinstance(e, HTTPException):
+                    detail = e.detail
+                else:
+                    logger.exception("Stream segment failed")
+                    detail = "Could not process this segment."
+                self.finalized = index + 1
+                await self.send({"type": "error", "segment": index, "detail": detail})
+                continue
+            stats["segments"] += 1
+            self.finalized = index + 1
+            await self.send(
+                {
+                    "type": "final",
+                    "segment": index,
+                    "text": text,
+                    "translation": result["translated_text"],
+                    "source_language": result["detected_source_language"],
+                    "audio_seconds": round(len(pcm) / 2 / self.sample_rate, 2),
+                    "processing_ms": round((time.perf_counter() - started) * 1000),
+                }
+            )
+
+    async def _save(self, text: str, translation: str):
+        async with AsyncSessionLocal() as db:
+            db.add(
+                Translator(
+                    original_text=text,
+                    translation=translation,
+                    target_language=self.target_language,
+                    user_id=self.user_id,
+                )
+            )
+            await db.commit()
+        await mark_write(self.user_id)
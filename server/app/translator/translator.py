@@ -1,116 +1,336 @@
+import asyncio
+import datetime
+import functools
+from typing import List, Optional
+from uuid import UUID
 from dotenv import load_dotenv
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
+from fastapi import (
+    APIRouter,
+    UploadFile,
+    File,
+    HTTPException,
+    Form,
+    Depends,
+    Query,
+    WebSocket,
+    status,
+)
 from fastapi.encoders import jsonable_encoder
-from google.cloud import translate_v2 as translate
-import io
-import os
-from openai import OpenAI
-from app.auth.auth_bearer import JWTBearer
-from app.db import get_db
-from sqlalchemy.orm import Session
-from app.models import Translator, User
-import uuid
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.auth.auth_bearer import get_current_user, user_for_token
+from app.db import get_async_db, mark_write, read_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import TranslationJob, Translator, User
+from app.schemas import (
+    BatchTranslationIn,
+    BatchTranslationOut,
+    HistoryPage,
+    TranslationJobOut,
+    TranslationOut,
+)
+from app.translator.cache import (
+    cached_transcription,
+    cached_translation,
+    cached_translations,
+)
+from app.translator.history import MAX_PAGE_SIZE, history_page
+from app.translator.jobs import (
+    FINISHED,
+    JobWorkers,
+    audio_path,
+    job_stream,
+    serialize_job,
+    submit,
+)
+from app.translator.stream import StreamSession
+from app.translator.upload import AudioUpload, ingest_audio
+from app.upstream import clients, whisper, google_translate
 
 translator_router = APIRouter()
 load_dotenv()
 
-credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-if credentials_path:
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-else:
-    raise EnvironmentError("GOOGLE_APPLICATION_CREDENTIALS is not set.")
+# Google Translate v2 accepts at most 128 segments per request.
+TRANSLATE_BATCH_SIZE = 128
 
 
 def translate_text(target_language: str, text: str) -> dict:
-    try:
-        translate_client = translate.Client()
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
 
-        if isinstance(text, bytes):
-            text = text.decode("utf-8")
+    result = clients.translate.translate(text, target_language=target_language)
 
-        result = translate_client.translate(text, target_language=target_language)
+    return {
+        "input_text": result["input"],
+        "translated_text": result["translatedText"],
+        "detected_source_language": result["detectedSourceLanguage"],
+    }
 
-        return {
+
+def translate_texts(target_language: str, texts: list) -> list:
+    """Translate a list of texts in one Google Translate request."""
+    results = clients.translate.translate(texts, target_language=target_language)
+
+    return [
+        {
             "input_text": result["input"],
             "translated_text": result["translatedText"],
-            "detected_source_language": result["detectedSourceLanguage"],
+            "detected_source_language": result.get("detectedSourceLanguage"),
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Translation error: {str(e)}")
+        for result in results
+    ]
 
 
-@translator_router.post(
-    "/", dependencies=[Depends(JWTBearer())], summary="Transcribe and translate audio"
-)
-async def translate_audio(
-    audio_file: UploadFile = File(...),
-    target_language: str = Form(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(JWTBearer()),
-):
-    try:
-        # Read the file content into bytes
-        file_content = await audio_file.read()
+async def translate_many(target_language: str, texts: list) -> list:
+    batches = [
+        texts[i : i + TRANSLATE_BATCH_SIZE]
+        for i in range(0, len(texts), TRANSLATE_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(
+        *(
+            google_translate.call_sync(translate_texts, target_language, batch)
+            for batch in batches
+        )
+    )
+    return [result for batch in results for result in batch]
+
 
-        # Create a temporary file-like object
-        audio_bytes = io.BytesIO(file_content)
-        audio_bytes.name = audio_file.filename  # OpenAI needs filename
+async def translate_cached(target_language: str, text: str) -> dict:
+    async def translate(text):
+        return await google_translate.call_sync(translate_text, target_language, text)
 
+    return await cached_translation(text, target_language, translate)
+
+
+async def transcribe_and_translate(audio: AudioUpload, target_language: str) -> dict:
+    async def transcribe():
         # Get transcription from Whisper API
-        transcription = client.audio.transcriptions.create(
-            model="whisper-1", file=audio_bytes
+        transcription = await whisper.call(
+            lambda: clients.openai.audio.transcriptions.create(
+                model="whisper-1", file=audio.as_openai_file()
+            )
         )
+        return transcription.text
 
-        # Extract the text from transcription object
-        transcribed_text = transcription.text
+    # Identical audio and identical phrases are served from the cache
+    transcribed_text = await cached_transcription(audio.sha256, transcribe)
+    translation_result = await translate_cached(target_language, transcribed_text)
 
-        # Translate the transcribed text
-        translation_result = translate_text(target_language, transcribed_text)
+    return {
+        "original_text": transcribed_text,
+        "translation": translation_result["translated_text"],
+        "source_language": translation_result["detected_source_language"],
+        "target_language": target_language,
+    }
 
-        data = {
-            "original_text": transcribed_text,
-            "translation": translation_result["translated_text"],
-            "source_language": translation_result["detected_source_language"],
-            "target_language": target_language,
-        }
+
+async def run_job(job: TranslationJob) -> dict:
+    try:
+        file = open(audio_path(job.id), "rb")
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Audio for this job is gone.")
+    with file:
+        audio = AudioUpload(job.filename, file, job.audio_size, job.audio_sha256)
+        return await transcribe_and_translate(audio, job.target_language)
+
+
+job_workers = JobWorkers(run_job)
+
+
+@translator_router.post("/", summary="Transcribe and translate audio")
+async def translate_audio(
+    audio_file: UploadFile = File(...),
+    target_language: str = Form(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        # Stream the spooled upload in chunks: size cap and hash, no copies
+        audio = await ingest_audio(audio_file)
+        data = await transcribe_and_translate(audio, target_language)
 
         # Save the translation data to the database
         new_translation = Translator(
-            id=str(uuid.uuid4()),  # Convert UUID to string
-            original_text=transcribed_text,
-            translation=translation_result["translated_text"],
+            original_text=data["original_text"],
+            translation=data["translation"],
             target_language=target_language,
             user_id=current_user.id,  # Use the authenticated user's ID
         )
         db.add(new_translation)
-        db.commit()
-        db.refresh(new_translation)
+        await db.commit()
+        await mark_write(current_user.id)
 
         return jsonable_encoder(data)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
 
 
+@translator_router.post(
+    "/jobs",
+    status_code=202,
+    summary="Queue audio for transcription and translation",
+    response_model=TranslationJobOut,
+)
+async def create_translation_job(
+    audio_file: UploadFile = File(...),
+    target_language: str = Form(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    audio = await ingest_audio(audio_file)
+    job = await submit(db, current_user.id, audio, target_language)
+    return ORJSONResponse(
+        serialize_job(job),
+        status_code=202,
+        headers={"Location": f"/translator/jobs/{job.id}"},
+    )
+
+
+async def _owned_job(db: AsyncSession, job_id: UUID, user_id: str):
+    job = await db.get(TranslationJob, str(job_id))
+    if job is None or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+# Jobs are read from the primary: replicas may lag behind the workers.
+@translator_router.get(
+    "/jobs/{job_id}",
+    summary="Status and result of a translation job",
+    response_model=TranslationJobOut,
+)
+async def get_translation_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    job = await _owned_job(db, job_id, current_user.id)
+    headers = {} if job.status in FINISHED else {"Retry-After": "1"}
+    return ORJSONResponse(serialize_job(job), headers=headers)
+
+
+@translator_router.get(
+    "/jobs/{job_id}/events",
+    summary="Server-sent events with the job's state until it finishes",
+)
+async def stream_translation_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    job = await _owned_job(db, job_id, current_user.id)
+    return StreamingResponse(
+        job_stream(job.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@translator_router.websocket("/stream")
+async def stream_translation(
+    websocket: WebSocket,
+    target_language: str = Query(...),
+    sample_rate: int = Query(16000, ge=8000, le=48000),
+    language: Optional[str] = Query(
+        None, max_length=8, description="Spoken language hint, e.g. en"
+    ),
+    # Browsers cannot set headers on a WebSocket handshake.
+    token: Optional[str] = Query(None),
+):
+    if token is None:
+        scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+        token = token if scheme == "Bearer" else None
+    try:
+        if not token:
+            raise HTTPException(status_code=403, detail="Invalid authorization code.")
+        current_user = await user_for_token(token)
+    except HTTPException as e:
+        await websocket.close(status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+        return
+    session = StreamSession(
+        websocket,
+        current_user.id,
+        target_language,
+        functools.partial(translate_cached, target_language),
+        sample_rate=sample_rate,
+        language=language,
+    )
+    await session.run()
+
+
+@translator_router.post(
+    "/batch",
+    dependencies=[Depends(get_current_user)],
+    summary="Translate many texts into several languages",
+    response_model=BatchTranslationOut,
+)
+async def translate_batch(data: BatchTranslationIn):
+    target_languages = list(dict.fromkeys(data.target_languages))
+    per_language = await asyncio.gather(
+        *(
+            cached_translations(
+                data.texts, language, functools.partial(translate_many, language)
+            )
+            for language in target_languages
+        )
+    )
+
+    return {
+        "results": [
+            {
+                "text": text,
+                "translations": {
+                    language: results[i]
+                    for language, results in zip(target_languages, per_language)
+                },
+            }
+            for i, text in enumerate(data.texts)
+        ]
+    }
+
+
+async def get_history_db(current_user: User = Depends(get_current_user)):
+    # Replica reads, unless this user just saved a translation.
+    async with read_session(current_user.id) as db:
+        yield db
+
+
+@translator_router.get(
+    "/history",
+    summary="Page through translation history, newest first",
+    response_model=HistoryPage,
+)
+async def get_translation_history(
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page"
+    ),
+    target_language: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    db: AsyncSession = Depends(get_history_db),
+    current_user: User = Depends(get_current_user),
+):
+    items, next_cursor = await history_page(
+        db, current_user.id, limit, cursor, target_language, since, until
+    )
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
 @translator_router.get(
     "/recent",
     summary="Get last 5 translated messages",
-    dependencies=[Depends(JWTBearer())],
+    response_model=List[TranslationOut],
 )
 async def get_recent_translations(
-    db: Session = Depends(get_db), current_user: User = Depends(JWTBearer())
+    db: AsyncSession = Depends(get_history_db),
+    current_user: User = Depends(get_current_user),
 ):
     try:
-        translations = (
-            db.query(Translator)
-            .filter(Translator.user_id == current_user.id)
-            .order_by(Translator.created_at.desc())
-            .limit(5)
-            .all()
-        )
-        return jsonable_encoder(translations)
+        items, _ = await history_page(db, current_user.id, 5)
+        return ORJSONResponse(items)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error retrieving translations: {str(e)}"
@@ -0,0 +1,123 @@
+"""Memory-bounded handling of audio uploads.
+
+Starlette spools multipart uploads to a temporary file once they pass
+1 MiB. ``ingest_audio`` walks that file in fixed-size chunks to enforce the
+size cap and compute the SHA-256, then rewinds it so the same file object is
+handed to Whisper without ever holding the whole clip in memory.
+``UploadSizeLimitMiddleware`` rejects oversized bodies before they are
+parsed at all.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import PlainTextResponse
+
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", 25 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+# Starlette keeps a multipart file in memory up to this size, then rolls it
+# over to disk.
+SPOOL_MAX_BYTES = 1024 * 1024
+# Allowance for multipart boundaries and the other form fields.
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+stats = {
+    "uploads": 0,
+    "bytes": 0,
+    "largest": 0,
+    "rejected_too_large": 0,
+    # Uploads whose spooled file had rolled over to disk.
+    "spooled_to_disk": 0,
+    # Most audio bytes one request held in memory: what the spooled file
+    # still keeps in memory plus the chunk being hashed.
+    "peak_in_memory": 0,
+}
+
+
+@dataclass
+class AudioUpload:
+    filename: str
+    file: object
+    size: int
+    sha256: str
+
+    def as_openai_file(self):
+        self.file.seek(0)
+        return (self.filename, self.file)
+
+
+def _too_large():
+    stats["rejected_too_large"] += 1
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Audio file exceeds {MAX_AUDIO_BYTES} bytes.",
+    )
+
+
+async def ingest_audio(upload: UploadFile, max_bytes: int = MAX_AUDIO_BYTES):
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large()
+
+    digest = hashlib.sha256()
+    size = 0
+    largest_chunk = 0
+    await upload.seek(0)
+    while chunk := await upload.read(CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large()
+        digest.update(chunk)
+        largest_chunk = max(largest_chunk, len(chunk))
+    await upload.seek(0)
+
+    # What the spooled file keeps in memory, from the bytes we just read.
+    held = size if size <= SPOOL_MAX_BYTES else 0
+    if size and not held:
+        stats["spooled_to_disk"] += 1
+    stats["peak_in_memory"] = max(stats["peak_in_memory"], held + largest_chunk)
+    stats["uploads"] += 1
+    stats["bytes"] += size
+    stats["largest"] = max(stats["largest"], size)
+    return AudioUpload(upload.filename, upload.file, size, digest.hexdigest())
+
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies over ``max_bytes`` under ``path_prefix``.
+
+    Checks ``Content-Length`` up front and counts streamed bytes for chunked
+    bodies, so oversized uploads are cut off before multipart parsing spools
+    them.
+    """
+
+    def __init__(self, app, path_prefix: str, max_bytes: int):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            stats["rejected_too_large"] += 1
+            response = PlainTextResponse(
+                "Request body too large", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
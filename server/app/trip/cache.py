@@ -0,0 +1,58 @@
+import os
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+
+from app.cache import ResponseCache, shared_backend
+from app.db import queue_after_commit
+from app.trip.search import SEARCH_FIELDS, matches, normalize
+
+TRIP_CACHE_MAX_BYTES = int(os.getenv("TRIP_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+TRIP_CACHE_TTL = float(os.getenv("TRIP_CACHE_TTL", 300))
+
+# Serialized catalog results for /trip/, keyed on the normalized destination
+# and the requested fieldset.
+trip_cache = ResponseCache(
+    "trip", TRIP_CACHE_MAX_BYTES, TRIP_CACHE_TTL, backend=shared_backend()
+)
+
+
+def cache_key(destination: str, fields=None) -> str:
+    key = normalize(destination)
+    if fields:
+        key += "|" + ",".join(sorted(fields))
+    return key
+
+
+def _destination(key: str) -> str:
+    return key.partition("|")[0]
+
+
+def invalidate_search_texts(texts) -> int:
+    """Drop cached results that rows with these ``search_text`` values match."""
+    texts = set(texts)
+    texts.discard(None)
+    if not texts:
+        return 0
+    return trip_cache.invalidate(
+        lambda key: any(matches(_destination(key), text) for text in texts)
+    )
+
+
+def _invalidate_committed(batches):
+    invalidate_search_texts(text for texts in batches for text in texts)
+
+
+# Invalidating at flush time would let a request that reads before the
+# commit cache the old rows again under the new epoch, and would drop
+# entries for writes that are then rolled back.
+def _invalidate(mapper, connection, target):
+    history = inspect(target).attrs.search_text.history
+    texts = (target.search_text, *(history.deleted or ()))
+    queue_after_commit(object_session(target), _invalidate_committed, texts)
+
+
+for _model in SEARCH_FIELDS:
+    event.listen(_model, "after_insert", _invalidate)
+    event.listen(_model, "after_update", _invalidate)
+    event.listen(_model, "after_delete", _invalidate)
@@ -0,0 +1,112 @@
+"""Loading and serializing a trip's full itinerary graph.
+
+``load_trip`` fetches Trip -> Itinerary -> ItineraryItem -> ItineraryItemLink
+-> Activity/Sight/Hotel (plus ``Trip.places``) with select-in eager loading:
+one query per relationship, however many itineraries and items the trip has.
+Any relationship not listed raises instead of lazy loading.
+
+``serialize_trip`` emits each linked catalog row once under ``catalog`` and
+refers to it by id from the items, so a hotel used on every day of the trip
+is not repeated.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
+
+from app.models import Itinerary, ItineraryItem, ItineraryItemLink, Trip
+from app.trip.search import CATALOG_FIELDS
+
+# Link attribute -> catalog section.
+LINK_TARGETS = {"hotel": "hotels", "activity": "activities", "sight": "sights"}
+
+_links = (
+    selectinload(Trip.itinerary)
+    .selectinload(Itinerary.items)
+    .selectinload(ItineraryItem.links)
+)
+
+TRIP_GRAPH = (
+    selectinload(Trip.places),
+    _links.selectinload(ItineraryItemLink.hotel),
+    _links.selectinload(ItineraryItemLink.activity),
+    _links.selectinload(ItineraryItemLink.sight),
+    raiseload("*"),
+)
+
+
+async def load_trip(db: AsyncSession, trip_id: str, user_id: str):
+    """The user's trip with its whole itinerary graph, or None."""
+    return await db.scalar(
+        select(Trip)
+        .where(Trip.id == trip_id, Trip.user_id == user_id)
+        .options(*TRIP_GRAPH)
+    )
+
+
+def _row(obj, *fields) -> dict:
+    return {field: getattr(obj, field) for field in fields}
+
+
+def _catalog_row(obj) -> dict:
+    return {field: getattr(obj, field) for field in CATALOG_FIELDS[type(obj)]}
+
+
+def serialize_trip(trip: Trip) -> dict:
+    catalog = {section: {} for section in LINK_TARGETS.values()}
+
+    def link(item_link):
+        for attr, section in LINK_TARGETS.items():
+            target = getattr(item_link, attr)
+            if target is not None:
+                catalog[section].setdefault(target.id, _catalog_row(target))
+                return {"type": attr, "id": target.id}
+        return None
+
+    itineraries = [
+        {
+            "id": itinerary.id,
+            "items": [
+                {
+                    **_row(
+                        item, "id", "name", "description", "img", "day_no", "category"
+                    ),
+                    "links": [
+                        ref
+                        for ref in (link(item_link) for item_link in item.links)
+                        if ref is not None
+                    ],
+                }
+                for item in itinerary.items
+            ],
+        }
+        for itinerary in trip.itinerary
+    ]
+
+    return {
+        **_row(
+            trip,
+            "id",
+            "title",
+            "description",
+            "destination",
+            "start_date",
+            "end_date",
+            "travelers",
+        ),
+        "places": [
+            _row(
+                place,
+                "id",
+                "name",
+                "location",
+                "description",
+                "image",
+                "latitude",
+                "longitude",
+            )
+            for place in trip.places
+        ],
+        "itineraries": itineraries,
+        "catalog": catalog,
+    }
@@ -0,0 +1,379 @@
+"""Nearest-neighbour search over catalog coordinates.
+
+Rows with a latitude and longitude also store their geohash. On PostgreSQL
+``nearby`` scans the geohash btree for the handful of prefixes that cover the
+search circle, then ranks candidates by great-circle distance in SQL. On
+other databases (SQLite in development) each model gets an in-process
+``GridIndex``: points sorted by grid cell in numpy arrays, so a lookup is a
+few binary searches plus one vectorized distance computation over the
+neighbouring cells.
+"""
+
+import asyncio
+import math
+import threading
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import and_, event, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+
+from app.db import queue_after_commit
+from app.models import Activity, Hotel, Place, Sight
+from app.trip.search import CATALOG_FIELDS
+
+EARTH_RADIUS_M = 6_371_000
+GEOHASH_PRECISION = 9
+# Grid cell edge for the in-process index, about 5.5 km of latitude.
+GRID_CELL_DEGREES = 0.05
+MAX_RADIUS_M = 50_000
+# Pending edits an index absorbs before it is re-sorted.
+REBUILD_AFTER = 4096
+
+GEO_MODELS = (Hotel, Activity, Sight, Place)
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bit, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        bounds, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (bounds[0] + bounds[1]) / 2
+        ch <<= 1
+        if value >= mid:
+            ch |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def geohash_cell(precision: int) -> tuple:
+    """(latitude, longitude) size in degrees of a geohash cell."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def _span(lat: float, radius_m: float) -> tuple:
+    """Half-size in degrees of the box around a circle at ``lat``."""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+    return dlat, min(dlon, 180.0)
+
+
+def covering_geohashes(lat: float, lon: float, radius_m: float) -> set:
+    """Geohash prefixes whose cells together cover the search circle.
+
+    Uses the longest prefix whose cell is at least as large as the radius,
+    so the centre cell and its eight neighbours always suffice.
+    """
+    dlat, dlon = _span(lat, radius_m)
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        cell_lat, cell_lon = geohash_cell(precision)
+        if cell_lat >= dlat and cell_lon >= dlon:
+            break
+        precision -= 1
+    cell_lat, cell_lon = geohash_cell(precision)
+    prefixes = set()
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            plat = min(max(lat + i * cell_lat, -90.0), 90.0)
+            plon = (lon + j * cell_lon + 180.0) % 360.0 - 180.0
+            prefixes.add(encode_geohash(plat, plon, precision))
+    return prefixes
+
+
+def _successor(prefix: str):
+    """Smallest geohash greater than every geohash starting with ``prefix``."""
+    prefix = prefix.rstrip(_BASE32[-1])
+    if not prefix:
+        return None
+    return prefix[:-1] + _BASE32[_BASE32.index(prefix[-1]) + 1]
+
+
+def distances(lat: float, lon: float, lats, lons):
+    """Haversine distances in metres from one point to arrays of points."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Points bucketed into a lat/lon grid, held in sorted numpy arrays.
+
+    Edits go to a small overlay that queries scan directly; once it grows
+    past ``REBUILD_AFTER`` the arrays are rebuilt.
+    """
+
+    def __init__(self, cell: float = GRID_CELL_DEGREES):
+        self.cell = cell
+        self._cols = int(math.ceil(360 / cell))
+        self._rows = int(math.ceil(180 / cell))
+        self._lock = threading.Lock()
+        self._extra = {}
+        self._removed = set()
+        self._build([], np.empty(0), np.empty(0))
+
+    def _cell_keys(self, lats, lons):
+        rows = np.clip(((lats + 90) // self.cell).astype(np.int64), 0, self._rows - 1)
+        cols = ((lons + 180) // self.cell).astype(np.int64) % self._cols
+        return rows * self._cols + cols
+
+    def _build(self, ids, lats, lons):
+        keys = self._cell_keys(lats, lons)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._lats = lats[order]
+        self._lons = lons[order]
+        self._ids = np.asarray(ids, dtype=object)[order]
+
+    def load(self, ids: list, lats, lons):
+        with self._lock:
+            self._extra.clear()
+            self._removed.clear()
+            self._build(ids, np.asarray(lats, float), np.asarray(lons, float))
+
+    def add(self, doc_id: str, lat: float, lon: float):
+        with self._lock:
+            self._removed.add(doc_id)
+            self._extra[doc_id] = (lat, lon)
+            self._maybe_rebuild()
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._removed.add(doc_id)
+            self._extra.pop(doc_id, None)
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if len(self._extra) + len(self._removed) < REBUILD_AFTER:
+            return
+        keep = np.fromiter(
+            (doc_id not in self._removed for doc_id in self._ids),
+            dtype=bool,
+            count=len(self._ids),
+        )
+        extra_ids = list(self._extra)
+        extra = np.asarray(list(self._extra.values()), float).reshape(-1, 2)
+        self._build(
+            np.concatenate([self._ids[keep], np.asarray(extra_ids, dtype=object)]),
+            np.concatenate([self._lats[keep], extra[:, 0]]),
+            np.concatenate([self._lons[keep], extra[:, 1]]),
+        )
+        self._extra.clear()
+        self._removed.clear()
+
+    def _col_ranges(self, lon: float, dlon: float) -> list:
+        first = int((lon - dlon + 180) // self.cell)
+        last = int((lon + dlon + 180) // self.cell)
+        if last - first + 1 >= self._cols:
+            return [(0, self._cols - 1)]
+        if first < 0:
+            return [(first + self._cols, self._cols - 1), (0, last)]
+        if last >= self._cols:
+            return [(first, self._cols - 1), (0, last - self._cols)]
+        return [(first, last)]
+
+    def nearest(self, lat: float, lon: float, radius_m: float, k: int) -> list:
+        """Up to ``k`` ``(doc_id, metres)`` pairs within the radius, nearest first.
+
+        Searches a small circle first and doubles it until ``k`` points are
+        found or the radius is reached, so dense areas stay cheap.
+        """
+        step = min(radius_m, self.cell * 111_320)
+        while True:
+            hits = self._within(lat, lon, step, k)
+            if len(hits) >= k or step >= radius_m:
+                return hits
+            step = min(step * 2, radius_m)
+
+    def _within(self, lat: float, lon: float, radius_m: float, k: int) -> list:
+        dlat, dlon = _span(lat, radius_m)
+        first_row = max(int((lat - dlat + 90) // self.cell), 0)
+        last_row = min(int((lat + dlat + 90) // self.cell), self._rows - 1)
+        rows = np.arange(first_row, last_row + 1, dtype=np.int64) * self._cols
+        with self._lock:
+            spans = [
+                (
+                    np.searchsorted(self._keys, rows + lo, "left"),
+                    np.searchsorted(self._keys, rows + hi, "right"),
+                )
+                for lo, hi in self._col_ranges(lon, dlon)
+            ]
+            candidates = np.concatenate(
+                [
+                    np.arange(start, end)
+                    for starts, ends in spans
+                    for start, end in zip(starts, ends)
+                    if end > start
+                ]
+                or [np.empty(0, dtype=np.int64)]
+            )
+            found = distances(lat, lon, self._lats[candidates], self._lons[candidates])
+            within = found <= radius_m
+            ids = self._ids[candidates[within]]
+            found = found[within]
+            if self._removed:
+                live = np.fromiter(
+                    (doc_id not in self._removed for doc_id in ids),
+                    dtype=bool,
+                    count=len(ids),
+                )
+                ids, found = ids[live], found[live]
+            if self._extra:
+                extra_ids = list(self._extra)
+                extra = np.asarray(list(self._extra.values()), float)
+                extra_found = distances(lat, lon, extra[:, 0], extra[:, 1])
+                keep = extra_found <= radius_m
+                ids = np.concatenate(
+                    [ids, np.asarray(extra_ids, dtype=object)[keep]]
+                )
+                found = np.concatenate([found, extra_found[keep]])
+
+        if len(found) > k:
+            top = np.argpartition(found, k - 1)[:k]
+            ids, found = ids[top], found[top]
+        order = np.argsort(found, kind="stable")
+        return [(ids[i], float(found[i])) for i in order]
+
+
+_indexes = {}
+_build_locks = defaultdict(asyncio.Lock)
+
+
+async def _get_index(db: AsyncSession, model) -> GridIndex:
+    index = _indexes.get(model)
+    if index is not None:
+        return index
+    async with _build_locks[model]:
+        if model not in _indexes:
+            ids, lats, lons = [], [], []
+            rows = await db.stream(
+                select(model.id, model.latitude, model.longitude)
+                .where(model.latitude.isnot(None), model.longitude.isnot(None))
+                .execution_options(yield_per=10_000)
+            )
+            async for doc_id, lat, lon in rows:
+                ids.append(doc_id)
+                lats.append(lat)
+                lons.append(lon)
+            index = GridIndex()
+            index.load(ids, lats, lons)
+            _indexes[model] = index
+    return _indexes[model]
+
+
+def _sql_distance(model, lat: float, lon: float):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = func.radians(model.latitude), func.radians(model.longitude)
+    a = func.power(func.sin((lat2 - lat1) / 2), 2) + math.cos(lat1) * func.cos(
+        lat2
+    ) * func.power(func.sin((lon2 - lon1) / 2), 2)
+    return 2 * EARTH_RADIUS_M * func.asin(func.sqrt(func.least(a, 1.0)))
+
+
+async def nearby(
+    db: AsyncSession,
+    model,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    k: int = 10,
+    fields=None,
+) -> list:
+    """Up to ``k`` rows of ``model`` within ``radius_m`` metres, nearest first.
+
+    Rows are dicts of ``fields`` (default: every client-visible column) plus
+    ``distance_m``.
+    """
+    fields = CATALOG_FIELDS[model] if fields is None else tuple(fields)
+    columns = [getattr(model, field) for field in fields]
+
+    if db.get_bind().dialect.name == "postgresql":
+        ranges = []
+        for prefix in covering_geohashes(lat, lon, radius_m):
+            upper = _successor(prefix)
+            clause = model.geohash >= prefix
+            if upper is not None:
+                clause = and_(clause, model.geohash < upper)
+            ranges.append(clause)
+        distance = _sql_distance(model, lat, lon)
+        result = await db.execute(
+            select(*columns, distance.label("distance_m"))
+            .where(or_(*ranges), distance <= radius_m)
+            .order_by(distance)
+            .limit(k)
+        )
+        return [dict(row) for row in result.mappings()]
+
+    index = await _get_index(db, model)
+    hits = dict(index.nearest(lat, lon, radius_m, k))
+    if not hits:
+        return []
+    result = await db.execute(
+        select(*columns, model.id.label("_id")).where(model.id.in_(hits))
+    )
+    rows = []
+    for row in result.mappings():
+        row = dict(row)
+        row["distance_m"] = hits[row.pop("_id")]
+        rows.append(row)
+    rows.sort(key=lambda row: row["distance_m"])
+    return rows
+
+
+def reindex(model, rows):
+    """Apply ``(id, latitude, longitude)`` rows written without the ORM to
+    the in-process index, if one has been built."""
+    index = _indexes.get(model)
+    if index is None:
+        return
+    for doc_id, lat, lon in rows:
+        if lat is None or lon is None:
+            index.remove(doc_id)
+        else:
+            index.add(doc_id, lat, lon)
+
+
+def _set_geohash(mapper, connection, target):
+    if target.latitude is None or target.longitude is None:
+        target.geohash = None
+    else:
+        target.geohash = encode_geohash(target.latitude, target.longitude)
+
+
+def _apply_index_changes(changes):
+    for model, doc_id, lat, lon in changes:
+        reindex(model, [(doc_id, lat, lon)])
+
+
+# As with the trigram index, changes reach the grid once they commit.
+def _index_row(mapper, connection, target):
+    change = (type(target), target.id, target.latitude, target.longitude)
+    queue_after_commit(object_session(target), _apply_index_changes, change)
+
+
+def _unindex_row(mapper, connection, target):
+    change = (type(target), target.id, None, None)
+    queue_after_commit(object_session(target), _apply_index_changes, change)
+
+
+for _model in GEO_MODELS:
+    event.listen(_model, "before_insert", _set_geohash)
+    event.listen(_model, "before_update", _set_geohash)
+    event.listen(_model, "after_insert", _index_row)
+    event.listen(_model, "after_update", _index_row)
+    event.listen(_model, "after_delete", _unindex_row)
@@ -0,0 +1,362 @@
+"""Offline bulk loader for the hotel, activity and sight catalog.
+
+    python -m app.trip.ingest hotels hotels.jsonl
+    python -m app.trip.ingest sights kochi.geojson --source geoapify
+    python -m app.trip.ingest activities tours.csv.gz --batch-size 5000
+
+Dumps are streamed record by record, so memory stays flat however large the
+input is. Supported inputs are JSON Lines, CSV with a header row, and GeoJSON
+FeatureCollections such as Geoapify Places responses. Newline-delimited
+features also work, and any of these may be gzipped. Records are mapped onto
+the model's columns and deduplicated on ``external_id``
+(``<source>:<id in the dump>``). They are then upserted in batches with
+multi-row ``INSERT ... ON CONFLICT DO UPDATE``, one transaction per batch, so
+re-running a dump updates rows in place.
+
+Rows are written with Core, bypassing ORM events, so the loader does their
+work itself. Each batch first reads the rows it will update, so
+``search_text`` and ``geohash`` are rebuilt from the merged columns rather
+than from a partial record. After the batch commits, it drops matching trip
+cache entries and updates the in-process trigram and grid indexes of this
+process. Other processes see the changes as their cache entries expire (the
+shared cache, if any, stops serving them at once) and rebuild their indexes
+on restart.
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import hashlib
+import json
+import re
+import sys
+import time
+
+from sqlalchemy import Enum, Float, Integer, JSON, String, func, select
+
+from app.db import engine
+from app.models import Activity, Hotel, Sight
+from app.trip import geo, search
+from app.trip.cache import invalidate_search_texts, trip_cache
+from app.trip.geo import encode_geohash
+from app.trip.search import SEARCH_FIELDS, search_text_from
+from app.utils import generate_uuid
+
+MODELS = {model.__tablename__: model for model in (Hotel, Activity, Sight)}
+BATCH_SIZE = 2000
+CHUNK_SIZE = 1024 * 1024
+
+# Set by the loader, never taken from the dump.
+_MANAGED = {"id", "external_id", "search_text", "geohash"}
+# Derived from other columns, so rebuilt from the merged row on update.
+_DERIVED = {"search_text", "geohash"}
+
+_features_re = re.compile(r'"features"\s*:\s*\[')
+
+
+def open_input(path: str):
+    if path == "-":
+        return sys.stdin
+    opener = gzip.open if path.endswith(".gz") else open
+    return opener(path, "rt", encoding="utf-8", newline="")
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".ndjson", ".geojsonl", ".geojsons")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".geojson", ".json")):
+        return "geojson"
+    raise SystemExit(f"Cannot tell the format of {path}; pass --format.")
+
+
+def read_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield None
+
+
+def read_csv(f):
+    yield from csv.DictReader(f)
+
+
+def read_geojson(f):
+    """Features of a FeatureCollection, decoded one at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(CHUNK_SIZE)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    while True:
+        match = _features_re.search(buf, pos)
+        if match:
+            pos = match.end()
+            break
+        if eof:
+            raise ValueError("No GeoJSON features array found.")
+        # Keep a tail in case the key is split across chunks.
+        pos = max(0, len(buf) - 32)
+        fill()
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("Truncated GeoJSON features array.")
+            fill()
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            feature, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        yield feature
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv, "geojson": read_geojson}
+
+
+def from_feature(feature: dict) -> dict:
+    """Flatten a GeoJSON feature (Geoapify Places shape) into a record."""
+    properties = feature.get("properties") or {}
+    record = dict(properties)
+    record["external_id"] = properties.get("place_id") or feature.get("id")
+    record.setdefault(
+        "location",
+        properties.get("city") or properties.get("county") or properties.get("state"),
+    )
+    record.setdefault("description", properties.get("formatted"))
+    record.setdefault("booking_url", properties.get("website"))
+    geometry = feature.get("geometry") or {}
+    if geometry.get("type") == "Point":
+        record["longitude"], record["latitude"] = geometry["coordinates"][:2]
+    else:
+        record.setdefault("latitude", properties.get("lat"))
+        record.setdefault("longitude", properties.get("lon"))
+    return record
+
+
+def _coerce(column, value):
+    if value is None or value == "":
+        return None
+    kind = column.type
+    try:
+        if isinstance(kind, Enum):
+            return value if value in kind.enums else None
+        if isinstance(kind, Float):
+            return float(value)
+        if isinstance(kind, Integer):
+            return int(value)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(kind, JSON) and isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return [item.strip() for item in value.split(";") if item.strip()]
+    if isinstance(kind, String) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def to_row(model, record: dict, source: str):
+    """Column values for ``record``, or None if nothing in it maps."""
+    if record.get("type") == "Feature":
+        record = from_feature(record)
+    columns = model.__table__.columns
+    row = {
+        column.key: _coerce(column, record.get(column.key))
+        for column in columns
+        if column.key not in _MANAGED
+    }
+    if all(value is None for value in row.values()):
+        return None
+    external_id = record.get("external_id") or record.get("id")
+    if external_id in (None, ""):
+        # No id in the dump: identical records collapse into one row.
+        content = json.dumps(row, sort_keys=True, default=str).encode()
+        external_id = hashlib.sha1(content).hexdigest()
+    row["id"] = generate_uuid()
+    row["external_id"] = f"{source}:{external_id}"
+    _derive(model, row, row)
+    return row
+
+
+def _derive(model, row: dict, merged: dict):
+    row["search_text"] = search_text_from(model, merged)
+    row["geohash"] = None
+    if merged["latitude"] is not None and merged["longitude"] is not None:
+        row["geohash"] = encode_geohash(merged["latitude"], merged["longitude"])
+
+
+def _merged(row: dict, found, key: str):
+    """``key`` of ``row`` as stored after the upsert, given the existing row."""
+    return found[key] if found is not None and row[key] is None else row[key]
+
+
+def _merge_existing(connection, model, rows: list) -> dict:
+    """Rebuild derived columns of rows that will update existing ones.
+
+    Returns the existing rows by ``external_id``.
+    """
+    table = model.__table__
+    sources = ("latitude", "longitude", *SEARCH_FIELDS[model])
+    result = connection.execute(
+        select(table.c.external_id, table.c.id, table.c.search_text)
+        .add_columns(*(table.c[key] for key in sources))
+        .where(table.c.external_id.in_([row["external_id"] for row in rows]))
+    )
+    existing = {found.external_id: found._mapping for found in result}
+    for row in rows:
+        found = existing.get(row["external_id"])
+        if found is None:
+            continue
+        # The conflicting row keeps its id; report that one.
+        row["id"] = found["id"]
+        _derive(model, row, {key: _merged(row, found, key) for key in sources})
+    return existing
+
+
+def upsert(connection, model, rows: list):
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise SystemExit(f"Bulk upsert is not supported on {dialect}.")
+
+    table = model.__table__
+    existing = _merge_existing(connection, model, rows)
+    statement = insert(table)
+    # Fields missing from the dump keep whatever the row already had; derived
+    # ones were rebuilt from the merged row.
+    update = {
+        key: (
+            statement.excluded[key]
+            if key in _DERIVED
+            else func.coalesce(statement.excluded[key], table.c[key])
+        )
+        for key in rows[0]
+        if key not in ("id", "external_id")
+    }
+    connection.execute(
+        statement.on_conflict_do_update(index_elements=["external_id"], set_=update),
+        rows,
+    )
+    return existing
+
+
+def _after_commit(model, rows: list, existing: dict):
+    """What the ORM events would have done for these rows."""
+    invalidate_search_texts(
+        [row["search_text"] for row in rows]
+        + [found["search_text"] for found in existing.values()]
+    )
+    search.reindex(model, [(row["id"], row["search_text"]) for row in rows])
+    coordinates = []
+    for row in rows:
+        found = existing.get(row["external_id"])
+        coordinates.append(
+            (
+                row["id"],
+                _merged(row, found, "latitude"),
+                _merged(row, found, "longitude"),
+            )
+        )
+    geo.reindex(model, coordinates)
+
+
+def ingest(model, records, source: str, batch_size: int = BATCH_SIZE, progress=None):
+    """Upsert ``records`` into ``model``'s table; returns the counts."""
+    counts = {"read": 0, "upserted": 0, "skipped": 0}
+    batch = {}
+
+    def flush():
+        rows = list(batch.values())
+        with engine.begin() as connection:
+            existing = upsert(connection, model, rows)
+        _after_commit(model, rows, existing)
+        counts["upserted"] += len(batch)
+        batch.clear()
+        if progress:
+            progress(counts)
+
+    for record in records:
+        counts["read"] += 1
+        row = to_row(model, record, source) if isinstance(record, dict) else None
+        if row is None:
+            counts["skipped"] += 1
+            continue
+        # Later duplicates within a batch win, as they would across batches.
+        batch[row["external_id"]] = row
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.trip.ingest", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("table", choices=sorted(MODELS))
+    parser.add_argument("path", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=sorted(READERS))
+    parser.add_argument(
+        "--source", default="import", help="prefix for external ids (default: import)"
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.format is None and args.path == "-":
+        parser.error("--format is required when reading stdin")
+    fmt = args.format or detect_format(args.path)
+    model = MODELS[args.table]
+    started = time.monotonic()
+    last_report = 0.0
+
+    def progress(counts, final=False):
+        nonlocal last_report
+        now = time.monotonic()
+        if not final and now - last_report < 1:
+            return
+        last_report = now
+        rate = counts["read"] / max(now - started, 1e-9)
+        print(
+            f"\r{args.table}: {counts['read']} read, {counts['upserted']} upserted, "
+            f"{counts['skipped']} skipped ({rate:,.0f} records/s)",
+            end="",
+            file=sys.stderr,
+        )
+
+    with open_input(args.path) as f:
+        counts = ingest(
+            model, READERS[fmt](f), args.source, args.batch_size, progress=progress
+        )
+    progress(counts, final=True)
+    print(f" in {time.monotonic() - started:.1f}s", file=sys.stderr)
+    # A short-lived process: tell the shared cache now, not on next use.
+    asyncio.run(trip_cache.publish_invalidations())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Itinerary planner: assigns catalog items to the days of a trip.
+
+1. The hotel is the best-rated one, pulled towards where the candidates are.
+2. Sights and activities are taken nearest-first from the hotel while their
+   visit and travel time fits the trip and their price fits the budget.
+3. The chosen stops are split into days with the sweep heuristic. They are
+   sorted by bearing from the hotel, starting after the widest gap, so each
+   day covers one direction. A day is cut when its time runs out.
+4. Each day is ordered nearest-neighbour from the hotel, then improved with
+   2-opt over the day's distance matrix.
+
+Distances are haversine, computed with numpy. Travel time assumes
+``TRAVEL_KMH`` door to door. Stops without coordinates are treated as being
+at the hotel.
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+from app.models import Itinerary, ItineraryItem, ItineraryItemLink
+from app.trip.geo import EARTH_RADIUS_M, distances
+from app.utils import generate_uuid
+
+DAY_MINUTES = 8 * 60
+SIGHT_MINUTES = 90
+ACTIVITY_MINUTES = 120
+TRAVEL_KMH = 25
+MAX_PLAN_DAYS = 30
+# Rating points a hotel gives up per km from the centre of the candidates.
+HOTEL_KM_PENALTY = 0.1
+
+_hours_re = re.compile(r"(\d+(?:\.\d+)?)\s*h", re.IGNORECASE)
+_minutes_re = re.compile(r"(\d+)\s*m(?:ins?|inutes?)?\b", re.IGNORECASE)
+_clock_re = re.compile(r"^\s*(\d+):(\d{2})\s*$")
+
+
+def parse_minutes(text, default: int) -> int:
+    """Minutes in a duration such as "2h", "90 min", "1.5 hours" or "1:30"."""
+    if not text:
+        return default
+    text = str(text)
+    clock = _clock_re.match(text)
+    if clock:
+        return int(clock.group(1)) * 60 + int(clock.group(2))
+    if text.strip().isdigit():
+        return int(text)
+    hours = _hours_re.search(text)
+    mins = _minutes_re.search(text)
+    total = (float(hours.group(1)) * 60 if hours else 0) + (
+        int(mins.group(1)) if mins else 0
+    )
+    return int(total) or default
+
+
+def travel_minutes(metres):
+    return metres / 1000 / TRAVEL_KMH * 60
+
+
+def distance_matrix(lats, lons):
+    """Pairwise haversine distances in metres."""
+    lat = np.radians(lats)
+    lon = np.radians(lons)
+    a = (
+        np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+        + np.cos(lat[:, None])
+        * np.cos(lat[None, :])
+        * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def route(matrix) -> list:
+    """Order of stops 1..n for a closed tour from and back to stop 0."""
+    n = len(matrix)
+    if n <= 2:
+        return list(range(1, n))
+    # Nearest neighbour from the hotel.
+    unvisited = set(range(1, n))
+    tour = [0]
+    while unvisited:
+        last = tour[-1]
+        nearest = min(unvisited, key=lambda j: matrix[last, j])
+        tour.append(nearest)
+        unvisited.remove(nearest)
+    tour.append(0)
+    # 2-opt: reverse any segment that shortens the tour, until none does.
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b, c, d = tour[i - 1], tour[i], tour[j], tour[j + 1]
+                if matrix[a, c] + matrix[b, d] < matrix[a, b] + matrix[c, d] - 1e-6:
+                    tour[i : j + 1] = reversed(tour[i : j + 1])
+                    improved = True
+    return tour[1:-1]
+
+
+@dataclass
+class Stop:
+    kind: str  # "sights" or "activities", as in ItineraryItem.category
+    row: dict
+    minutes: int
+    cost: float
+
+
+@dataclass
+class DayPlan:
+    day: int
+    stops: list = field(default_factory=list)
+    minutes: float = 0.0
+    cost: float = 0.0
+    distance_m: float = 0.0
+
+
+def _coords(rows) -> tuple:
+    lats = np.array([row.get("latitude") for row in rows], dtype=float)
+    lons = np.array([row.get("longitude") for row in rows], dtype=float)
+    return lats, lons
+
+
+def choose_hotel(hotels: list, stops: list):
+    """Best rated hotel, penalised by distance from the stops' centre."""
+    if not hotels:
+        return None
+    ratings = np.array([row.get("rating") or 0 for row in hotels], dtype=float)
+    lats, lons = _coords([stop.row for stop in stops])
+    located = ~np.isnan(lats)
+    hotel_lats, hotel_lons = _coords(hotels)
+    if located.any():
+        centre = lats[located].mean(), lons[located].mean()
+        km = distances(*centre, hotel_lats, hotel_lons) / 1000
+        # Hotels without coordinates are as far as the farthest one.
+        km = np.where(np.isnan(km), np.nanmax(km, initial=0), km)
+        ratings = ratings - HOTEL_KM_PENALTY * km
+    return hotels[int(np.argmax(ratings))]
+
+
+def plan(
+    days: int,
+    travelers: int,
+    hotels: list,
+    sights: list,
+    activities: list,
+    day_minutes: int = DAY_MINUTES,
+    budget: float = None,
+) -> tuple:
+    """Choose a hotel and spread sights and activities over ``days``.
+
+    Rows are catalog dicts as returned by ``search``. Activity prices are
+    per person. Returns ``(hotel, [DayPlan, ...])``.
+    """
+    stops = [Stop("sights", row, SIGHT_MINUTES, 0.0) for row in sights] + [
+        Stop(
+            "activities",
+            row,
+            parse_minutes(row.get("duration"), ACTIVITY_MINUTES),
+            (row.get("price") or 0.0) * travelers,
+        )
+        for row in activities
+    ]
+    hotel = choose_hotel(hotels, stops)
+    plans = [DayPlan(day + 1) for day in range(days)]
+    if not stops:
+        return hotel, plans
+
+    lats, lons = _coords([stop.row for stop in stops])
+    located = ~np.isnan(lats)
+    if hotel is not None and hotel.get("latitude") is not None:
+        origin = hotel["latitude"], hotel["longitude"]
+    elif located.any():
+        origin = lats[located].mean(), lons[located].mean()
+    else:
+        origin = 0.0, 0.0
+    lats = np.where(located, lats, origin[0])
+    lons = np.where(located, lons, origin[1])
+    home = distances(*origin, lats, lons)
+    minutes = np.array([stop.minutes for stop in stops], dtype=float)
+    costs = np.array([stop.cost for stop in stops], dtype=float)
+
+    # 2. Nearest stops first, while time and money last.
+    needed = minutes + travel_minutes(home)
+    capacity = days * day_minutes
+    chosen = []
+    used = spent = 0.0
+    for i in np.argsort(home, kind="stable"):
+        if needed[i] > day_minutes or used + needed[i] > capacity:
+            continue
+        if budget is not None and spent + costs[i] > budget:
+            continue
+        chosen.append(i)
+        used += needed[i]
+        spent += costs[i]
+    if not chosen:
+        return hotel, plans
+    chosen = np.array(chosen)
+
+    # 3. Sweep around the hotel, starting after the widest angular gap.
+    scale = math.cos(math.radians(origin[0]))
+    bearings = np.arctan2(
+        (lons[chosen] - origin[1]) * scale, lats[chosen] - origin[0]
+    )
+    sweep = chosen[np.argsort(bearings, kind="stable")]
+    angles = np.sort(bearings)
+    gaps = np.diff(np.append(angles, angles[0] + 2 * np.pi))
+    sweep = np.roll(sweep, -((int(np.argmax(gaps)) + 1) % len(sweep)))
+
+    day_stops = [[] for _ in range(days)]
+    day, spent_today, last = 0, 0.0, None
+    for i in sweep:
+        if last is None:
+            leg = home[i]
+        else:
+            leg = distances(lats[last], lons[last], lats[i], lons[i])
+        # Day length if it ended here with the trip back to the hotel.
+        total = (
+            spent_today + travel_minutes(leg) + minutes[i] + travel_minutes(home[i])
+        )
+        if day_stops[day] and total > day_minutes:
+            day += 1
+            if day == days:
+                break
+            spent_today, last, leg = 0.0, None, home[i]
+        day_stops[day].append(i)
+        spent_today += travel_minutes(leg) + minutes[i]
+        last = i
+
+    # 4. Order each day.
+    for plan_day, indices in zip(plans, day_stops):
+        if not indices:
+            continue
+        points = np.array(indices)
+        matrix = distance_matrix(
+            np.append(origin[0], lats[points]), np.append(origin[1], lons[points])
+        )
+        order = route(matrix)
+        tour = [0] + order + [0]
+        plan_day.distance_m = float(
+            sum(matrix[a, b] for a, b in zip(tour, tour[1:]))
+        )
+        plan_day.stops = [stops[indices[j - 1]] for j in order]
+        plan_day.minutes = float(
+            minutes[points].sum() + travel_minutes(plan_day.distance_m)
+        )
+        plan_day.cost = float(costs[points].sum())
+    return hotel, plans
+
+
+async def save_plan(db, trip_id: str, hotel, plans: list) -> str:
+    """Replace the trip's itinerary with ``plans``, inserting rows in bulk."""
+    itinerary_ids = select(Itinerary.id).where(Itinerary.trip_id == trip_id)
+    item_ids = select(ItineraryItem.id).where(
+        ItineraryItem.itinerary_id.in_(itinerary_ids)
+    )
+    await db.execute(
+        delete(ItineraryItemLink).where(
+            ItineraryItemLink.itinerary_item_id.in_(item_ids)
+        )
+    )
+    await db.execute(
+        delete(ItineraryItem).where(ItineraryItem.itinerary_id.in_(itinerary_ids))
+    )
+    await db.execute(delete(Itinerary).where(Itinerary.trip_id == trip_id))
+
+    itinerary_id = generate_uuid()
+    items, links = [], []
+
+    def add(day, category, row, link_column):
+        item_id = generate_uuid()
+        items.append(
+            {
+                "id": item_id,
+                "name": row.get("name") or row.get("description"),
+                "description": row.get("description"),
+                "img": row.get("image"),
+                "day_no": str(day),
+                "category": category,
+                "itinerary_id": itinerary_id,
+            }
+        )
+        links.append(
+            {
+                "id": generate_uuid(),
+                "itinerary_item_id": item_id,
+                "hotel_id": None,
+                "sight_id": None,
+                "activity_id": None,
+                link_column: row["id"],
+            }
+        )
+
+    link_columns = {"sights": "sight_id", "activities": "activity_id"}
+    for plan_day in plans:
+        if hotel is not None:
+            add(plan_day.day, "hotel", hotel, "hotel_id")
+        for stop in plan_day.stops:
+            add(plan_day.day, stop.kind, stop.row, link_columns[stop.kind])
+
+    await db.execute(insert(Itinerary), [{"id": itinerary_id, "trip_id": trip_id}])
+    if items:
+        await db.execute(insert(ItineraryItem), items)
+        await db.execute(insert(ItineraryItemLink), links)
+    await db.commit()
+    return itinerary_id
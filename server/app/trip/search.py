@@ -0,0 +1,280 @@
+"""Destination search over the hotel, activity and sight catalog.
+
+Every catalog row carries a ``search_text`` column holding the normalized
+form of the fields we search on. On PostgreSQL it is backed by a pg_trgm GIN
+index and ranked with ``word_similarity``; on other databases (SQLite in
+development) an in-process trigram inverted index is used instead.
+"""
+
+import asyncio
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import event, or_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+
+from app.db import queue_after_commit
+from app.models import Hotel, Activity, Sight
+
+# Minimum share of the query's trigrams a row must contain to match. Mirrors
+# pg_trgm's default ``word_similarity_threshold``.
+MATCH_THRESHOLD = 0.6
+
+# Old and alternate spellings, mapped to the name we store and search on.
+ALIASES = {
+    "cochin": "kochi",
+    "trichur": "thrissur",
+    "trivandrum": "thiruvananthapuram",
+    "calicut": "kozhikode",
+    "alleppey": "alappuzha",
+    "quilon": "kollam",
+    "cannanore": "kannur",
+    "palghat": "palakkad",
+    "bombay": "mumbai",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "bangalore": "bengaluru",
+    "mysore": "mysuru",
+    "pondicherry": "puducherry",
+    "benares": "varanasi",
+    "banaras": "varanasi",
+    "gurgaon": "gurugram",
+    "baroda": "vadodara",
+    "simla": "shimla",
+    "allahabad": "prayagraj",
+}
+
+# Fields that make up ``search_text`` for each catalog model.
+SEARCH_FIELDS = {
+    Hotel: ("name", "location"),
+    Activity: ("location",),
+    Sight: ("name", "location"),
+}
+
+# Columns never sent to clients.
+INTERNAL_COLUMNS = {"search_text", "external_id", "geohash"}
+
+# Client-visible columns of each catalog model, in response order.
+CATALOG_FIELDS = {
+    model: tuple(
+        column.key
+        for column in model.__table__.columns
+        if column.key not in INTERNAL_COLUMNS
+    )
+    for model in SEARCH_FIELDS
+}
+
+_word_re = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and canonicalize aliases."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(ALIASES.get(w, w) for w in _word_re.findall(text))
+
+
+def trigrams(text: str) -> set:
+    """pg_trgm compatible trigrams of already normalized text."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def matches(query: str, text: str) -> bool:
+    """Whether normalized ``text`` would be returned for normalized ``query``."""
+    if not query or not text:
+        return False
+    if query in text:
+        return True
+    grams = trigrams(query)
+    return len(grams & trigrams(text)) / len(grams) >= MATCH_THRESHOLD
+
+
+def search_text_for(obj) -> str:
+    values = (getattr(obj, field) for field in SEARCH_FIELDS[type(obj)])
+    return normalize(" ".join(v for v in values if v))
+
+
+def search_text_from(model, row: dict) -> str:
+    """``search_text`` for a row of ``model`` given as a dict of column values."""
+    values = (row.get(field) for field in SEARCH_FIELDS[model])
+    return normalize(" ".join(v for v in values if v))
+
+
+class TrigramIndex:
+    """Inverted index from trigram to row ids, used where pg_trgm is not."""
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id: str, text: str):
+        with self._lock:
+            self._remove(doc_id)
+            text = text or ""
+            self._docs[doc_id] = text
+            for gram in trigrams(text):
+                self._postings[gram].add(doc_id)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        text = self._docs.pop(doc_id, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Return ``(doc_id, score)`` pairs for a normalized query, best first."""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        with self._lock:
+            counts = defaultdict(int)
+            for gram in grams:
+                for doc_id in self._postings.get(gram, ()):
+                    counts[doc_id] += 1
+            scored = []
+            for doc_id, count in counts.items():
+                score = count / len(grams)
+                if query in self._docs[doc_id]:
+                    score += 1.0
+                if score >= MATCH_THRESHOLD:
+                    scored.append((doc_id, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+_indexes = {}
+_build_locks = defaultdict(asyncio.Lock)
+
+
+async def _get_index(db: AsyncSession, model) -> TrigramIndex:
+    index = _indexes.get(model)
+    if index is not None:
+        return index
+    async with _build_locks[model]:
+        if model not in _indexes:
+            index = TrigramIndex()
+            rows = await db.stream(
+                select(model.id, model.search_text).execution_options(
+                    yield_per=10_000
+                )
+            )
+            async for doc_id, text in rows:
+                index.add(doc_id, text)
+            _indexes[model] = index
+    return _indexes[model]
+
+
+async def search(
+    db: AsyncSession, model, destination: str, limit: int = 10, fields=None
+) -> list:
+    """Rows of ``model`` matching ``destination``, most relevant first.
+
+    Only ``fields`` (default: every client-visible column) are selected, and
+    rows come back as plain dicts ready to be encoded.
+    """
+    query = normalize(destination)
+    if not query:
+        return []
+    fields = CATALOG_FIELDS[model] if fields is None else tuple(fields)
+    columns = [getattr(model, field) for field in fields]
+    has_rating = hasattr(model, "rating")
+
+    if db.get_bind().dialect.name == "postgresql":
+        score = func.word_similarity(query, model.search_text)
+        order = [score.desc()]
+        if has_rating:
+            order.append(model.rating.desc().nulls_last())
+        result = await db.execute(
+            select(*columns)
+            .where(
+                or_(
+                    model.search_text.contains(query, autoescape=True),
+                    model.search_text.op("%>")(query),
+                )
+            )
+            .order_by(*order)
+            .limit(limit)
+        )
+        return [dict(row) for row in result.mappings()]
+
+    index = await _get_index(db, model)
+    scores = dict(index.search(query, limit))
+    if not scores:
+        return []
+    # id and rating are needed for ranking even when not requested.
+    extra = [model.id.label("_id")]
+    if has_rating:
+        extra.append(model.rating.label("_rating"))
+    result = await db.execute(select(*columns, *extra).where(model.id.in_(scores)))
+    rows = [dict(row) for row in result.mappings()]
+    rows.sort(key=lambda row: (-scores[row["_id"]], -(row.get("_rating") or 0)))
+    for row in rows:
+        del row["_id"]
+        row.pop("_rating", None)
+    return rows
+
+
+def reindex(model, rows):
+    """Apply ``(id, search_text)`` rows written without the ORM to the
+    in-process index, if one has been built."""
+    index = _indexes.get(model)
+    if index is not None:
+        for doc_id, text in rows:
+            index.add(doc_id, text)
+
+
+def _set_search_text(mapper, connection, target):
+    target.search_text = search_text_for(target)
+
+
+def _apply_index_changes(changes):
+    for model, doc_id, text in changes:
+        index = _indexes.get(model)
+        if index is None:
+            continue
+        if text is None:
+            index.remove(doc_id)
+        else:
+            index.add(doc_id, text)
+
+
+# The index only learns about rows once their transaction commits, so a
+# rollback cannot leave ids behind that no longer exist.
+def _index_row(mapper, connection, target):
+    change = (type(target), target.id, target.search_text or "")
+    queue_after_commit(object_session(target), _apply_index_changes, change)
+
+
+def _unindex_row(mapper, connection, target):
+    change = (type(target), target.id, None)
+    queue_after_commit(object_session(target), _apply_index_changes, change)
+
+
+for _model in SEARCH_FIELDS:
+    event.listen(_model, "before_insert", _set_search_text)
+    event.listen(_model, "before_update", _set_search_text)
+    event.listen(_model, "after_insert", _index_row)
+    event.listen(_model, "after_update", _index_row)
+    event.listen(_model, "after_delete", _unindex_row)
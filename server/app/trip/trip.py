@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Form, Depends
-from typing import List
-import requests
-from app.models import Hotel, Activity, Sight
-import os
-from fastapi.encoders import jsonable_encoder
+import asyncio
+import time
+import orjson
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select
+from app.models import Hotel, Activity, Sight, Trip, User
 from dotenv import load_dotenv
-from app.db import get_db
-from sqlalchemy.orm import Session
+from app.auth.auth_bearer import get_current_user
+from app.db import AsyncReadSessionLocal, AsyncSessionLocal, mark_write, read_session
+from app.trip.detail import load_trip, serialize_trip
+from app.schemas import NearbyOut, PlanIn, TripOut
+from app.trip.geo import MAX_RADIUS_M, nearby
+from app.trip.planner import MAX_PLAN_DAYS, plan, save_plan
+from app.trip.search import CATALOG_FIELDS, search
+from app.trip.cache import trip_cache, cache_key
 
 load_dotenv()
 
@@ -74,37 +83,225 @@ trip_router = APIRouter()
 #     return response.json()['features']
 
 
-@trip_router.post("/", summary="get trip")
+# Response section -> catalog model.
+SECTIONS = {"hotels": Hotel, "activities": Activity, "attractions": Sight}
+ALL_FIELDS = {field for fields in CATALOG_FIELDS.values() for field in fields}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[frozenset]:
+    """Validate a comma-separated sparse fieldset such as ``name,rating``."""
+    if not fields:
+        return None
+    names = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = names - ALL_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return names | {"id"}
+
+
+async def _search(model, destination: str, fields):
+    if fields is not None:
+        fields = [field for field in CATALOG_FIELDS[model] if field in fields]
+    async with AsyncReadSessionLocal() as db:
+        return await search(db, model, destination, fields=fields)
+
+
+async def _catalog(destination: str, fields=None) -> bytes:
+    """Serialized hotels/activities/attractions members of the trip response."""
+    key = cache_key(destination, fields)
+    fragment = await trip_cache.get(key)
+    if fragment is not None:
+        return fragment
+
+    epoch = trip_cache.epoch
+    # Each lookup gets its own session so the three queries run concurrently.
+    results = await asyncio.gather(
+        *(_search(model, destination, fields) for model in SECTIONS.values())
+    )
+    fragment = orjson.dumps(dict(zip(SECTIONS, results)))[1:-1]
+    await trip_cache.set(key, fragment, epoch=epoch)
+    return fragment
+
+
+@trip_router.post("/", summary="get trip", response_model=TripOut)
 async def get_trip(
     destination: str = Form(...),
     start_date: str = Form(...),
     end_date: str = Form(...),
     travelers: int = Form(...),
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Form(
+        None, description="Comma-separated catalog fields to return, e.g. name,rating"
+    ),
 ):
-    hotels = (
-        db.query(Hotel).filter(Hotel.location.contains(destination)).limit(10).all()
+    fragment = await _catalog(destination, parse_fields(fields))
+    request = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "travelers": travelers,
+        "destination": destination,
+    }
+    rest = orjson.dumps(request)[1:-1]
+
+    return Response(
+        content=b'{"data":{' + fragment + b"," + rest + b"}}",
+        media_type="application/json",
     )
 
-    activities = (
-        db.query(Activity)
-        .filter(Activity.location.contains(destination))
-        .limit(10)
-        .all()
+
+async def _nearby(model, lat, lon, radius, k, fields):
+    if fields is not None:
+        fields = [field for field in CATALOG_FIELDS[model] if field in fields]
+    async with AsyncReadSessionLocal() as db:
+        return await nearby(db, model, lat, lon, radius, k, fields=fields)
+
+
+# Declared before /{trip_id} so "nearby" is not taken for a trip id.
+@trip_router.get(
+    "/nearby", summary="catalog items near a point", response_model=NearbyOut
+)
+async def get_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(2000, gt=0, le=MAX_RADIUS_M, description="metres"),
+    k: int = Query(10, ge=1, le=100),
+    types: Optional[str] = Query(
+        None, description="Comma-separated sections, e.g. hotels,attractions"
+    ),
+    fields: Optional[str] = Query(None),
+):
+    sections = list(SECTIONS)
+    if types:
+        sections = [name.strip() for name in types.split(",") if name.strip()]
+        unknown = set(sections) - set(SECTIONS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown types: {', '.join(sorted(unknown))}",
+            )
+    fields = parse_fields(fields)
+    results = await asyncio.gather(
+        *(
+            _nearby(SECTIONS[name], lat, lon, radius, k, fields)
+            for name in sections
+        )
     )
+    return ORJSONResponse(dict(zip(sections, results)))
+
+
+@trip_router.get("/{trip_id}", summary="get trip with its full itinerary")
+async def get_trip_detail(
+    trip_id: UUID,
+    current_user: User = Depends(get_current_user),
+):
+    async with read_session(current_user.id) as db:
+        trip = await load_trip(db, str(trip_id), current_user.id)
+    if trip is None:
+        raise HTTPException(status_code=404, detail="Trip not found.")
+    return ORJSONResponse(serialize_trip(trip))
+
+
+# Catalog columns the planner needs, and how many candidates it considers.
+PLAN_FIELDS = {
+    "id",
+    "name",
+    "description",
+    "image",
+    "rating",
+    "price",
+    "duration",
+    "latitude",
+    "longitude",
+}
+PLAN_CANDIDATES = 5000
+
+
+async def _candidates(model, destination: str):
+    fields = [field for field in CATALOG_FIELDS[model] if field in PLAN_FIELDS]
+    async with AsyncReadSessionLocal() as db:
+        return await search(
+            db, model, destination, limit=PLAN_CANDIDATES, fields=fields
+        )
+
 
-    attractions = (
-        db.query(Sight).filter(Sight.location.contains(destination)).limit(10).all()
+@trip_router.post("/{trip_id}/plan", summary="fill the trip's itinerary")
+async def plan_trip(
+    trip_id: UUID,
+    options: Optional[PlanIn] = None,
+    current_user: User = Depends(get_current_user),
+):
+    trip_id = str(trip_id)
+    options = options or PlanIn()
+    owned = select(Trip).where(Trip.id == trip_id, Trip.user_id == current_user.id)
+    # Sessions are only open to read the trip and to save the plan; the
+    # candidate searches and the planner run without holding a connection.
+    async with AsyncSessionLocal() as db:
+        trip = await db.scalar(owned)
+    if trip is None:
+        raise HTTPException(status_code=404, detail="Trip not found.")
+    if not trip.destination or not trip.start_date or not trip.end_date:
+        raise HTTPException(
+            status_code=400, detail="Trip needs a destination and dates."
+        )
+    days = (trip.end_date.date() - trip.start_date.date()).days + 1
+    if not 1 <= days <= MAX_PLAN_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trips of 1 to {MAX_PLAN_DAYS} days can be planned.",
+        )
+
+    hotels, sights, activities = await asyncio.gather(
+        _candidates(Hotel, trip.destination),
+        _candidates(Sight, trip.destination),
+        _candidates(Activity, trip.destination),
+    )
+    started = time.perf_counter()
+    hotel, days_planned = await asyncio.to_thread(
+        plan,
+        days,
+        trip.travelers or 1,
+        hotels,
+        sights,
+        activities,
+        day_minutes=options.day_minutes,
+        budget=options.budget,
     )
+    planning_ms = (time.perf_counter() - started) * 1000
 
-    data = {
-        "hotels": hotels,
-        "activities": activities,
-        "attractions": attractions,
-        "start_date": start_date,
-        "end_date": end_date,
-        "travelers": travelers,
-        "destination": destination,
-    }
+    async with AsyncSessionLocal() as db:
+        # The trip may have been deleted while the plan was being built.
+        if await db.scalar(owned.with_only_columns(Trip.id)) is None:
+            raise HTTPException(status_code=404, detail="Trip not found.")
+        itinerary_id = await save_plan(db, trip_id, hotel, days_planned)
+    await mark_write(current_user.id)
 
-    return {"data": jsonable_encoder(data)}
+    return ORJSONResponse(
+        {
+            "itinerary_id": itinerary_id,
+            "hotel": hotel and {"id": hotel["id"], "name": hotel.get("name")},
+            "days": [
+                {
+                    "day": day.day,
+                    "stops": [
+                        {
+                            "type": stop.kind,
+                            "id": stop.row["id"],
+                            "name": stop.row.get("name")
+                            or stop.row.get("description"),
+                            "minutes": stop.minutes,
+                            "cost": stop.cost,
+                        }
+                        for stop in day.stops
+                    ],
+                    "minutes": round(day.minutes),
+                    "cost": day.cost,
+                    "distance_km": round(day.distance_m / 1000, 2),
+                }
+                for day in days_planned
+            ],
+            "total_cost": sum(day.cost for day in days_planned),
+            "candidates": len(hotels) + len(sights) + len(activities),
+            "planning_ms": round(planning_ms, 1),
+        }
+    )
@@ -0,0 +1,440 @@
+"""Shared outbound layer for OpenAI, Google Translate and Supabase.
+
+``clients`` owns one pooled client per service for the life of the app, so
+connections (and their TLS sessions) are kept alive between requests. Every
+call goes through the service's ``Upstream``, which
+
+* caps in-flight calls; callers that cannot get a slot quickly are turned
+  away with a 503 and ``Retry-After`` instead of piling up on the worker,
+* applies a per-attempt timeout and retries transient failures with
+  exponential backoff and full jitter,
+* trips a circuit breaker after repeated failures so a dead service fails
+  fast, and
+* records call counts, errors and latency, reported at ``/ops/upstreams``.
+
+Synchronous client libraries run on a bounded thread pool sized to the same
+cap.
+"""
+
+import asyncio
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+from app import metrics
+
+load_dotenv()
+
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", 2))
+UPSTREAM_RETRY_AFTER = int(os.getenv("UPSTREAM_RETRY_AFTER", 2))
+
+# HTTP statuses worth retrying.
+TRANSIENT_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Every Upstream registers itself here so its stats can be reported.
+upstreams = {}
+
+
+class UpstreamUnavailable(HTTPException):
+    def __init__(self, name: str, retry_after: int = UPSTREAM_RETRY_AFTER):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{name} is busy, please retry shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class UpstreamTimeout(HTTPException):
+    def __init__(self, name: str):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"{name} did not respond in time.",
+        )
+
+
+class UpstreamError(HTTPException):
+    def __init__(self, name: str, error: Exception):
+        self.error = error
+        super().__init__(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"{name} error: {error}",
+        )
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, OSError, httpx.TransportError)):
+        return True
+    # openai is imported with its client; until then it cannot have failed.
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return True
+    code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    response = getattr(error, "response", None)
+    if code is None and response is not None:
+        code = getattr(response, "status_code", None)
+    return code in TRANSIENT_STATUSES
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures for ``cooldown`` seconds.
+
+    Once the cooldown has passed a single probe call is let through; its
+    outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def retry_after(self) -> int:
+        remaining = self.cooldown - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.threshold:
+            if self.opened_at is None or self._probing:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class Upstream:
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        timeout: float,
+        retries: int = 2,
+        backoff: float = 0.2,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30,
+        queue_timeout: float = UPSTREAM_QUEUE_TIMEOUT,
+        max_waiting: int = None,
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.max_waiting = concurrency * 4 if max_waiting is None else max_waiting
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.retried = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self._latencies = deque(maxlen=2048)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._executor = None
+        upstreams[name] = self
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, concurrency: int, timeout: float):
+        """Build an upstream configured by ``<PREFIX>_CONCURRENCY`` etc."""
+        env = lambda key, default: os.getenv(f"{prefix}_{key}", default)
+        return cls(
+            name,
+            concurrency=int(env("CONCURRENCY", concurrency)),
+            timeout=float(env("TIMEOUT", timeout)),
+            retries=int(env("RETRIES", 2)),
+            breaker_threshold=int(env("BREAKER_THRESHOLD", 5)),
+            breaker_cooldown=float(env("BREAKER_COOLDOWN", 30)),
+        )
+
+    def _reject_open_circuit(self):
+        self.rejected += 1
+        raise UpstreamUnavailable(self.name, self.breaker.retry_after())
+
+    async def _acquire(self):
+        if self.breaker.state == "open":
+            self._reject_open_circuit()
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name)
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        if not self.breaker.allow():
+            self._release()
+            self._reject_open_circuit()
+
+    def _release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def _observe(self, started: float, error: Exception = None):
+        elapsed = time.perf_counter() - started
+        self.calls += 1
+        self.latency_sum += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        self._latencies.append(elapsed)
+        if error is not None:
+            self.errors += 1
+        metrics.observe_upstream(self.name, elapsed, error)
+
+    async def _attempts(self, attempt):
+        """Run ``attempt()`` with retries, breaker bookkeeping and metrics."""
+        for retry in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                result = await attempt()
+            except Exception as e:
+                self._observe(started, e)
+                transient = is_transient(e)
+                if transient:
+                    self.breaker.record_failure()
+                else:
+                    # The service answered; the request itself was bad.
+                    self.breaker.record_success()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                if not transient or retry == self.retries or not self.breaker.allow():
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise UpstreamTimeout(self.name)
+                    if isinstance(e, HTTPException):
+                        raise
+                    raise UpstreamError(self.name, e) from e
+                self.retried += 1
+                await asyncio.sleep(random.uniform(0, self.backoff * 2**retry))
+            else:
+                self._observe(started)
+                self.breaker.record_success()
+                return result
+
+    async def call(self, fn, *args, **kwargs):
+        """Await ``fn(*args, **kwargs)`` within this upstream's limits.
+
+        ``fn`` is called again for each retry, so it must not depend on
+        state consumed by an earlier attempt (rewind files inside it).
+        """
+        await self._acquire()
+        try:
+            return await self._attempts(
+                lambda: asyncio.wait_for(fn(*args, **kwargs), self.timeout)
+            )
+        finally:
+            self._release()
+
+    async def call_sync(self, fn, *args, **kwargs):
+        """Run blocking ``fn`` on this upstream's thread pool."""
+        await self._acquire()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.concurrency, thread_name_prefix=self.name
+            )
+        loop = asyncio.get_running_loop()
+        pending = []
+
+        async def attempt():
+            future = loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+            pending.append(future)
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+        try:
+            return await self._attempts(attempt)
+        finally:
+            # The slot is held until the thread is actually free, even if
+            # the caller stopped waiting on a timed out attempt.
+            last = pending[-1] if pending else None
+            if last is None or last.done():
+                self._release()
+            else:
+                last.add_done_callback(lambda _: self._release())
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def quantile(q):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "errors": self.errors,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "circuit": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            "latency_avg": self.latency_sum / self.calls if self.calls else None,
+            "latency_p50": quantile(0.5),
+            "latency_p95": quantile(0.95),
+            "latency_p99": quantile(0.99),
+            "latency_max": self.latency_max,
+        }
+
+
+metrics.Gauge(
+    "upstream_in_flight",
+    "Calls holding an upstream slot.",
+    ("upstream",),
+    collect=lambda: {(name,): u.in_flight for name, u in upstreams.items()},
+)
+metrics.Gauge(
+    "upstream_circuit_open",
+    "1 while the upstream's circuit breaker is open.",
+    ("upstream",),
+    collect=lambda: {
+        (name,): int(u.breaker.state == "open") for name, u in upstreams.items()
+    },
+)
+
+whisper = Upstream.from_env("whisper", "WHISPER", concurrency=8, timeout=60)
+google_translate = Upstream.from_env(
+    "google_translate", "TRANSLATE", concurrency=16, timeout=10
+)
+supabase = Upstream.from_env("supabase", "SUPABASE", concurrency=16, timeout=10)
+
+
+class Clients:
+    """Lazily built, pooled clients shared by every request."""
+
+    def __init__(self):
+        self._openai = None
+        self._translate = None
+        self._translate_session = None
+        self._supabase = None
+        self._lock = threading.Lock()
+
+    @property
+    def openai(self):
+        if self._openai is None:
+            import openai
+
+            pool = httpx.Limits(
+                max_connections=whisper.concurrency,
+                max_keepalive_connections=whisper.concurrency,
+                keepalive_expiry=60,
+            )
+            self._openai = openai.AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1",
+                # Upstream handles retries and timeouts.
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=pool, timeout=whisper.timeout),
+            )
+        return self._openai
+
+    @property
+    def translate(self):
+        with self._lock:
+            if self._translate is None:
+                import google.auth
+                import requests
+                from google.auth.transport.requests import AuthorizedSession
+                from google.cloud import translate_v2
+                from requests.adapters import HTTPAdapter
+
+                endpoint = os.getenv("TRANSLATE_API_ENDPOINT")
+                if endpoint and not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+                    # A local stand-in (emulator, benchmark fake) needs no auth.
+                    session = requests.Session()
+                else:
+                    credentials, _ = google.auth.default(
+                        scopes=translate_v2.Client.SCOPE
+                    )
+                    session = AuthorizedSession(credentials)
+                adapter = HTTPAdapter(pool_maxsize=google_translate.concurrency)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._translate_session = session
+                self._translate = translate_v2.Client(
+                    _http=session,
+                    client_options={"api_endpoint": endpoint} if endpoint else None,
+                )
+        return self._translate
+
+    @property
+    def supabase(self):
+        with self._lock:
+            if self._supabase is None:
+                from supabase import create_client
+                from supabase.lib.client_options import ClientOptions
+
+                self._supabase = create_client(
+                    os.environ.get("SUPABASE_URL"),
+                    os.environ.get("SUPABASE_KEY"),
+                    # One client serves every user; never keep a session on it.
+                    options=ClientOptions(
+                        auto_refresh_token=False,
+                        persist_session=False,
+                        postgrest_client_timeout=supabase.timeout,
+                    ),
+                )
+        return self._supabase
+
+    def configured(self) -> dict:
+        """Which clients have the settings they need; nothing is contacted."""
+        return {
+            "openai": bool(os.getenv("OPENAI_API_KEY")),
+            "translate": bool(
+                os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+                or os.getenv("TRANSLATE_API_ENDPOINT")
+            ),
+            "supabase": bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY")),
+        }
+
+    async def aclose(self):
+        if self._openai is not None:
+            await self._openai.close()
+            self._openai = None
+        if self._translate_session is not None:
+            self._translate_session.close()
+            self._translate_session = self._translate = None
+        self._supabase = None
+
+
+clients = Clients()
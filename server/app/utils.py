@@ -1,8 +1,8 @@
+import os
+import threading
+import time
 import uuid
 from passlib.context import CryptContext
-from fastapi import Request, HTTPException
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.auth.auth_handler import decode_jwt
 
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -15,39 +15,36 @@ def verify_password(password: str, hashed_pass: str) -> bool:
     return password_context.verify(password, hashed_pass)
 
 
-def generate_uuid():
-    return str(uuid.uuid4())
-
-
-class JWTBearer(HTTPBearer):
-    def __init__(self, auto_error: bool = True):
-        super(JWTBearer, self).__init__(auto_error=auto_error)
-
-    async def __call__(self, request: Request):
-        credentials: HTTPAuthorizationCredentials = await super(
-            JWTBearer, self
-        ).__call__(request)
-        if credentials:
-            if not credentials.scheme == "Bearer":
-                raise HTTPException(
-                    status_code=403, detail="Invalid authentication scheme."
-                )
-            if not self.verify_jwt(credentials.credentials):
-                raise HTTPException(
-                    status_code=403, detail="Invalid token or expired token."
-                )
-            return credentials.credentials
+_uuid7_lock = threading.Lock()
+_uuid7_last = (0, 0)  # (unix ms, 12-bit sequence) of the last id handed out
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7).
+
+    A 48-bit Unix millisecond timestamp comes first, so new keys land at the
+    right-hand edge of B-tree indexes. Ids minted in the same millisecond by
+    this process stay ordered: the 12-bit ``rand_a`` field is a counter
+    seeded randomly each millisecond, and its overflow borrows the next one.
+    """
+    global _uuid7_last
+    with _uuid7_lock:
+        ms = time.time_ns() // 1_000_000
+        last_ms, seq = _uuid7_last
+        if ms > last_ms:
+            # Leave headroom so a burst does not overflow straight away.
+            seq = int.from_bytes(os.urandom(2)) & 0x3FF
         else:
-            raise HTTPException(status_code=403, detail="Invalid authorization code.")
+            ms, seq = last_ms, seq + 1
+            if seq > 0xFFF:
+                ms, seq = ms + 1, 0
+        _uuid7_last = (ms, seq)
+    rand_b = int.from_bytes(os.urandom(8)) & ((1 << 62) - 1)
+    return uuid.UUID(
+        int=(ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | seq << 64 | 0b10 << 62 | rand_b
+    )
 
-    def verify_jwt(self, jwtoken: str) -> bool:
-        isTokenValid: bool = False
 
-        try:
-            payload = decode_jwt(jwtoken)
-        except:
-            payload = None
-        if payload:
-            isTokenValid = True
+def generate_uuid():
+    return str(uuid7())
 
-        return isTokenValid
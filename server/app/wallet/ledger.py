@@ -0,0 +1,226 @@
+"""Wallet ledger: append-only entries with a cached running balance.
+
+Amounts are integers in the wallet's minor units. A posting is one or more
+legs ``(wallet_id, amount)`` that succeed or fail together: a top-up or spend
+has one leg, and a transfer has two. Postings are applied in order. Each one
+is accepted only if no wallet it debits would go below zero.
+
+Concurrent postings are queued on ``ledger`` and applied in batches, one
+transaction per batch (group commit). In each batch:
+
+1. The wallets involved are read ``FOR UPDATE`` in id order. Postgres locks
+   the rows, and the fixed order means two workers cannot deadlock.
+2. The postings are applied in memory. ``wallet_entries`` rows are
+   bulk-inserted, each carrying its ``balance_after``.
+3. Each wallet's new balance is written with
+   ``UPDATE ... WHERE version = <version read>``. If another writer got
+   there first and no row matches, the transaction is rolled back and the
+   whole batch is retried.
+
+Step 3 is what makes lost updates impossible on databases that ignore
+``FOR UPDATE``, such as SQLite.
+"""
+
+import asyncio
+import datetime
+import os
+import random
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app.db import AsyncSessionLocal
+from app.models import Wallet, WalletEntry
+from app.utils import generate_uuid
+
+WALLET_BATCH_SIZE = int(os.getenv("WALLET_BATCH_SIZE", 500))
+WALLET_RETRIES = int(os.getenv("WALLET_RETRIES", 10))
+
+
+class StaleWallet(Exception):
+    """A wallet changed between reading and writing it."""
+
+
+@dataclass
+class Posting:
+    kind: str
+    legs: list  # [(wallet_id, amount)]
+    # The first leg's wallet must belong to this user (None: no check).
+    owner: str = None
+    reference: str = None
+
+
+def _reject(status_code: int, detail: str) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+async def _apply(db, postings: list) -> list:
+    """Apply ``postings`` in ``db``'s transaction; one result per posting.
+
+    A result is the posting's new entries, or the HTTPException rejecting it.
+    """
+    ids = sorted({wallet_id for posting in postings for wallet_id, _ in posting.legs})
+    columns = Wallet.id, Wallet.user_id, Wallet.currency, Wallet.balance, Wallet.version
+    rows = await db.execute(
+        select(*columns)
+        .where(Wallet.id.in_(ids))
+        .order_by(Wallet.id)
+        .with_for_update()
+    )
+    wallets = {row.id: row for row in rows}
+    balances = {wallet_id: row.balance for wallet_id, row in wallets.items()}
+
+    results, entries = [], []
+    now = datetime.datetime.now()
+    for posting in postings:
+        legs = posting.legs
+        first = wallets.get(legs[0][0])
+        if first is None or (posting.owner and first.user_id != posting.owner):
+            results.append(_reject(404, "Wallet not found."))
+            continue
+        if any(wallet_id not in wallets for wallet_id, _ in legs):
+            results.append(_reject(404, "Wallet not found."))
+            continue
+        if len({wallets[wallet_id].currency for wallet_id, _ in legs}) > 1:
+            results.append(_reject(400, "Wallets use different currencies."))
+            continue
+        if any(balances[wallet_id] + amount < 0 for wallet_id, amount in legs):
+            results.append(_reject(409, "Insufficient funds."))
+            continue
+
+        transfer_id = generate_uuid() if len(legs) > 1 else None
+        posted = []
+        for wallet_id, amount in legs:
+            balances[wallet_id] += amount
+            posted.append(
+                {
+                    "id": generate_uuid(),
+                    "wallet_id": wallet_id,
+                    "amount": amount,
+                    "balance_after": balances[wallet_id],
+                    "kind": posting.kind,
+                    "transfer_id": transfer_id,
+                    "reference": posting.reference,
+                    "created_at": now,
+                }
+            )
+        entries.extend(posted)
+        results.append(posted)
+
+    for wallet_id, balance in balances.items():
+        row = wallets[wallet_id]
+        if balance == row.balance:
+            continue
+        result = await db.execute(
+            update(Wallet)
+            .where(Wallet.id == wallet_id, Wallet.version == row.version)
+            .values(balance=balance, version=row.version + 1)
+        )
+        if result.rowcount != 1:
+            raise StaleWallet(wallet_id)
+    if entries:
+        await db.execute(insert(WalletEntry), entries)
+    return results
+
+
+class LedgerWriter:
+    """Queues postings from concurrent requests and applies them in batches.
+
+    While one batch commits, the next one fills up, so under load every
+    transaction carries many postings. With no load a posting is applied
+    straight away.
+    """
+
+    def __init__(self, batch_size: int = WALLET_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.batches = 0
+        self.postings = 0
+        self.rejected = 0
+        self.retries = 0
+        self.max_batch = 0
+        self._pending = []
+        self._flusher = None
+
+    async def submit(self, posting: Posting) -> list:
+        """Apply ``posting``; returns its entries or raises HTTPException."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((posting, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        return await future
+
+    async def apply(self, postings: list) -> list:
+        """Apply ``postings`` in one transaction, retrying on write conflicts."""
+        for attempt in range(WALLET_RETRIES):
+            async with AsyncSessionLocal() as db:
+                try:
+                    results = await _apply(db, postings)
+                    await db.commit()
+                    return results
+                except (StaleWallet, OperationalError):
+                    # OperationalError: SQLite's "database is locked" between
+                    # two writers, or a Postgres serialization failure.
+                    await db.rollback()
+            self.retries += 1
+            await asyncio.sleep(random.uniform(0, 0.002 * 2**attempt))
+        raise _reject(503, "Wallet is busy, try again.")
+
+    async def _flush(self):
+        # Let postings submitted in the same loop iteration join the batch.
+        await asyncio.sleep(0)
+        while self._pending:
+            batch = self._pending[: self.batch_size]
+            del self._pending[: self.batch_size]
+            try:
+                results = await self.apply([posting for posting, _ in batch])
+            except Exception as exc:
+                results = [exc] * len(batch)
+            self.batches += 1
+            self.postings += len(batch)
+            self.max_batch = max(self.max_batch, len(batch))
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self.rejected += 1
+                    if not future.done():
+                        future.set_exception(result)
+                elif not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "postings": self.postings,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "max_batch": self.max_batch,
+            "avg_batch": round(self.postings / self.batches, 2) if self.batches else 0,
+            "pending": len(self._pending),
+        }
+
+
+ledger = LedgerWriter()
+
+
+async def reconcile(db, wallet_ids=None) -> list:
+    """Wallets whose cached balance differs from the sum of their entries."""
+    totals = (
+        select(
+            WalletEntry.wallet_id,
+            func.coalesce(func.sum(WalletEntry.amount), 0).label("total"),
+        )
+        .group_by(WalletEntry.wallet_id)
+        .subquery()
+    )
+    query = select(
+        Wallet.id, Wallet.balance, func.coalesce(totals.c.total, 0).label("total")
+    ).outerjoin(totals, totals.c.wallet_id == Wallet.id)
+    if wallet_ids is not None:
+        query = query.where(Wallet.id.in_(wallet_ids))
+    rows = await db.execute(query)
+    return [
+        {"id": row.id, "balance": row.balance, "entries_total": row.total}
+        for row in rows
+        if row.balance != row.total
+    ]
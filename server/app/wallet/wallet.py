@@ -0,0 +1,137 @@
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+
+from app.auth.auth_bearer import get_current_user
+from app.db import AsyncSessionLocal, mark_write, read_session
+from app.models import User, Wallet, WalletEntry
+from app.schemas import AmountIn, EntryOut, EntryPage, TransferIn, WalletIn, WalletOut
+from app.wallet.ledger import Posting, ledger
+
+wallet_router = APIRouter()
+
+MAX_PAGE_SIZE = 100
+
+WALLET_COLUMNS = [getattr(Wallet, field) for field in WalletOut.model_fields]
+ENTRY_COLUMNS = [getattr(WalletEntry, field) for field in EntryOut.model_fields]
+
+
+@wallet_router.post("/", summary="open a wallet", response_model=WalletOut)
+async def create_wallet(
+    data: Optional[WalletIn] = None,
+    current_user: User = Depends(get_current_user),
+):
+    data = data or WalletIn()
+    async with AsyncSessionLocal() as db:
+        wallet = Wallet(user_id=current_user.id, currency=data.currency)
+        db.add(wallet)
+        await db.commit()
+        await db.refresh(wallet)
+    await mark_write(current_user.id)
+    return {field: getattr(wallet, field) for field in WalletOut.model_fields}
+
+
+@wallet_router.get("/", summary="list wallets", response_model=List[WalletOut])
+async def list_wallets(current_user: User = Depends(get_current_user)):
+    async with read_session(current_user.id) as db:
+        result = await db.execute(
+            select(*WALLET_COLUMNS)
+            .where(Wallet.user_id == current_user.id)
+            .order_by(Wallet.id)
+        )
+        return ORJSONResponse([dict(row) for row in result.mappings()])
+
+
+@wallet_router.get("/{wallet_id}", summary="wallet balance", response_model=WalletOut)
+async def get_wallet(wallet_id: UUID, current_user: User = Depends(get_current_user)):
+    async with read_session(current_user.id) as db:
+        result = await db.execute(
+            select(*WALLET_COLUMNS).where(
+                Wallet.id == str(wallet_id), Wallet.user_id == current_user.id
+            )
+        )
+        row = result.mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Wallet not found.")
+    return ORJSONResponse(dict(row))
+
+
+@wallet_router.get(
+    "/{wallet_id}/entries",
+    summary="page through ledger entries, newest first",
+    response_model=EntryPage,
+)
+async def get_entries(
+    wallet_id: UUID,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[UUID] = Query(
+        None, description="next_cursor of the previous page"
+    ),
+    current_user: User = Depends(get_current_user),
+):
+    async with read_session(current_user.id) as db:
+        owned = await db.scalar(
+            select(Wallet.id).where(
+                Wallet.id == str(wallet_id), Wallet.user_id == current_user.id
+            )
+        )
+        if owned is None:
+            raise HTTPException(status_code=404, detail="Wallet not found.")
+        # Entry ids are time-ordered, so paging on id is paging on time.
+        query = select(*ENTRY_COLUMNS).where(WalletEntry.wallet_id == owned)
+        if cursor:
+            query = query.where(WalletEntry.id < str(cursor))
+        query = query.order_by(WalletEntry.id.desc()).limit(limit + 1)
+        rows = [dict(row) for row in (await db.execute(query)).mappings()]
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return ORJSONResponse({"items": rows[:limit], "next_cursor": next_cursor})
+
+
+async def _post(current_user: User, posting: Posting):
+    entries = await ledger.submit(posting)
+    await mark_write(current_user.id)
+    # Only the caller's own leg: the other side of a transfer is private.
+    return ORJSONResponse(entries[0])
+
+
+@wallet_router.post("/{wallet_id}/top-up", summary="add funds", response_model=EntryOut)
+async def top_up(
+    wallet_id: UUID, data: AmountIn, current_user: User = Depends(get_current_user)
+):
+    legs = [(str(wallet_id), data.amount)]
+    return await _post(
+        current_user, Posting("top_up", legs, current_user.id, data.reference)
+    )
+
+
+@wallet_router.post(
+    "/{wallet_id}/spend", summary="pay from a wallet", response_model=EntryOut
+)
+async def spend(
+    wallet_id: UUID, data: AmountIn, current_user: User = Depends(get_current_user)
+):
+    legs = [(str(wallet_id), -data.amount)]
+    return await _post(
+        current_user, Posting("spend", legs, current_user.id, data.reference)
+    )
+
+
+@wallet_router.post(
+    "/{wallet_id}/transfer",
+    summary="move funds to another wallet",
+    response_model=EntryOut,
+)
+async def transfer(
+    wallet_id: UUID, data: TransferIn, current_user: User = Depends(get_current_user)
+):
+    if data.to_wallet_id == wallet_id:
+        raise HTTPException(
+            status_code=400, detail="Cannot transfer to the same wallet."
+        )
+    legs = [(str(wallet_id), -data.amount), (str(data.to_wallet_id), data.amount)]
+    return await _post(
+        current_user, Posting("transfer", legs, current_user.id, data.reference)
+    )
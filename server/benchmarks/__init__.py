@@ -0,0 +1,2 @@
+"""Benchmarks and regression checks, run from the server directory as
+``python -m benchmarks.<name>``."""
@@ -0,0 +1,57 @@
+"""Lookup latency of the in-process nearby index.
+
+Loads N random points (default two million, spread over Kerala so they
+are dense) into a ``GridIndex`` and times ``nearest`` for random query points
+at a few radii.
+
+    cd server && python -m benchmarks.bench_nearby --points 2000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.trip.geo import GridIndex
+
+BOX = (8.0, 13.0, 74.5, 77.5)  # lat min, lat max, lon min, lon max
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=2_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(BOX[0], BOX[1], args.points)
+    lons = rng.uniform(BOX[2], BOX[3], args.points)
+    ids = [str(i) for i in range(args.points)]
+
+    started = time.perf_counter()
+    index = GridIndex()
+    index.load(ids, lats, lons)
+    print(f"built {args.points} points in {time.perf_counter() - started:.2f}s")
+
+    queries = np.column_stack(
+        [
+            rng.uniform(BOX[0], BOX[1], args.queries),
+            rng.uniform(BOX[2], BOX[3], args.queries),
+        ]
+    )
+    for radius in (500, 2000, 10_000, 50_000):
+        samples = []
+        for lat, lon in queries:
+            started = time.perf_counter()
+            index.nearest(lat, lon, radius, args.k)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        print(
+            f"radius={radius:>6}m  p50={samples[len(samples) // 2] * 1e3:6.2f}ms  "
+            f"p99={samples[int(len(samples) * 0.99)] * 1e3:6.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Time the itinerary planner on a large synthetic candidate set.
+
+Plans a 14-day trip over a few thousand sights and activities scattered
+around Kochi, as ``POST /trip/{trip_id}/plan`` would, without the database.
+
+    cd server && python -m benchmarks.bench_planner --candidates 4000
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.trip.planner import plan
+
+
+def rows(rng, n, **extra):
+    lats = rng.normal(9.97, 0.15, n)
+    lons = rng.normal(76.28, 0.15, n)
+    return [
+        {"id": str(i), "name": f"#{i}", "latitude": lat, "longitude": lon, **extra}
+        for i, (lat, lon) in enumerate(zip(lats, lons))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=4000)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    hotels = rows(rng, 200, rating=4.0)
+    sights = rows(rng, args.candidates // 2)
+    activities = rows(rng, args.candidates // 2, price=20.0, duration="2h")
+
+    samples = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        hotel, days = plan(args.days, 2, hotels, sights, activities, budget=1500)
+        samples.append(time.perf_counter() - started)
+
+    stops = sum(len(day.stops) for day in days)
+    print(
+        f"{args.days} days, {len(sights) + len(activities)} candidates: "
+        f"{stops} stops, {sum(day.cost for day in days):.0f} spent, "
+        f"{sum(day.distance_m for day in days) / 1000:.0f} km"
+    )
+    print(
+        f"median {statistics.median(samples) * 1e3:.1f} ms, "
+        f"max {max(samples) * 1e3:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compare the old and new ways of building the /trip/ catalog payload.
+
+old:     ORM instances -> jsonable_encoder -> json.dumps
+new:     column-projected rows -> orjson
+sparse:  as new, with fields=name,rating,location
+
+Each variant loads the same hotels, activities and sights (LIMIT rows of
+each) and serializes them. The loop is timed, bypassing the response cache.
+Run against a scratch database:
+
+    cd server && DB_URL=sqlite:////tmp/bench.db python -m benchmarks.bench_serialization
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+
+from app import models
+from app.db import AsyncSessionLocal, SessionLocal, engine
+from app.trip.search import CATALOG_FIELDS, SEARCH_FIELDS
+
+LIMIT = 10
+DESCRIPTION = "A long description of the place. " * 30
+SPARSE = {"id", "name", "rating", "location"}
+
+
+def seed():
+    db = SessionLocal()
+    for i in range(LIMIT):
+        db.add(
+            models.Hotel(
+                name=f"Hotel {i}",
+                rating=4.0,
+                location="Kochi",
+                description=DESCRIPTION,
+                amenities=["wifi", "pool", "spa", "parking", "breakfast"],
+                image="https://example.com/hotel.jpg",
+                booking_url="https://example.com/book",
+            )
+        )
+        db.add(
+            models.Activity(
+                time="10:00",
+                description=DESCRIPTION,
+                price=25.0,
+                location="Kochi",
+                category="culture",
+                duration="2h",
+            )
+        )
+        db.add(models.Sight(name=f"Sight {i}", location="Kochi", description=DESCRIPTION))
+    db.commit()
+    db.close()
+
+
+async def old(db):
+    catalog = {}
+    for model in SEARCH_FIELDS:
+        catalog[model.__tablename__] = (
+            await db.scalars(select(model).limit(LIMIT))
+        ).all()
+    return json.dumps(jsonable_encoder(catalog)).encode()
+
+
+async def projected(db, fields=None):
+    catalog = {}
+    for model in SEARCH_FIELDS:
+        names = [f for f in CATALOG_FIELDS[model] if fields is None or f in fields]
+        result = await db.execute(
+            select(*(getattr(model, name) for name in names)).limit(LIMIT)
+        )
+        catalog[model.__tablename__] = [dict(row) for row in result.mappings()]
+    return orjson.dumps(catalog)
+
+
+async def timed(name, fn, iterations):
+    samples = []
+    async with AsyncSessionLocal() as db:
+        payload = await fn(db)
+        for _ in range(iterations):
+            db.expunge_all()
+            started = time.perf_counter()
+            await fn(db)
+            samples.append(time.perf_counter() - started)
+    mean = statistics.mean(samples)
+    print(
+        f"{name:<7} mean={mean * 1e6:8.0f}us  "
+        f"p95={sorted(samples)[int(0.95 * len(samples))] * 1e6:8.0f}us  "
+        f"bytes={len(payload)}"
+    )
+    return mean
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(engine)
+    seed()
+    base = await timed("old", old, args.iterations)
+    new = await timed("new", projected, args.iterations)
+    sparse = await timed(
+        "sparse", lambda db: projected(db, SPARSE), args.iterations
+    )
+    print(f"speedup: new {base / new:.2f}x, sparse {base / sparse:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
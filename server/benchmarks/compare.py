@@ -0,0 +1,85 @@
+"""Compare two ``load.py`` result files and flag regressions.
+
+A scenario regresses when, relative to the baseline, any of these happen:
+
+- p50, p95 or p99 latency grows by more than --latency (a fraction);
+- throughput drops by more than --throughput;
+- the error rate rises by more than --errors (absolute).
+
+Exits 1 if any scenario regressed, so it can gate CI.
+
+    cd server && python -m benchmarks.compare baseline.json current.json --latency 0.15
+"""
+
+import argparse
+import json
+import sys
+
+
+def change(old: float, new: float) -> float:
+    if not old:
+        return 0.0 if not new else float("inf")
+    return (new - old) / old
+
+
+def compare(baseline: dict, current: dict, args) -> list:
+    rows = []
+    for name, old in baseline["scenarios"].items():
+        new = current["scenarios"].get(name)
+        if new is None:
+            continue
+        problems = []
+        for quantile in ("p50", "p95", "p99"):
+            delta = change(old["latency_ms"][quantile], new["latency_ms"][quantile])
+            if delta > args.latency:
+                problems.append(f"{quantile} +{delta:.0%}")
+        delta = change(old["rps"], new["rps"])
+        if -delta > args.throughput:
+            problems.append(f"rps {delta:.0%}")
+        if new["error_rate"] - old["error_rate"] > args.errors:
+            problems.append(f"errors {old['error_rate']:.2%} -> {new['error_rate']:.2%}")
+        rows.append((name, old, new, problems))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--latency", type=float, default=0.10)
+    parser.add_argument("--throughput", type=float, default=0.10)
+    parser.add_argument("--errors", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    for key in ("concurrency", "duration_s", "database", "fake_latency_ms"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(
+                f"warning: {key} differs: {baseline['meta'].get(key)} vs "
+                f"{current['meta'].get(key)}",
+                file=sys.stderr,
+            )
+
+    rows = compare(baseline, current, args)
+    print(f"{'scenario':<16} {'rps':>17} {'p50 ms':>17} {'p99 ms':>17}  result")
+    for name, old, new, problems in rows:
+        print(
+            f"{name:<16} {old['rps']:>8}->{new['rps']:<8} "
+            f"{old['latency_ms']['p50']:>8}->{new['latency_ms']['p50']:<8} "
+            f"{old['latency_ms']['p99']:>8}->{new['latency_ms']['p99']:<8} "
+            f"{'; '.join(problems) or 'ok'}"
+        )
+    regressed = [name for name, _, _, problems in rows if problems]
+    if regressed:
+        print(f"FAIL: {len(regressed)} regressed: {', '.join(regressed)}")
+        return 1
+    print("OK: no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
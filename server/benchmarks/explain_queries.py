@@ -0,0 +1,252 @@
+"""Query-plan regression check for the app's hot queries.
+
+Runs the real query code (auth lookup, trip detail, history pages, catalog
+and nearby search, translation caches, wallet postings, translation job
+polling and claims, itinerary replacement) against the database at DB_URL. It records every
+SELECT/UPDATE/DELETE they issue, then EXPLAINs each one. It exits non-zero
+if any plan contains a sequential scan of an app table. On PostgreSQL, seq
+scans are disabled for the EXPLAIN so small tables still show whether an
+index *can* be used.
+
+Tables are created with ``create_all`` when missing. To check the migrations
+instead of the models, point DB_URL at a database built with
+``alembic upgrade head``.
+
+    cd server && DB_URL=sqlite:////tmp/explain.db python -m benchmarks.explain_queries
+"""
+
+import asyncio
+import datetime
+import json
+import re
+import sys
+
+from sqlalchemy import event, select
+
+from app import models
+from app.db import AsyncSessionLocal, async_engine, engine, SessionLocal
+from app.translator.cache import (
+    cached_transcription,
+    cached_translations,
+    text_sha256,
+)
+from app.translator.history import history_page
+from app.translator.jobs import InMemoryJobQueue, JobWorkers, SQLJobQueue
+from app.trip.detail import load_trip
+from app.trip.geo import nearby
+from app.trip.planner import save_plan
+from app.trip.search import search
+from app.wallet.ledger import LedgerWriter, Posting
+
+TABLES = set(models.Base.metadata.tables)
+_sqlite_scan_re = re.compile(r"^SCAN (\w+)")
+
+
+class Ids:
+    user = "0190a000-0000-7000-8000-00000000e001"
+    trip = "0190a000-0000-7000-8000-00000000e002"
+    wallet = "0190a000-0000-7000-8000-00000000e003"
+    job = "0190a000-0000-7000-8000-00000000e004"
+    audio = "0" * 64
+
+
+def seed():
+    db = SessionLocal()
+    if db.get(models.User, Ids.user) is not None:
+        db.close()
+        return
+    user = models.User(id=Ids.user, email="explain@example.com")
+    trip = models.Trip(id=Ids.trip, title="Explain", destination="Kochi", user=user)
+    for i in range(20):
+        hotel = models.Hotel(
+            name=f"Hotel {i}", location="Kochi", latitude=9.93 + i / 1000, longitude=76.26
+        )
+        sight = models.Sight(
+            name=f"Sight {i}", location="Kochi", latitude=9.94, longitude=76.27 + i / 1000
+        )
+        itinerary = models.Itinerary(trip=trip)
+        item = models.ItineraryItem(name=f"Day {i}", day_no=str(i), itinerary=itinerary)
+        item.links = [
+            models.ItineraryItemLink(hotel=hotel),
+            models.ItineraryItemLink(sight=sight),
+        ]
+    started = datetime.datetime(2026, 1, 1)
+    for i in range(50):
+        db.add(
+            models.Translator(
+                original_text=f"text {i}",
+                target_language="es",
+                user=user,
+                created_at=started + datetime.timedelta(minutes=i),
+            )
+        )
+        db.add(
+            models.TranslationCache(
+                text_sha256=text_sha256(f"text {i}"),
+                target_language="es",
+                translated_text=f"texto {i}",
+            )
+        )
+    db.add(models.TranscriptCache(audio_sha256=Ids.audio, text="hola"))
+    db.add(models.Wallet(id=Ids.wallet, user=user))
+    db.add(
+        models.TranslationJob(
+            id=Ids.job, user_id=Ids.user, target_language="es", audio_sha256=Ids.audio
+        )
+    )
+    db.add(trip)
+    db.commit()
+    db.close()
+
+
+async def no_upstream(*args):
+    raise AssertionError("cached scenario reached the upstream")
+
+
+async def scenario_auth(db):
+    await db.get(models.User, Ids.user)
+
+
+async def scenario_trip_detail(db):
+    await load_trip(db, Ids.trip, Ids.user)
+
+
+async def scenario_trip_owner(db):
+    await db.scalar(
+        select(models.Trip).where(
+            models.Trip.id == Ids.trip, models.Trip.user_id == Ids.user
+        )
+    )
+
+
+async def scenario_history(db):
+    _, cursor = await history_page(db, Ids.user, 10)
+    await history_page(db, Ids.user, 10, cursor)
+    await history_page(
+        db, Ids.user, 10, target_language="es", since=datetime.datetime(2026, 1, 1)
+    )
+
+
+async def scenario_search(db):
+    for model in (models.Hotel, models.Activity, models.Sight):
+        await search(db, model, "kochi")
+
+
+async def scenario_nearby(db):
+    for model in (models.Hotel, models.Activity, models.Sight):
+        await nearby(db, model, 9.935, 76.265, 2000)
+
+
+async def scenario_caches(db):
+    await cached_transcription(Ids.audio, no_upstream)
+    await cached_translations(["text 1", "text 2"], "es", no_upstream)
+
+
+async def scenario_wallet(db):
+    await LedgerWriter().apply([Posting("top_up", [(Ids.wallet, 100)], Ids.user)])
+
+
+async def scenario_jobs(db):
+    await SQLJobQueue()._due()
+    workers = JobWorkers(no_upstream, queue=InMemoryJobQueue())
+    await workers.requeue_expired(include_queued=True)
+    await workers._claim(Ids.job)
+
+
+async def scenario_replan(db):
+    await save_plan(db, Ids.trip, None, [])
+
+
+SCENARIOS = [
+    ("auth user lookup", scenario_auth),
+    ("trip detail", scenario_trip_detail),
+    ("trip ownership", scenario_trip_owner),
+    ("history pages", scenario_history),
+    ("catalog search", scenario_search),
+    ("nearby", scenario_nearby),
+    ("translation caches", scenario_caches),
+    ("wallet posting", scenario_wallet),
+    ("translation jobs", scenario_jobs),
+    # Last: it replaces the seeded itinerary.
+    ("itinerary replace", scenario_replan),
+]
+
+
+async def capture(fn) -> list:
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(
+            ("SELECT", "UPDATE", "DELETE", "WITH")
+        ):
+            statements.append((statement, parameters))
+
+    async with AsyncSessionLocal() as db:
+        # Warm up first so one-off work (e.g. in-process index builds) is
+        # not mistaken for the steady-state queries.
+        await fn(db)
+        await db.rollback()
+        event.listen(async_engine.sync_engine, "before_cursor_execute", before_execute)
+        try:
+            await fn(db)
+        finally:
+            event.remove(
+                async_engine.sync_engine, "before_cursor_execute", before_execute
+            )
+    return statements
+
+
+def _postgres_scans(plan) -> set:
+    scans = set()
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in TABLES:
+        scans.add(plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        scans |= _postgres_scans(child)
+    return scans
+
+
+async def sequential_scans(conn, statement, parameters) -> set:
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        result = await conn.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + statement, parameters
+        )
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return _postgres_scans(plan[0]["Plan"])
+    result = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    scans = set()
+    for row in result:
+        detail = row[-1]
+        match = _sqlite_scan_re.match(detail)
+        if match and match.group(1) in TABLES and " USING " not in detail:
+            scans.add(match.group(1))
+    return scans
+
+
+async def main() -> int:
+    models.Base.metadata.create_all(engine)
+    seed()
+    failures = 0
+    async with async_engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, fn in SCENARIOS:
+            for statement, parameters in await capture(fn):
+                scans = await sequential_scans(conn, statement, parameters)
+                status = "OK  " if not scans else "SCAN"
+                summary = " ".join(statement.split())[:110]
+                print(f"{status} {name:<20} {summary}")
+                if scans:
+                    failures += 1
+                    print(f"     sequential scan of: {', '.join(sorted(scans))}")
+    if failures:
+        print(f"FAIL: {failures} queries fall back to sequential scans")
+        return 1
+    print("OK: every query uses an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,218 @@
+"""Local stand-ins for Whisper, Google Translate and Supabase Auth.
+
+One server answers all three, each with its own simulated latency, so
+benchmarks exercise the app's real client libraries, pools and upstream
+limits without leaving the machine:
+
+- ``POST /v1/audio/transcriptions`` (OpenAI): a transcript derived from the
+  audio's digest, so distinct clips give distinct texts.
+- ``POST /language/translate/v2`` (Google Translate v2): ``[<target>] <text>``
+  for every segment.
+- ``POST /auth/v1/signup`` and ``POST /auth/v1/token`` (Supabase GoTrue).
+  Any credentials are accepted. Tokens are signed with JWT_SECRET_KEY, and a
+  user's id is uuid5 of their email, as ``seed.py`` creates them.
+
+``FakeTranscriber`` is an in-process transcription backend for the
+WebSocket stream (``app.translator.stream.backend``).
+
+Point the app at the server with::
+
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+    TRANSLATE_API_ENDPOINT=http://127.0.0.1:9100
+    SUPABASE_URL=http://127.0.0.1:9100
+
+    cd server && python -m benchmarks.fakes --whisper-ms 800 --translate-ms 80
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import io
+import os
+import random
+import threading
+import time
+import uuid
+import wave
+from dataclasses import dataclass
+
+import jwt
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Stand-in anon key; Supabase's client only checks that it looks like a JWT.
+SUPABASE_KEY = "bench.fake.key"
+
+
+@dataclass
+class Latency:
+    whisper_ms: float = 800
+    translate_ms: float = 80
+    supabase_ms: float = 150
+    # Each delay is drawn uniformly from mean * (1 +/- jitter).
+    jitter: float = 0.25
+
+    async def wait(self, mean_ms: float):
+        if mean_ms > 0:
+            spread = mean_ms * self.jitter
+            await asyncio.sleep(random.uniform(mean_ms - spread, mean_ms + spread) / 1000)
+
+
+class FakeTranscriber:
+    """Stand-in for ``WhisperBackend``: ``whisper_ms`` per call, and a text
+    naming the clip's length and digest."""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.calls = 0
+
+    def busy(self) -> bool:
+        return False
+
+    async def transcribe(self, wav: bytes, language: str = None, prompt: str = None):
+        self.calls += 1
+        await self.latency.wait(self.latency.whisper_ms)
+        with wave.open(io.BytesIO(wav)) as audio:
+            seconds = audio.getnframes() / audio.getframerate()
+        digest = hashlib.sha256(wav).hexdigest()[:8]
+        return f"Utterance of {seconds:.1f} seconds {digest}"
+
+
+def user_id_for(email: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"mailto:{email.lower()}"))
+
+
+def _user(email: str, metadata: dict = None) -> dict:
+    return {
+        "id": user_id_for(email),
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": email,
+        "app_metadata": {"provider": "email"},
+        "user_metadata": metadata or {},
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def build_app(latency: Latency) -> FastAPI:
+    app = FastAPI()
+    secret = os.getenv("JWT_SECRET_KEY", "secret")
+    algorithm = os.getenv("JWT_ALGORITHM_KEY", "HS256")
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcribe(request: Request):
+        form = await request.form()
+        audio = await form["file"].read()
+        await latency.wait(latency.whisper_ms)
+        digest = hashlib.sha256(audio).hexdigest()[:12]
+        return {"text": f"Where is the ferry to Fort Kochi {digest}"}
+
+    @app.post("/language/translate/v2")
+    async def translate(request: Request):
+        body = await request.json()
+        texts = body["q"] if isinstance(body["q"], list) else [body["q"]]
+        await latency.wait(latency.translate_ms)
+        return {
+            "data": {
+                "translations": [
+                    {
+                        "translatedText": f"[{body['target']}] {text}",
+                        "detectedSourceLanguage": "en",
+                    }
+                    for text in texts
+                ]
+            }
+        }
+
+    @app.post("/auth/v1/signup")
+    async def signup(request: Request):
+        body = await request.json()
+        await latency.wait(latency.supabase_ms)
+        return _user(body["email"], body.get("data"))
+
+    @app.post("/auth/v1/token")
+    async def token(request: Request):
+        body = await request.json()
+        await latency.wait(latency.supabase_ms)
+        if not body.get("password"):
+            return JSONResponse(
+                {"error": "invalid_grant", "error_description": "Invalid login"},
+                status_code=400,
+            )
+        user = _user(body["email"])
+        expires_in = 3600
+        access_token = jwt.encode(
+            {
+                "sub": user["id"],
+                "aud": "authenticated",
+                "exp": int(time.time()) + expires_in,
+            },
+            secret,
+            algorithm=algorithm,
+        )
+        return {
+            "access_token": access_token,
+            "refresh_token": uuid.uuid4().hex,
+            "expires_in": expires_in,
+            "token_type": "bearer",
+            "user": user,
+        }
+
+    return app
+
+
+def start_server(app, port: int = 0, host: str = "127.0.0.1"):
+    """Serve ``app`` on a daemon thread; returns once it accepts requests.
+
+    Port 0 picks a free port; ``server_port`` tells which.
+    """
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server failed to start on port {port}")
+        time.sleep(0.05)
+    return server
+
+
+def server_port(server) -> int:
+    return server.servers[0].sockets[0].getsockname()[1]
+
+
+def serve_in_thread(latency: Latency, port: int = 0, host: str = "127.0.0.1"):
+    """Start the fakes on a daemon thread; returns once they accept requests."""
+    return start_server(build_app(latency), port, host)
+
+
+def upstream_env(port: int, host: str = "127.0.0.1") -> dict:
+    """Environment pointing the app's clients at the fakes."""
+    base = f"http://{host}:{port}"
+    return {
+        "OPENAI_BASE_URL": f"{base}/v1",
+        "OPENAI_API_KEY": "sk-bench",
+        "TRANSLATE_API_ENDPOINT": base,
+        "GOOGLE_APPLICATION_CREDENTIALS": "",
+        "SUPABASE_URL": base,
+        "SUPABASE_KEY": SUPABASE_KEY,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--whisper-ms", type=float, default=800)
+    parser.add_argument("--translate-ms", type=float, default=80)
+    parser.add_argument("--supabase-ms", type=float, default=150)
+    parser.add_argument("--jitter", type=float, default=0.25)
+    args = parser.parse_args()
+    latency = Latency(args.whisper_ms, args.translate_ms, args.supabase_ms, args.jitter)
+    uvicorn.run(build_app(latency), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
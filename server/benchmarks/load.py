@@ -0,0 +1,448 @@
+"""Drive the app's routers at fixed concurrency and report latency.
+
+By default this starts everything it needs:
+
+- fake Whisper, Translate and Supabase servers (``fakes.py``) with the given
+  latencies;
+- a seeded database (``seed.py``; DB_URL, by default /tmp/bench.db);
+- the app under uvicorn in a subprocess, pointed at both.
+
+Each scenario then runs for --warmup seconds unmeasured and --duration
+seconds measured, with --concurrency requests in flight. Results are
+written as JSON for ``compare.py``, and a summary table goes to stderr.
+
+    cd server && python -m benchmarks.load --out before.json
+    cd server && python -m benchmarks.load --scenarios trip,recent -c 64 --out after.json
+    cd server && python -m benchmarks.compare before.json after.json
+
+With --base-url the app is not started; the running server must already be
+configured with the fakes and the seeded database.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+import jwt
+
+# Before anything imports app.db, which reads these once.
+os.environ.setdefault("DB_URL", "sqlite:////tmp/bench.db")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+os.environ.setdefault("JWT_ALGORITHM_KEY", "HS256")
+
+from benchmarks import fakes
+from benchmarks.seed import DESTINATIONS, seed, user_email
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHRASES = [f"Where is the nearest {place}?" for place in (
+    "station", "pharmacy", "ATM", "beach", "temple", "bus stop", "hospital",
+    "restaurant", "ferry", "market",
+)]
+
+
+class Context:
+    """Seeded ids and tokens shared by the scenarios."""
+
+    def __init__(self, users: list, trips: dict, wallets: dict, secret, algorithm):
+        self.users = users  # [(user_id, email)]
+        self.trips = trips  # user_id -> trip_id
+        self.wallets = wallets  # user_id -> wallet_id
+        self.tokens = {
+            user_id: jwt.encode(
+                {
+                    "user_id": user_id,
+                    "aud": "authenticated",
+                    "expires": time.time() + 24 * 3600,
+                },
+                secret,
+                algorithm=algorithm,
+            )
+            for user_id, _ in users
+        }
+        self.clips = [os.urandom(32 * 1024) for _ in range(20)]
+        self.signups = 0
+
+    def user(self, rng):
+        user_id, email = rng.choice(self.users)
+        return user_id, email, {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+
+def _trip_form(destination: str) -> dict:
+    return {
+        "destination": destination,
+        "start_date": "2026-12-01",
+        "end_date": "2026-12-04",
+        "travelers": "2",
+    }
+
+
+async def trip(client, ctx, rng):
+    return await client.post("/trip/", data=_trip_form(rng.choice(list(DESTINATIONS))))
+
+
+async def trip_uncached(client, ctx, rng):
+    # A unique query misses the response cache and runs the catalog search.
+    destination = f"{rng.choice(list(DESTINATIONS))} {rng.randrange(10**9)}"
+    return await client.post("/trip/", data=_trip_form(destination))
+
+
+async def trip_detail(client, ctx, rng):
+    user_id, _, headers = ctx.user(rng)
+    return await client.get(f"/trip/{ctx.trips[user_id]}", headers=headers)
+
+
+async def nearby(client, ctx, rng):
+    lat, lon = rng.choice(list(DESTINATIONS.values()))
+    params = {"lat": lat + rng.gauss(0, 0.02), "lon": lon + rng.gauss(0, 0.02)}
+    return await client.get("/trip/nearby", params=params)
+
+
+async def translate(client, ctx, rng):
+    _, _, headers = ctx.user(rng)
+    # Half the clips repeat, so the transcript and translation caches hit.
+    audio = rng.choice(ctx.clips) if rng.random() < 0.5 else os.urandom(32 * 1024)
+    return await client.post(
+        "/translator/",
+        files={"audio_file": ("clip.wav", audio, "audio/wav")},
+        data={"target_language": rng.choice(["es", "fr", "de", "ml"])},
+        headers=headers,
+    )
+
+
+async def translate_job(client, ctx, rng):
+    # Measures the submit only; the app's workers process jobs meanwhile.
+    _, _, headers = ctx.user(rng)
+    audio = rng.choice(ctx.clips) if rng.random() < 0.5 else os.urandom(32 * 1024)
+    return await client.post(
+        "/translator/jobs",
+        files={"audio_file": ("clip.wav", audio, "audio/wav")},
+        data={"target_language": rng.choice(["es", "fr", "de", "ml"])},
+        headers=headers,
+    )
+
+
+async def translate_batch(client, ctx, rng):
+    _, _, headers = ctx.user(rng)
+    texts = rng.sample(PHRASES, 5) + [f"Order {rng.randrange(10**9)}" for _ in range(5)]
+    return await client.post(
+        "/translator/batch",
+        json={"texts": texts, "target_languages": ["es", "fr"]},
+        headers=headers,
+    )
+
+
+async def recent(client, ctx, rng):
+    _, _, headers = ctx.user(rng)
+    return await client.get("/translator/recent", headers=headers)
+
+
+async def history(client, ctx, rng):
+    _, _, headers = ctx.user(rng)
+    return await client.get("/translator/history", params={"limit": 20}, headers=headers)
+
+
+async def signup(client, ctx, rng):
+    ctx.signups += 1
+    email = f"signup-{os.getpid()}-{time.time_ns()}-{ctx.signups}@example.com"
+    return await client.post(
+        "/auth/signup",
+        json={
+            "email": email,
+            "password": "bench-password",
+            "username": "bench",
+            "location": "Kochi",
+        },
+    )
+
+
+async def login(client, ctx, rng):
+    _, email, _ = ctx.user(rng)
+    return await client.post(
+        "/auth/login", data={"username": email, "password": "bench-password"}
+    )
+
+
+async def wallet_top_up(client, ctx, rng):
+    user_id, _, headers = ctx.user(rng)
+    return await client.post(
+        f"/wallet/{ctx.wallets[user_id]}/top-up",
+        json={"amount": rng.randint(100, 10_000)},
+        headers=headers,
+    )
+
+
+SCENARIOS = {
+    scenario.__name__: scenario
+    for scenario in (
+        trip,
+        trip_uncached,
+        trip_detail,
+        nearby,
+        translate,
+        translate_job,
+        translate_batch,
+        recent,
+        history,
+        signup,
+        login,
+        wallet_top_up,
+    )
+}
+
+
+def quantile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def run_scenario(client, ctx, scenario, concurrency, warmup, duration, seed):
+    latencies, statuses = [], Counter()
+    measuring = False
+    deadline = time.perf_counter() + warmup
+
+    async def worker(n):
+        # Fresh streams for the measured phase, not a replay of the warmup.
+        rng = random.Random(f"{seed}-{measuring}-{n}")
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, ctx, rng)
+                status = str(response.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            if measuring:
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    measuring = True
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0,
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(quantile(latencies, 0.50) * 1000, 2),
+            "p95": round(quantile(latencies, 0.95) * 1000, 2),
+            "p99": round(quantile(latencies, 0.99) * 1000, 2),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0,
+        },
+        "status": dict(statuses),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_context(users: int, secret: str, algorithm: str) -> Context:
+    from sqlalchemy import inspect, select
+
+    from app import models
+    from app.db import engine
+
+    unseeded = "No seeded users found; run with --catalog or benchmarks.seed first."
+    emails = [user_email(n) for n in range(users)]
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(models.User.__tablename__):
+            raise SystemExit(unseeded)
+        found = connection.execute(
+            select(models.User.id, models.User.email).where(models.User.email.in_(emails))
+        ).all()
+        ids = [user_id for user_id, _ in found]
+        trips = dict(
+            connection.execute(
+                select(models.Trip.user_id, models.Trip.id).where(
+                    models.Trip.user_id.in_(ids)
+                )
+            ).all()
+        )
+        wallets = dict(
+            connection.execute(
+                select(models.Wallet.user_id, models.Wallet.id).where(
+                    models.Wallet.user_id.in_(ids)
+                )
+            ).all()
+        )
+    if not found:
+        raise SystemExit(unseeded)
+    return Context([tuple(row) for row in found], trips, wallets, secret, algorithm)
+
+
+def start_app(env: dict, port: int, workers: int):
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=SERVER_DIR,
+        env=env,
+    )
+    headers = {"Authorization": f"Bearer {env['OPS_TOKEN']}"} if env.get("OPS_TOKEN") else {}
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"App exited with status {process.returncode}")
+        try:
+            url = f"http://127.0.0.1:{port}/ops/startup"
+            if httpx.get(url, headers=headers).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("App did not start within 60s")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SERVER_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: dict):
+    print(
+        f"{'scenario':<16} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'errors':>7}",
+        file=sys.stderr,
+    )
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<16} {result['requests']:>7} {result['rps']:>8} "
+            f"{latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8} "
+            f"{result['errors']:>7}",
+            file=sys.stderr,
+        )
+
+
+async def drive(args, ctx) -> dict:
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    results = {}
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=60
+    ) as client:
+        for name in args.scenarios:
+            results[name] = await run_scenario(
+                client, ctx, SCENARIOS[name], args.concurrency, args.warmup,
+                args.duration, args.seed,
+            )
+            print_table({name: results[name]})
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--base-url", help="benchmark an already running server")
+    parser.add_argument("--catalog", type=int, default=0,
+                        help="seed this many catalog items first (0: use existing data)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--history", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--fake-port", type=int, default=0)
+    parser.add_argument("--whisper-ms", type=float, default=800)
+    parser.add_argument("--translate-ms", type=float, default=80)
+    parser.add_argument("--supabase-ms", type=float, default=150)
+    parser.add_argument("--jitter", type=float, default=0.25)
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    latency = fakes.Latency(
+        args.whisper_ms, args.translate_ms, args.supabase_ms, args.jitter
+    )
+
+    server = app_process = None
+    if args.base_url is None:
+        server = fakes.serve_in_thread(latency, args.fake_port or 0)
+        os.environ.update(fakes.upstream_env(fakes.server_port(server)))
+    if args.catalog:
+        print(f"seeding: {seed(args.catalog, args.users, args.history, args.seed)}",
+              file=sys.stderr)
+    ctx = load_context(
+        args.users, os.environ["JWT_SECRET_KEY"], os.environ["JWT_ALGORITHM_KEY"]
+    )
+
+    try:
+        if args.base_url is None:
+            port = free_port()
+            app_process = start_app(dict(os.environ), port, args.workers)
+            args.base_url = f"http://127.0.0.1:{port}"
+        results = asyncio.run(drive(args, ctx))
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait()
+        if server is not None:
+            server.should_exit = True
+
+    from sqlalchemy.engine import make_url
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(os.environ["DB_URL"]).get_backend_name(),
+            "users": len(ctx.users),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "workers": args.workers,
+            "fake_latency_ms": {
+                "whisper": args.whisper_ms,
+                "translate": args.translate_ms,
+                "supabase": args.supabase_ms,
+                "jitter": args.jitter,
+            },
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Synthetic data for benchmarks.
+
+Seeds the database at DB_URL with:
+
+- a catalog of hotels, activities and sights spread around ``DESTINATIONS``,
+  loaded through the real bulk ingester;
+- users ``bench-<n>@example.com``, with ids matching the fake Supabase in
+  ``fakes.py``;
+- for each user: translation history, one trip with a three-day itinerary,
+  and a funded wallet.
+
+Re-running is safe. The catalog is upserted, and users that already exist
+are skipped.
+
+    cd server && DB_URL=sqlite:////tmp/bench.db python -m benchmarks.seed --catalog 50000 --users 200
+"""
+
+import argparse
+import datetime
+import random
+import time
+
+from sqlalchemy import insert, select
+
+from app import models
+from app.db import engine
+from app.trip.ingest import ingest
+from app.utils import generate_uuid
+from benchmarks.fakes import user_id_for
+
+# name: (lat, lon)
+DESTINATIONS = {
+    "Kochi": (9.9312, 76.2673),
+    "Munnar": (10.0889, 77.0595),
+    "Alleppey": (9.4981, 76.3388),
+    "Thiruvananthapuram": (8.5241, 76.9366),
+    "Kozhikode": (11.2588, 75.7804),
+    "Thrissur": (10.5276, 76.2144),
+    "Varkala": (8.7379, 76.7163),
+    "Wayanad": (11.6854, 76.1320),
+    "Kumarakom": (9.6175, 76.4301),
+    "Thekkady": (9.6031, 77.1615),
+    "Kovalam": (8.4004, 76.9787),
+    "Kannur": (11.8745, 75.3704),
+    "Mysuru": (12.2958, 76.6394),
+    "Madurai": (9.9252, 78.1198),
+    "Ooty": (11.4102, 76.6950),
+    "Goa": (15.2993, 74.1240),
+    "Mumbai": (19.0760, 72.8777),
+    "Bengaluru": (12.9716, 77.5946),
+    "Chennai": (13.0827, 80.2707),
+    "Hampi": (15.3350, 76.4600),
+}
+
+_ADJECTIVES = ["Royal", "Green", "Old", "Grand", "Quiet", "Coastal", "Spice", "Lake"]
+_NOUNS = {
+    "hotels": ["Residency", "Inn", "Homestay", "Resort", "Palace", "Retreat"],
+    "activities": ["Kayak Tour", "Cooking Class", "Tea Walk", "Kathakali Show"],
+    "sights": ["Fort", "Palace", "Church", "Temple", "Museum", "Beach", "Falls"],
+}
+_CATEGORIES = ["sightseeing", "culture", "adventure", "relaxation"]
+
+
+def user_email(n: int) -> str:
+    return f"bench-{n}@example.com"
+
+
+def _catalog(kind: str, count: int, rng: random.Random):
+    destinations = list(DESTINATIONS.items())
+    for i in range(count):
+        city, (lat, lon) = destinations[i % len(destinations)]
+        name = f"{rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS[kind])} {city} {i}"
+        record = {
+            "external_id": f"{kind}-{i}",
+            "name": name,
+            "description": f"{name}, a synthetic {kind[:-1]} in {city}.",
+            "location": city,
+            "latitude": lat + rng.gauss(0, 0.04),
+            "longitude": lon + rng.gauss(0, 0.04),
+            "image": f"https://example.com/{kind}/{i}.jpg",
+        }
+        if kind == "hotels":
+            record["rating"] = round(rng.uniform(2.5, 5), 1)
+            record["amenities"] = rng.sample(["wifi", "pool", "spa", "parking"], 2)
+            record["booking_url"] = f"https://example.com/book/{i}"
+        elif kind == "activities":
+            record["price"] = rng.choice([300, 500, 800, 1200, 2500])
+            record["duration"] = rng.choice(["1h", "2 hours", "90 min", "3h"])
+            record["category"] = rng.choice(_CATEGORIES)
+        yield record
+
+
+def seed_catalog(size: int, rng: random.Random):
+    per_kind = size // 3
+    for kind, model in (
+        ("hotels", models.Hotel),
+        ("activities", models.Activity),
+        ("sights", models.Sight),
+    ):
+        ingest(model, _catalog(kind, per_kind, rng), source="bench")
+
+
+def seed_users(count: int, history: int, rng: random.Random):
+    with engine.begin() as connection:
+        existing = set(
+            connection.scalars(
+                select(models.User.id).where(models.User.email.like("bench-%"))
+            )
+        )
+        hotel_ids = list(connection.scalars(select(models.Hotel.id).limit(500)))
+        sight_ids = list(connection.scalars(select(models.Sight.id).limit(500)))
+        users, translations, trips, itineraries, items, links = [], [], [], [], [], []
+        wallets, entries = [], []
+        now = datetime.datetime.now()
+        for n in range(count):
+            email = user_email(n)
+            user_id = user_id_for(email)
+            if user_id in existing:
+                continue
+            users.append({"id": user_id, "email": email, "username": f"bench{n}"})
+            for i in range(history):
+                translations.append(
+                    {
+                        "id": generate_uuid(),
+                        "user_id": user_id,
+                        "original_text": f"Phrase {i} from {email}",
+                        "translation": f"[es] Phrase {i} from {email}",
+                        "target_language": "es",
+                        "created_at": now - datetime.timedelta(minutes=history - i),
+                    }
+                )
+            city = rng.choice(list(DESTINATIONS))
+            trip_id, itinerary_id = generate_uuid(), generate_uuid()
+            trips.append(
+                {
+                    "id": trip_id,
+                    "user_id": user_id,
+                    "title": f"{city} trip",
+                    "destination": city,
+                    "start_date": now,
+                    "end_date": now + datetime.timedelta(days=3),
+                    "travelers": 2,
+                }
+            )
+            itineraries.append({"id": itinerary_id, "trip_id": trip_id})
+            for day in range(1, 4):
+                for column, ids in (("hotel_id", hotel_ids), ("sight_id", sight_ids)):
+                    if not ids:
+                        continue
+                    item_id = generate_uuid()
+                    items.append(
+                        {
+                            "id": item_id,
+                            "itinerary_id": itinerary_id,
+                            "name": f"Day {day} {column[:-3]}",
+                            "day_no": str(day),
+                            "category": "hotel" if column == "hotel_id" else "sights",
+                        }
+                    )
+                    links.append(
+                        {
+                            "id": generate_uuid(),
+                            "itinerary_item_id": item_id,
+                            "hotel_id": None,
+                            "sight_id": None,
+                            "activity_id": None,
+                            column: rng.choice(ids),
+                        }
+                    )
+            wallet_id = generate_uuid()
+            wallets.append({"id": wallet_id, "user_id": user_id, "balance": 10**9})
+            entries.append(
+                {
+                    "id": generate_uuid(),
+                    "wallet_id": wallet_id,
+                    "amount": 10**9,
+                    "balance_after": 10**9,
+                    "kind": "opening",
+                }
+            )
+        for table, rows in (
+            (models.User, users),
+            (models.Translator, translations),
+            (models.Trip, trips),
+            (models.Itinerary, itineraries),
+            (models.ItineraryItem, items),
+            (models.ItineraryItemLink, links),
+            (models.Wallet, wallets),
+            (models.WalletEntry, entries),
+        ):
+            if rows:
+                connection.execute(insert(table), rows)
+    return len(users)
+
+
+def seed(catalog: int, users: int, history: int, seed: int = 0):
+    rng = random.Random(seed)
+    models.Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    if catalog:
+        seed_catalog(catalog, rng)
+    created = seed_users(users, history, rng)
+    return {
+        "catalog": catalog,
+        "users_created": created,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--catalog", type=int, default=30_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--history", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(seed(args.catalog, args.users, args.history, args.seed))
+
+
+if __name__ == "__main__":
+    main()
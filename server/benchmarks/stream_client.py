@@ -0,0 +1,179 @@
+"""Drive /translator/stream with synthetic speech and time the results.
+
+Each connection streams a few utterances in real time, in 100 ms frames.
+An utterance is a tone burst standing in for speech, followed by a pause.
+For each utterance it records:
+
+- first partial: from the start of the utterance to its first partial;
+- final: from the end of the utterance to its final result. This includes
+  the pause the server waits for before it cuts the utterance.
+
+By default the app runs in-process. Transcription uses
+``fakes.FakeTranscriber`` and translation goes to the HTTP fakes. Pass
+--url and --token to drive a running server instead. Exits 1 if any
+utterance did not get exactly one final.
+
+    cd server && python -m benchmarks.stream_client -c 8 --utterances 5
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("DB_URL", "sqlite:////tmp/stream.db")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+os.environ.setdefault("JWT_ALGORITHM_KEY", "HS256")
+
+import jwt
+import numpy as np
+import orjson
+import websockets
+
+from benchmarks import fakes
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.1
+
+
+def tone(seconds: float, frequency: float, amplitude: float = 6000) -> bytes:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * math.pi * frequency * t)).astype("<i2").tobytes()
+
+
+def silence(seconds: float) -> bytes:
+    return bytes(int(seconds * SAMPLE_RATE) * 2)
+
+
+def frames(pcm: bytes):
+    size = int(FRAME_SECONDS * SAMPLE_RATE) * 2
+    for i in range(0, len(pcm), size):
+        yield pcm[i : i + size]
+
+
+async def session(url: str, utterances: int, pause: float, speed: float, rng) -> dict:
+    started, ended, partials, finals, errors = {}, {}, {}, {}, []
+    async with websockets.connect(url, max_size=2**20) as ws:
+        ready = orjson.loads(await ws.recv())
+        assert ready["type"] == "ready", ready
+
+        async def receive():
+            async for raw in ws:
+                message = orjson.loads(raw)
+                now = time.perf_counter()
+                kind = message["type"]
+                if kind == "partial":
+                    partials.setdefault(message["segment"], now)
+                elif kind == "final":
+                    if message["segment"] in finals:
+                        errors.append(f"duplicate final {message['segment']}")
+                    finals[message["segment"]] = now
+                elif kind == "error":
+                    errors.append(message["detail"])
+                elif kind == "end":
+                    return
+
+        receiver = asyncio.create_task(receive())
+        for i in range(utterances):
+            speech = tone(rng.uniform(1.5, 3.5), rng.uniform(180, 320))
+            started[i] = time.perf_counter()
+            for frame in frames(speech):
+                await ws.send(frame)
+                await asyncio.sleep(FRAME_SECONDS / speed)
+            ended[i] = time.perf_counter()
+            for frame in frames(silence(pause)):
+                await ws.send(frame)
+                await asyncio.sleep(FRAME_SECONDS / speed)
+        await ws.send(orjson.dumps({"type": "end"}).decode())
+        await asyncio.wait_for(receiver, 120)
+
+    missing = [i for i in range(utterances) if i not in finals]
+    errors.extend(f"no final for utterance {i}" for i in missing)
+    return {
+        "first_partial": [partials[i] - started[i] for i in partials if i in started],
+        "final": [finals[i] - ended[i] for i in finals if i in ended],
+        "errors": errors,
+    }
+
+
+def summary(samples: list) -> str:
+    if not samples:
+        return "n/a"
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    return f"p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms (n={len(samples)})"
+
+
+def start_in_process(latency: fakes.Latency) -> tuple:
+    """Boot fakes and the app on free ports; returns (base ws url, token)."""
+    fake_server = fakes.serve_in_thread(latency)
+    os.environ.update(fakes.upstream_env(fakes.server_port(fake_server)))
+
+    from app import app, models
+    from app.db import SessionLocal, engine
+    from app.translator import stream
+
+    models.Base.metadata.create_all(engine)
+    email = "stream-bench@example.com"
+    user_id = fakes.user_id_for(email)
+    with SessionLocal() as db:
+        db.merge(models.User(id=user_id, email=email))
+        db.commit()
+    stream.backend = fakes.FakeTranscriber(latency)
+
+    server = fakes.start_server(app)
+    token = jwt.encode(
+        {"user_id": user_id, "aud": "authenticated", "expires": time.time() + 3600},
+        os.environ["JWT_SECRET_KEY"],
+        algorithm=os.environ["JWT_ALGORITHM_KEY"],
+    )
+    return f"ws://127.0.0.1:{fakes.server_port(server)}", token
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-c", "--connections", type=int, default=4)
+    parser.add_argument("--utterances", type=int, default=4)
+    parser.add_argument("--pause", type=float, default=0.9, help="seconds")
+    parser.add_argument("--speed", type=float, default=1, help="x real time")
+    parser.add_argument("--language", default="es", help="target language")
+    parser.add_argument("--url", help="ws(s):// base URL of a running server")
+    parser.add_argument("--token", help="bearer token for --url")
+    parser.add_argument("--whisper-ms", type=float, default=400)
+    parser.add_argument("--translate-ms", type=float, default=80)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.url:
+        base, token = args.url.rstrip("/"), args.token
+    else:
+        latency = fakes.Latency(args.whisper_ms, args.translate_ms, 0)
+        base, token = start_in_process(latency)
+    url = f"{base}/translator/stream?target_language={args.language}&token={token}"
+
+    rng = random.Random(args.seed)
+    results = await asyncio.gather(
+        *(
+            session(url, args.utterances, args.pause, args.speed, random.Random(seed))
+            for seed in [rng.random() for _ in range(args.connections)]
+        )
+    )
+    first_partial = [x for result in results for x in result["first_partial"]]
+    final = [x for result in results for x in result["final"]]
+    errors = [x for result in results for x in result["errors"]]
+    print(f"{args.connections} connections x {args.utterances} utterances")
+    print(f"  first partial after speech starts: {summary(first_partial)}")
+    print(f"  final after speech ends:           {summary(final)}")
+    if errors:
+        print(f"FAIL: {len(errors)} errors, e.g. {errors[:5]}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
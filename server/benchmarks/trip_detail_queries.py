@@ -0,0 +1,87 @@
+"""Check that loading a trip's itinerary graph takes a fixed number of queries.
+
+Seeds trips of growing size into the database at DB_URL (use a scratch
+SQLite file, e.g. ``DB_URL=sqlite:////tmp/bench.db``), loads each with
+``load_trip`` while counting SQL statements, and exits non-zero if the count
+changes with the size of the trip.
+
+    cd server && python -m benchmarks.trip_detail_queries
+"""
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy import event
+
+from app import models
+from app.db import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.trip.detail import load_trip, serialize_trip
+
+SIZES = (1, 5, 25)
+ITEMS_PER_ITINERARY = 8
+
+
+def seed(size: int) -> tuple:
+    db = SessionLocal()
+    user = models.User(email=f"bench-{size}-{time.time()}@example.com")
+    hotel = models.Hotel(name="Bench Hotel", location="Kochi")
+    sight = models.Sight(name="Bench Sight", location="Kochi")
+    trip = models.Trip(title=f"{size} days", destination="Kochi", user=user)
+    trip.places = [models.Place(name=f"Place {i}") for i in range(size)]
+    for day in range(size):
+        itinerary = models.Itinerary(trip=trip)
+        for i in range(ITEMS_PER_ITINERARY):
+            item = models.ItineraryItem(
+                name=f"Item {i}", day_no=str(day + 1), itinerary=itinerary
+            )
+            item.links = [
+                models.ItineraryItemLink(hotel=hotel),
+                models.ItineraryItemLink(sight=sight),
+                models.ItineraryItemLink(activity=models.Activity(location="Kochi")),
+            ]
+    db.add(trip)
+    db.commit()
+    ids = trip.id, user.id
+    db.close()
+    return ids
+
+
+async def count_queries(trip_id: str, user_id: str) -> tuple:
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_execute)
+    try:
+        async with AsyncSessionLocal() as db:
+            trip = await load_trip(db, trip_id, user_id)
+        data = serialize_trip(trip)
+    finally:
+        event.remove(
+            async_engine.sync_engine, "before_cursor_execute", before_execute
+        )
+    return len(statements), data
+
+
+async def main() -> int:
+    models.Base.metadata.create_all(engine)
+    counts = {}
+    for size in SIZES:
+        trip_id, user_id = seed(size)
+        counts[size], data = await count_queries(trip_id, user_id)
+        items = sum(len(itinerary["items"]) for itinerary in data["itineraries"])
+        print(f"itineraries={size:<3} items={items:<4} queries={counts[size]}")
+        assert len(data["itineraries"]) == size
+        assert items == size * ITEMS_PER_ITINERARY
+
+    if len(set(counts.values())) != 1:
+        print("FAIL: query count grows with the itinerary")
+        return 1
+    print("OK: query count is constant")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,149 @@
+"""Concurrency stress test for the wallet ledger.
+
+Opens W wallets, then fires N top-ups, spends and transfers at them all at
+once, spread over several ``LedgerWriter`` instances. Each writer stands in
+for a separate worker process, so batches from different writers really do
+race on the same rows. Afterwards it checks that:
+
+- every wallet's balance equals the opening amount plus everything the
+  ledger reported as accepted (no lost or phantom updates);
+- every balance equals the sum of the wallet's entries (``reconcile``);
+- each wallet's entries, in id order, form an unbroken running balance that
+  never goes negative.
+
+Exits 1 if any check fails.
+
+    cd server && DB_URL=sqlite:////tmp/wallet.db python -m benchmarks.wallet_stress --ops 5000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app import models
+from app.db import AsyncSessionLocal, engine
+from app.utils import generate_uuid
+from app.wallet.ledger import LedgerWriter, Posting, reconcile
+
+OPENING = 100_000
+
+
+async def setup(wallet_count: int) -> list:
+    async with AsyncSessionLocal() as db:
+        user = models.User(id=generate_uuid(), email=f"stress-{time.time()}@example.com")
+        wallets = [models.Wallet(user=user) for _ in range(wallet_count)]
+        db.add_all([user, *wallets])
+        await db.commit()
+        return user.id, [wallet.id for wallet in wallets]
+
+
+def random_posting(rng, user_id: str, wallet_ids: list) -> Posting:
+    amount = rng.randint(1, 5000)
+    source = rng.choice(wallet_ids)
+    roll = rng.random()
+    if roll < 0.4:
+        return Posting("top_up", [(source, amount)], user_id)
+    if roll < 0.75:
+        return Posting("spend", [(source, -amount)], user_id)
+    target = rng.choice([wallet_id for wallet_id in wallet_ids if wallet_id != source])
+    return Posting("transfer", [(source, -amount), (target, amount)], user_id)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wallets", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(engine)
+    user_id, wallet_ids = await setup(args.wallets)
+    writers = [LedgerWriter() for _ in range(args.writers)]
+    await asyncio.gather(
+        *(
+            writers[i % args.writers].submit(
+                Posting("opening", [(wallet_id, OPENING)], user_id)
+            )
+            for i, wallet_id in enumerate(wallet_ids)
+        )
+    )
+
+    rng = random.Random(args.seed)
+    expected = {wallet_id: OPENING for wallet_id in wallet_ids}
+    outcomes = defaultdict(int)
+
+    async def run(i: int, posting: Posting):
+        try:
+            entries = await writers[i % args.writers].submit(posting)
+        except HTTPException as exc:
+            outcomes[f"{posting.kind} rejected ({exc.status_code})"] += 1
+            return
+        outcomes[posting.kind] += 1
+        for entry in entries:
+            expected[entry["wallet_id"]] += entry["amount"]
+
+    postings = [random_posting(rng, user_id, wallet_ids) for _ in range(args.ops)]
+    started = time.perf_counter()
+    await asyncio.gather(*(run(i, posting) for i, posting in enumerate(postings)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.ops} postings in {elapsed:.2f}s ({args.ops / elapsed:,.0f}/s)")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome:<28} {count}")
+    for i, writer in enumerate(writers):
+        print(f"  writer {i}: {writer.stats()}")
+
+    failures = []
+    async with AsyncSessionLocal() as db:
+        balances = dict(
+            (await db.execute(
+                select(models.Wallet.id, models.Wallet.balance).where(
+                    models.Wallet.id.in_(wallet_ids)
+                )
+            )).all()
+        )
+        for wallet_id in wallet_ids:
+            if balances[wallet_id] != expected[wallet_id]:
+                failures.append(
+                    f"{wallet_id}: balance {balances[wallet_id]}, "
+                    f"expected {expected[wallet_id]}"
+                )
+        for row in await reconcile(db, wallet_ids):
+            failures.append(f"{row['id']}: balance {row['balance']}, entries "
+                            f"total {row['entries_total']}")
+        entries = await db.execute(
+            select(
+                models.WalletEntry.wallet_id,
+                models.WalletEntry.amount,
+                models.WalletEntry.balance_after,
+            )
+            .where(models.WalletEntry.wallet_id.in_(wallet_ids))
+            .order_by(models.WalletEntry.wallet_id, models.WalletEntry.id)
+        )
+        running = defaultdict(int)
+        for wallet_id, amount, balance_after in entries:
+            running[wallet_id] += amount
+            if running[wallet_id] != balance_after or balance_after < 0:
+                failures.append(
+                    f"{wallet_id}: running balance {running[wallet_id]}, "
+                    f"entry says {balance_after}"
+                )
+
+    if failures:
+        print(f"FAIL: {len(failures)} inconsistencies")
+        for failure in failures[:20]:
+            print(f"  {failure}")
+        return 1
+    print(f"OK: {args.wallets} wallets consistent, total {sum(balances.values())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite file before anything imports app.db.
+_db_dir = tempfile.mkdtemp(prefix="app-tests-")
+os.environ["DB_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ.pop("ASYNC_DB_URL", None)
+os.environ.pop("DB_REPLICA_URLS", None)
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM_KEY", "HS256")
+# Clients built at import time only need something well-formed; tests never
+# reach the real services.
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "test.test.test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", f"{_db_dir}/credentials.json")
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    from app import models
+    from app.db import engine
+
+    models.Base.metadata.create_all(engine)
+    yield
+    models.Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def checked_out():
+    """Connections of the async engine currently checked out of its pool."""
+    from app.db import async_engine
+
+    pool = async_engine.sync_engine.pool
+    count = 0
+
+    def on_checkout(*args):
+        nonlocal count
+        count += 1
+
+    def on_checkin(*args):
+        nonlocal count
+        count -= 1
+
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+    yield lambda: count
+    event.remove(pool, "checkout", on_checkout)
+    event.remove(pool, "checkin", on_checkin)
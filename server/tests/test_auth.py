@@ -0,0 +1,25 @@
+import time
+
+import jwt
+
+from app.auth import auth_handler
+
+
+def token(**claims) -> str:
+    claims.setdefault("sub", "5f0c2a8e-1111-4222-8333-444455556666")
+    claims.setdefault("exp", int(time.time()) + 60)
+    return jwt.encode(
+        claims, auth_handler.JWT_SECRET, algorithm=auth_handler.JWT_ALGORITHM
+    )
+
+
+def test_only_user_audience_tokens_decode():
+    assert auth_handler.decode_jwt(token(aud="authenticated"))
+    # e.g. Supabase's anon key, signed with the same secret.
+    assert not auth_handler.decode_jwt(token(aud="anon"))
+    assert not auth_handler.decode_jwt(token())
+
+
+def test_signed_tokens_round_trip():
+    signed = auth_handler.sign_jwt("user-1")["access_token"]
+    assert auth_handler.token_subject(auth_handler.decode_jwt(signed)) == "user-1"
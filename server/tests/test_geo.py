@@ -0,0 +1,36 @@
+import pytest
+
+from app import models
+from app.db import SessionLocal
+from app.trip import geo
+
+
+@pytest.fixture
+def grid_index():
+    index = geo._indexes[models.Sight] = geo.GridIndex()
+    yield index
+    geo._indexes.pop(models.Sight)
+
+
+def ids(index, lat, lon):
+    return [doc for doc, _ in index.nearest(lat, lon, 500, 5)]
+
+
+def test_grid_index_follows_commits_only(grid_index):
+    with SessionLocal() as db:
+        db.add(models.Sight(name="Fort Kochi Beach", latitude=9.96, longitude=76.24))
+        db.flush()
+        db.rollback()
+    assert ids(grid_index, 9.96, 76.24) == []
+
+    with SessionLocal() as db:
+        sight = models.Sight(name="Fort Kochi Beach", latitude=9.96, longitude=76.24)
+        db.add(sight)
+        db.flush()
+        assert ids(grid_index, 9.96, 76.24) == []
+        db.commit()
+        assert ids(grid_index, 9.96, 76.24) == [sight.id]
+
+        sight.latitude = None
+        db.commit()
+        assert ids(grid_index, 9.96, 76.24) == []
@@ -0,0 +1,64 @@
+import asyncio
+import datetime
+import uuid
+
+from sqlalchemy import insert, update
+
+from app import models
+from app.db import AsyncSessionLocal, SessionLocal
+from app.translator.history import history_page
+from app.utils import generate_uuid
+
+
+def add_history(dated: int, undated: int) -> tuple:
+    """A new user with ``dated`` and ``undated`` translations, newest first."""
+    user_id = generate_uuid()
+    start = datetime.datetime(2026, 10, 1)
+    rows = [
+        {"id": generate_uuid(), "created_at": start + datetime.timedelta(minutes=i)}
+        for i in range(dated + undated)
+    ]
+    with SessionLocal() as db:
+        db.add(models.User(id=user_id, email=f"{uuid.uuid4().hex}@example.com"))
+        db.flush()
+        db.execute(
+            insert(models.Translator),
+            [{**row, "user_id": user_id, "target_language": "ml"} for row in rows],
+        )
+        # As left by writes that bypassed the model's default.
+        db.execute(
+            update(models.Translator)
+            .where(models.Translator.id.in_([row["id"] for row in rows[dated:]]))
+            .values(created_at=None)
+        )
+        db.commit()
+    newest_dated = [row["id"] for row in rows[:dated]][::-1]
+    newest_undated = sorted(row["id"] for row in rows[dated:])[::-1]
+    return user_id, newest_dated + newest_undated
+
+
+def all_pages(user_id: str, limit: int, **filters) -> list:
+    async def run():
+        ids, cursor = [], None
+        async with AsyncSessionLocal() as db:
+            while True:
+                items, cursor = await history_page(
+                    db, user_id, limit, cursor, **filters
+                )
+                ids += [item["id"] for item in items]
+                if cursor is None:
+                    return ids
+
+    return asyncio.run(run())
+
+
+def test_undated_rows_follow_dated_ones():
+    user_id, expected = add_history(dated=3, undated=4)
+    for limit in (1, 2, 3, 7, 10):
+        assert all_pages(user_id, limit) == expected
+
+
+def test_time_range_skips_undated_rows():
+    user_id, expected = add_history(dated=3, undated=2)
+    since = datetime.datetime(2026, 10, 1, 0, 1)
+    assert all_pages(user_id, 1, since=since) == expected[:2]
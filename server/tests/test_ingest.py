@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import select
+
+from app import models
+from app.db import SessionLocal
+from app.trip import geo, search
+from app.trip.cache import cache_key, trip_cache
+from app.trip.ingest import ingest
+
+
+@pytest.fixture
+def indexes():
+    search._indexes[models.Hotel] = search.TrigramIndex()
+    geo._indexes[models.Hotel] = geo.GridIndex()
+    yield search._indexes[models.Hotel], geo._indexes[models.Hotel]
+    search._indexes.pop(models.Hotel)
+    geo._indexes.pop(models.Hotel)
+
+
+def stored(external_id: str):
+    with SessionLocal() as db:
+        return db.scalar(
+            select(models.Hotel).where(models.Hotel.external_id == external_id)
+        )
+
+
+def test_partial_update_rebuilds_derived_columns(indexes):
+    text_index, grid_index = indexes
+    row = {
+        "id": "h1",
+        "name": "Old Lodge",
+        "location": "Kochi",
+        "latitude": 9.93,
+        "longitude": 76.26,
+    }
+    ingest(models.Hotel, [row], source="test")
+    before = stored("test:h1")
+    trip_cache.local.set(cache_key("old lodge"), b"[]")
+
+    # No location or coordinates: those keep their stored values.
+    ingest(models.Hotel, [{"id": "h1", "name": "Marine Inn"}], source="test")
+
+    after = stored("test:h1")
+    assert after.id == before.id
+    assert after.location == "Kochi"
+    assert after.search_text == "marine inn kochi"
+    assert after.geohash == before.geohash
+    # The cached result the old name matched is gone.
+    assert trip_cache.local.get(cache_key("old lodge")) is None
+    assert [doc for doc, _ in text_index.search("marine inn", 5)] == [after.id]
+    assert text_index.search("old lodge", 5) == []
+    assert [doc for doc, _ in grid_index.nearest(9.93, 76.26, 100, 5)] == [after.id]
+
+
+def test_moving_a_row_updates_the_grid_index(indexes):
+    _, grid_index = indexes
+    rows = [{"id": "h2", "name": "Hill View", "latitude": 10.0, "longitude": 77.0}]
+    ingest(models.Hotel, rows, source="test")
+    ingest(models.Hotel, [{"id": "h2", "latitude": 11.0}], source="test")
+
+    row = stored("test:h2")
+    assert row.geohash == geo.encode_geohash(11.0, 77.0)
+    assert grid_index.nearest(10.0, 77.0, 1000, 5) == []
+    assert [doc for doc, _ in grid_index.nearest(11.0, 77.0, 100, 5)] == [row.id]
@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.ops import ops
+
+app = FastAPI()
+app.include_router(ops.ops_router, prefix="/ops")
+app.include_router(ops.metrics_router)
+
+LOCAL, REMOTE = ("127.0.0.1", 5000), ("203.0.113.7", 5000)
+
+
+def status(path: str, client=LOCAL, headers=None) -> int:
+    async def get():
+        transport = httpx.ASGITransport(app=app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ops") as http:
+            return (await http.get(path, headers=headers)).status_code
+
+    return asyncio.run(get())
+
+
+@pytest.mark.parametrize("path", ["/ops/uploads", "/metrics"])
+def test_without_a_token_only_local_clients_get_in(path, monkeypatch):
+    monkeypatch.setattr(ops, "OPS_TOKEN", None)
+    assert status(path) == 200
+    assert status(path, client=REMOTE) == 403
+    # A proxy on this host relaying someone else's request.
+    assert status(path, headers={"X-Forwarded-For": REMOTE[0]}) == 403
+
+
+@pytest.mark.parametrize("path", ["/ops/uploads", "/metrics"])
+def test_with_a_token_it_is_required(path, monkeypatch):
+    monkeypatch.setattr(ops, "OPS_TOKEN", "s3cret")
+    assert status(path) == 403
+    assert status(path, headers={"Authorization": "Bearer wrong"}) == 403
+    assert status(path, REMOTE, {"Authorization": "Bearer s3cret"}) == 200
@@ -0,0 +1,82 @@
+import asyncio
+import datetime
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app import models
+from app.db import SessionLocal
+from app.trip import trip as trip_routes
+
+
+@pytest.fixture
+def owned_trip():
+    with SessionLocal(expire_on_commit=False) as db:
+        user = models.User(email=f"{uuid.uuid4().hex}@example.com")
+        trip = models.Trip(
+            user=user,
+            destination="Alleppey",
+            start_date=datetime.datetime(2026, 11, 2),
+            end_date=datetime.datetime(2026, 11, 3),
+            travelers=2,
+        )
+        db.add_all(
+            [
+                trip,
+                models.Hotel(
+                    name="Backwater Stay", location="Alappuzha", rating=4.5,
+                    latitude=9.49, longitude=76.33,
+                ),
+                models.Sight(
+                    name="Alappuzha Beach", location="Alappuzha",
+                    latitude=9.49, longitude=76.32,
+                ),
+                models.Activity(
+                    description="Houseboat cruise", location="Alappuzha",
+                    price=1500, duration="3 hours", latitude=9.5, longitude=76.34,
+                ),
+            ]
+        )
+        db.commit()
+    yield user, trip.id
+
+
+def run_plan(user, trip_id):
+    return asyncio.run(trip_routes.plan_trip(uuid.UUID(trip_id), current_user=user))
+
+
+def test_planner_runs_without_a_connection(owned_trip, checked_out, monkeypatch):
+    user, trip_id = owned_trip
+    seen = []
+
+    def plan(*args, **kwargs):
+        seen.append(checked_out())
+        return real_plan(*args, **kwargs)
+
+    real_plan = trip_routes.plan
+    monkeypatch.setattr(trip_routes, "plan", plan)
+    response = run_plan(user, trip_id)
+
+    assert response.status_code == 200
+    assert seen == [0]
+    with SessionLocal() as db:
+        query = select(func.count()).where(models.Itinerary.trip_id == trip_id)
+        assert db.scalar(query) == 1
+
+
+def test_trip_deleted_while_planning_is_not_saved(owned_trip, monkeypatch):
+    user, trip_id = owned_trip
+
+    def plan(*args, **kwargs):
+        with SessionLocal() as db:
+            db.delete(db.get(models.Trip, trip_id))
+            db.commit()
+        return real_plan(*args, **kwargs)
+
+    real_plan = trip_routes.plan
+    monkeypatch.setattr(trip_routes, "plan", plan)
+    with pytest.raises(HTTPException) as raised:
+        run_plan(user, trip_id)
+    assert raised.value.status_code == 404
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from benchmarks import explain_queries, trip_detail_queries
+
+
+def test_trip_detail_query_count_is_constant():
+    counts = {}
+    for size in trip_detail_queries.SIZES:
+        trip_id, user_id = trip_detail_queries.seed(size)
+        counts[size], data = asyncio.run(
+            trip_detail_queries.count_queries(trip_id, user_id)
+        )
+        assert len(data["itineraries"]) == size
+    assert len(set(counts.values())) == 1, counts
+
+
+@pytest.mark.parametrize(
+    "name, scenario",
+    explain_queries.SCENARIOS,
+    ids=[name for name, _ in explain_queries.SCENARIOS],
+)
+def test_hot_queries_use_indexes(name, scenario):
+    explain_queries.seed()
+
+    async def scans():
+        found = []
+        async with explain_queries.async_engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                await conn.exec_driver_sql("SET enable_seqscan = off")
+            for statement, parameters in await explain_queries.capture(scenario):
+                tables = await explain_queries.sequential_scans(
+                    conn, statement, parameters
+                )
+                if tables:
+                    found.append((" ".join(statement.split()), sorted(tables)))
+        return found
+
+    assert asyncio.run(scans()) == []
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app import cache, db, models
+
+NAMES = ("On the primary", "On the replica", "Written")
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A second SQLite file as the only replica, with its own rows."""
+    replicas = db.ReplicaSet([f"sqlite:///{tmp_path}/replica.db"])
+    replica = replicas.replicas[0]
+    models.Base.metadata.create_all(replica.engine)
+    with db.SessionLocal() as primary, db.Session(replica.engine) as copy:
+        primary.add(models.Sight(name="On the primary"))
+        copy.add(models.Sight(name="On the replica"))
+        primary.commit()
+        copy.commit()
+    monkeypatch.setattr(db, "replicas", replicas)
+    monkeypatch.setattr(db, "_recent_writes", {})
+    monkeypatch.setattr(cache, "_shared_backend", None)
+    yield replica
+    with db.SessionLocal() as primary:
+        primary.query(models.Sight).filter(models.Sight.name.in_(NAMES)).delete()
+        primary.commit()
+    replica.engine.dispose()
+    asyncio.run(replica.async_engine.dispose())
+
+
+async def names(session) -> set:
+    query = select(models.Sight.name).where(models.Sight.name.in_(NAMES))
+    return set(await session.scalars(query))
+
+
+def test_reads_go_to_the_replica_until_the_session_writes(replica):
+    async def scenario():
+        async with db.AsyncReadSessionLocal() as session:
+            assert await names(session) == {"On the replica"}
+            session.add(models.Sight(name="Written"))
+            await session.flush()
+            assert await names(session) == {"On the primary", "Written"}
+            await session.rollback()
+        async with db.AsyncSessionLocal() as session:
+            assert await names(session) == {"On the primary"}
+
+    asyncio.run(scenario())
+    assert replica.picks == 1
+
+
+def test_recent_writers_read_from_the_primary(replica):
+    async def scenario():
+        async with db.read_session("user-1") as session:
+            assert await names(session) == {"On the replica"}
+        await db.mark_write("user-1")
+        async with db.read_session("user-1") as session:
+            assert await names(session) == {"On the primary"}
+        async with db.read_session("user-2") as session:
+            assert await names(session) == {"On the replica"}
+
+    asyncio.run(scenario())
+
+
+def test_write_marker_is_shared_between_workers(replica, monkeypatch):
+    monkeypatch.setattr(cache, "_shared_backend", cache.InMemoryBackend())
+
+    async def scenario():
+        await db.mark_write("user-1")
+        # Another worker: nothing recorded locally, only in the backend.
+        db._recent_writes.clear()
+        async with db.read_session("user-1") as session:
+            assert await names(session) == {"On the primary"}
+
+        monkeypatch.setattr(db, "DB_REPLICA_LAG_WINDOW", 0)
+        async with db.read_session("user-1") as session:
+            assert await names(session) == {"On the replica"}
+
+    asyncio.run(scenario())
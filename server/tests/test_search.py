@@ -0,0 +1,50 @@
+import pytest
+
+from app import models
+from app.db import SessionLocal
+from app.trip import search
+
+
+@pytest.fixture
+def text_index():
+    index = search._indexes[models.Sight] = search.TrigramIndex()
+    yield index
+    search._indexes.pop(models.Sight)
+
+
+def ids(index, query):
+    return [doc for doc, _ in index.search(query, 5)]
+
+
+def test_rolled_back_rows_never_reach_the_index(text_index):
+    with SessionLocal() as db:
+        sight = models.Sight(name="Mattancherry Palace", location="Kochi")
+        db.add(sight)
+        db.flush()
+        assert ids(text_index, "mattancherry") == []
+        db.rollback()
+
+    with SessionLocal() as db:
+        db.add(models.Sight(name="Dutch Palace", location="Kochi"))
+        db.flush()
+    # Closed without committing.
+    assert ids(text_index, "palace") == []
+
+
+def test_committed_changes_reach_the_index(text_index):
+    with SessionLocal() as db:
+        sight = models.Sight(name="Bolgatty Palace", location="Kochi")
+        db.add(sight)
+        db.commit()
+        assert ids(text_index, "bolgatty") == [sight.id]
+
+        sight.name = "Bolgatty Island"
+        db.commit()
+        assert ids(text_index, "bolgatty palace") == []
+        assert ids(text_index, "bolgatty island") == [sight.id]
+
+        db.delete(sight)
+        db.flush()
+        assert ids(text_index, "bolgatty island") == [sight.id]
+        db.commit()
+        assert ids(text_index, "bolgatty island") == []
@@ -0,0 +1,70 @@
+import asyncio
+
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.translator import stream
+
+SAMPLE_RATE = 16000
+# One utterance per frame: 300 ms of tone, then 700 ms of silence.
+SPEECH = (np.sin(np.arange(SAMPLE_RATE * 3 // 10) / 5) * 8000).astype("<i2")
+FRAME = SPEECH.tobytes() + bytes(SAMPLE_RATE * 7 // 10 * 2)
+
+
+class Transcriber(stream.TranscriptionBackend):
+    async def transcribe(self, wav, language=None, prompt=None):
+        return ""
+
+
+class BrokenClient:
+    """Streams audio forever; the connection breaks on the first final."""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        self.frames += 1
+        await asyncio.sleep(0)
+        return {"type": "websocket.receive", "bytes": FRAME}
+
+    async def send_text(self, text):
+        if '"final"' in text:
+            raise WebSocketDisconnect(1006)
+
+    async def close(self, code=1000):
+        pass
+
+
+async def translate(text):
+    return {"translated_text": text, "detected_source_language": "en"}
+
+
+def test_failed_finals_do_not_leave_the_receiver_blocked():
+    client = BrokenClient()
+    session = stream.StreamSession(
+        client, "user-1", "ml", translate, SAMPLE_RATE, transcriber=Transcriber()
+    )
+    active = stream.stats["active"]
+    asyncio.run(asyncio.wait_for(session.run(), 5))
+
+    assert stream.stats["active"] == active
+    # Stopped once the queue was full, instead of reading to the time limit.
+    assert client.frames <= stream.STREAM_MAX_PENDING_SEGMENTS + 3
+
+
+def test_other_finals_failures_are_raised(monkeypatch):
+    async def fail(pending):
+        raise RuntimeError("finals failed")
+
+    session = stream.StreamSession(
+        BrokenClient(), "user-1", "ml", translate, SAMPLE_RATE, transcriber=Transcriber()
+    )
+    monkeypatch.setattr(session, "_finals", fail)
+    active = stream.stats["active"]
+    with pytest.raises(RuntimeError, match="finals failed"):
+        asyncio.run(asyncio.wait_for(session.run(), 5))
+    assert stream.stats["active"] == active
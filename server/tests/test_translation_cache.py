@@ -0,0 +1,71 @@
+import asyncio
+
+from app.translator import cache
+
+
+def test_transcription_miss_holds_no_connection_during_upstream(checked_out):
+    seen = []
+
+    async def transcribe():
+        seen.append(checked_out())
+        await asyncio.sleep(0)
+        return "hola"
+
+    async def run():
+        first = await cache.cached_transcription("a" * 64, transcribe)
+        second = await cache.cached_transcription("a" * 64, transcribe)
+        return first, second
+
+    assert asyncio.run(run()) == ("hola", "hola")
+    assert seen == [0]
+    assert checked_out() == 0
+
+
+def test_translation_miss_holds_no_connection_during_upstream(checked_out):
+    seen = []
+
+    async def translate(text):
+        seen.append(checked_out())
+        return {
+            "input_text": text,
+            "translated_text": "hello",
+            "detected_source_language": "es",
+        }
+
+    async def run():
+        return [
+            await cache.cached_translation("hola", "en", translate) for _ in range(2)
+        ]
+
+    results = asyncio.run(run())
+    assert [result["translated_text"] for result in results] == ["hello", "hello"]
+    assert seen == [0]
+
+
+def test_batch_miss_holds_no_connection_during_upstream(checked_out):
+    seen = []
+
+    async def translate_many(texts):
+        seen.append((checked_out(), list(texts)))
+        return [
+            {"translated_text": text.upper(), "detected_source_language": "en"}
+            for text in texts
+        ]
+
+    async def run():
+        first = await cache.cached_translations(["one"], "de", translate_many)
+        second = await cache.cached_translations(
+            ["one", "two", "two"], "de", translate_many
+        )
+        return first + second
+
+    results = asyncio.run(run())
+    assert [result["translated_text"] for result in results] == [
+        "ONE",
+        "ONE",
+        "TWO",
+        "TWO",
+    ]
+    # The second call only sent the text that was not cached yet, once.
+    assert seen == [(0, ["one"]), (0, ["two"])]
+    assert checked_out() == 0
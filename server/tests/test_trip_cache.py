@@ -0,0 +1,25 @@
+from app import models
+from app.db import SessionLocal
+from app.trip.cache import cache_key, trip_cache
+
+
+def test_invalidation_waits_for_commit():
+    key = cache_key("munnar")
+    trip_cache.local.set(key, b"[]")
+    epoch = trip_cache.epoch
+
+    with SessionLocal() as db:
+        db.add(models.Hotel(name="Tea Valley Resort", location="Munnar"))
+        db.flush()
+        # A concurrent fill that started now would still read the old rows.
+        assert trip_cache.epoch == epoch
+        assert trip_cache.local.get(key) == b"[]"
+        db.rollback()
+    assert trip_cache.epoch == epoch
+    assert trip_cache.local.get(key) == b"[]"
+
+    with SessionLocal() as db:
+        db.add(models.Hotel(name="Tea Valley Resort", location="Munnar"))
+        db.commit()
+    assert trip_cache.epoch > epoch
+    assert trip_cache.local.get(key) is None
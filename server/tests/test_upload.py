@@ -0,0 +1,40 @@
+import os
+
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+
+from app.translator import upload
+
+app = FastAPI()
+
+
+@app.post("/ingest")
+async def ingest(file: UploadFile):
+    audio = await upload.ingest_audio(file)
+    return {"size": audio.size, "sha256": audio.sha256}
+
+
+client = TestClient(app)
+
+
+def post(size: int) -> dict:
+    response = client.post("/ingest", files={"file": ("clip.wav", os.urandom(size))})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_large_upload_is_hashed_from_disk():
+    upload.stats.update(spooled_to_disk=0, peak_in_memory=0)
+    size = 8 * 1024 * 1024
+    assert post(size)["size"] == size
+    # Past the 1 MiB spool limit the clip is on disk; only one chunk is held.
+    assert upload.stats["spooled_to_disk"] == 1
+    assert upload.stats["peak_in_memory"] == upload.CHUNK_SIZE
+
+
+def test_small_upload_is_counted_in_memory():
+    upload.stats.update(spooled_to_disk=0, peak_in_memory=0)
+    size = 200 * 1024
+    post(size)
+    assert upload.stats["spooled_to_disk"] == 0
+    assert upload.stats["peak_in_memory"] == size + upload.CHUNK_SIZE
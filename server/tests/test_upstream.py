@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+from app.upstream import Upstream, upstreams
+
+
+def test_in_flight_counts_held_slots():
+    async def scenario():
+        upstream = Upstream("test-slots", concurrency=2, timeout=1)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        calls = [asyncio.create_task(upstream.call(slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert (upstream.in_flight, upstream.waiting) == (2, 1)
+        release.set()
+        await asyncio.gather(*calls)
+        assert (upstream.in_flight, upstream.waiting) == (0, 0)
+
+        # A sync call that timed out keeps its slot until the thread is free.
+        upstream.timeout, upstream.retries = 0.01, 0
+        done = threading.Event()
+        call = asyncio.create_task(upstream.call_sync(done.wait))
+        await asyncio.sleep(0.1)
+        assert call.done() and upstream.in_flight == 1
+        done.set()
+        await asyncio.sleep(0.05)
+        assert upstream.in_flight == 0
+        call.exception()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        upstreams.pop("test-slots", None)
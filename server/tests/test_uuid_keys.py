@@ -0,0 +1,30 @@
+import uuid
+
+from sqlalchemy import text
+
+from app import models
+from app.db import SessionLocal, convert_sqlite_uuid_keys, engine
+
+
+def test_dashed_keys_from_old_sqlite_databases_are_converted():
+    user_id, translation_id = str(uuid.uuid4()), str(uuid.uuid4())
+    with engine.begin() as connection:
+        # As written before the keys were Uuid columns.
+        connection.execute(
+            text("INSERT INTO users (id, email) VALUES (:id, :email)"),
+            {"id": user_id, "email": f"{user_id}@example.com"},
+        )
+        connection.execute(
+            text("INSERT INTO translators (id, user_id) VALUES (:id, :user_id)"),
+            {"id": translation_id, "user_id": user_id},
+        )
+    with SessionLocal() as db:
+        assert db.get(models.User, user_id) is None
+
+    with engine.begin() as connection:
+        assert convert_sqlite_uuid_keys(connection, models.Base.metadata) == 3
+        assert convert_sqlite_uuid_keys(connection, models.Base.metadata) == 0
+
+    with SessionLocal() as db:
+        user = db.get(models.User, user_id)
+        assert [t.id for t in user.translations] == [translation_id]
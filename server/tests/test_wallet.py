@@ -0,0 +1,71 @@
+import asyncio
+import random
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app import models
+from app.db import AsyncSessionLocal
+from app.wallet.ledger import LedgerWriter, Posting, reconcile
+
+OPENING = 10_000
+
+
+async def open_wallet() -> tuple:
+    async with AsyncSessionLocal() as db:
+        user = models.User(email=f"{uuid.uuid4().hex}@example.com")
+        wallet = models.Wallet(user=user)
+        db.add_all([user, wallet])
+        await db.commit()
+        return user.id, wallet.id
+
+
+def test_concurrent_debits_and_credits_on_one_wallet():
+    async def scenario():
+        user_id, wallet_id = await open_wallet()
+        # One writer per simulated worker, so batches race on the same row.
+        writers = [LedgerWriter(batch_size=8) for _ in range(4)]
+        await writers[0].submit(Posting("top_up", [(wallet_id, OPENING)], user_id))
+
+        rng = random.Random(20)
+        postings = [
+            Posting("spend", [(wallet_id, -rng.randint(1, 800))], user_id)
+            if rng.random() < 0.6
+            else Posting("top_up", [(wallet_id, rng.randint(1, 500))], user_id)
+            for _ in range(200)
+        ]
+        results = await asyncio.gather(
+            *(writers[i % len(writers)].submit(p) for i, p in enumerate(postings)),
+            return_exceptions=True,
+        )
+
+        async with AsyncSessionLocal() as db:
+            wallet = await db.get(models.Wallet, wallet_id)
+            entries = (
+                await db.scalars(
+                    select(models.WalletEntry)
+                    .where(models.WalletEntry.wallet_id == wallet_id)
+                    .order_by(models.WalletEntry.id)
+                )
+            ).all()
+            mismatched = await reconcile(db, [wallet_id])
+        return postings, results, wallet, entries, mismatched
+
+    postings, results, wallet, entries, mismatched = asyncio.run(scenario())
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert all(isinstance(e, HTTPException) for e in errors)
+    assert {e.status_code for e in errors} <= {409, 503}
+    assert any(e.status_code == 409 for e in errors)
+
+    accepted = [p for p, r in zip(postings, results) if not isinstance(r, Exception)]
+    assert wallet.balance == OPENING + sum(p.legs[0][1] for p in accepted)
+    assert mismatched == []
+    assert len(entries) == len(accepted) + 1
+
+    running = 0
+    for entry in entries:
+        running += entry.amount
+        assert entry.balance_after == running >= 0
+    assert running == wallet.balance